@@ -0,0 +1,206 @@
+import os
+import shutil
+import zipfile
+from collections import namedtuple, defaultdict
+from collections.abc import Sequence
+
+from db import MateriaRepository
+from materias import pasta_organizada
+from utils import (
+    carregar_config,
+    registrar_log,
+    mostrar_erro,
+    mostrar_aviso,
+    mostrar_sucesso,
+    confirmacao,
+    formatar_tabela,
+    formatar_data,
+    interpretar_ids,
+    listar_pdfs,
+    t,
+)
+
+# -----------------------------
+# Configurações do arquivo morto
+# -----------------------------
+config = carregar_config()
+_cfg_arquivamento = config.get("arquivamento", {})
+IDADE_DIAS = int(_cfg_arquivamento.get("idade_dias", 180))
+PASTA_ARQUIVO = _cfg_arquivamento.get("pasta", "arquivo_morto")
+NIVEL_COMPRESSAO = int(_cfg_arquivamento.get("nivel_compressao", 6))
+
+# -----------------------------
+# Pacotes zip por mês de conclusão
+# -----------------------------
+# Um zip por mês (arquivo_morto/AAAA-MM.zip); cada PDF vira o membro
+# "<id>/<nome_arquivo>". O diretório central do zip serve de índice: um PDF
+# é lido sem descompactar o resto do pacote.
+def caminho_pacote(data_conclusao) -> str:
+    return os.path.join(os.getcwd(), PASTA_ARQUIVO, f"{data_conclusao:%Y-%m}.zip")
+
+
+def membro(materia_id: int, nome_arquivo: str) -> str:
+    return f"{materia_id}/{nome_arquivo}"
+
+
+def _empacotar(pacote: str, materia_id: int, pasta: str) -> int:
+    """Acrescenta os PDFs de `pasta` ao pacote (membros já presentes, de uma execução interrompida, são mantidos)."""
+    pdfs = listar_pdfs(pasta) or []
+    os.makedirs(os.path.dirname(pacote), exist_ok=True)
+    with zipfile.ZipFile(pacote, "a", compression=zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO) as zf:
+        existentes = set(zf.namelist())
+        for arquivo in pdfs:
+            if membro(materia_id, arquivo) not in existentes:
+                zf.write(os.path.join(pasta, arquivo), membro(materia_id, arquivo))
+    with open(pacote, "rb+") as f:
+        os.fsync(f.fileno())
+    return len(pdfs)
+
+
+def _remover_do_pacote(pacote: str, ids: Sequence[int]):
+    """Reescreve o pacote sem os membros das matérias informadas (apaga o zip se ficar vazio)."""
+    prefixos = tuple(f"{i}/" for i in ids)
+    temporario = pacote + ".tmp"
+    with zipfile.ZipFile(pacote) as origem:
+        restantes = [info for info in origem.infolist() if not info.filename.startswith(prefixos)]
+        if not restantes:
+            os.remove(pacote)
+            return
+        with zipfile.ZipFile(temporario, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO) as destino:
+            for info in restantes:
+                destino.writestr(info, origem.read(info))
+    os.replace(temporario, pacote)
+
+
+def ler_pdf_arquivado(pacote: str, materia_id: int, nome_arquivo: str) -> bytes:
+    """Lê um único PDF arquivado (acesso direto pelo índice do zip)."""
+    with zipfile.ZipFile(pacote) as zf:
+        return zf.read(membro(materia_id, nome_arquivo))
+
+# -----------------------------
+# Arquivar / restaurar
+# -----------------------------
+def arquivar_concluidas(idade_dias: int = IDADE_DIAS, confirmar: bool = True):
+    """Move para o arquivo morto as matérias concluídas há mais de `idade_dias` dias.
+
+    Ordem segura: 1) PDFs empacotados e gravados em disco; 2) linhas movidas
+    numa transação; 3) só então a pasta materias/<mes>/<nome> é apagada.
+    """
+    candidatas = MateriaRepository.candidatas_arquivamento(idade_dias)
+    if not candidatas:
+        mostrar_aviso(t("arquivamento.nenhuma", dias=idade_dias))
+        return []
+
+    formatar_tabela(
+        [[m.id, m.nome, m.mes_inicio, formatar_data(m.data_conclusao)] for m in candidatas],
+        [t("coluna.id"), t("coluna.nome"), t("coluna.mes"), t("coluna.data_conclusao")]
+    )
+    if confirmar and not confirmacao(t("arquivamento.confirmar", n=len(candidatas))):
+        mostrar_erro(t("operacao_cancelada"))
+        return []
+
+    pacotes, pastas, total_pdfs = {}, {}, 0
+    for m in candidatas:
+        pasta = pasta_organizada(m.mes_inicio, m.nome)
+        if not os.path.isdir(pasta):
+            pacotes[m.id] = None   # sem cópia organizada: só as linhas vão para o arquivo morto
+            continue
+        pacote = caminho_pacote(m.data_conclusao)
+        try:
+            total_pdfs += _empacotar(pacote, m.id, pasta)
+        except OSError as e:
+            registrar_log(f"Erro ao empacotar '{pasta}': {e}", tipo="ERRO", funcao="arquivar_concluidas")
+            mostrar_erro(t("arquivamento.erro_empacotar", pasta=pasta, erro=e, id=m.id))
+            continue
+        pacotes[m.id], pastas[m.id] = pacote, pasta
+
+    movidas = MateriaRepository.arquivar(pacotes)
+    for materia_id in movidas:
+        if materia_id in pastas:
+            shutil.rmtree(pastas[materia_id], ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(pastas[materia_id]))   # pasta do mês, se ficou vazia
+            except OSError:
+                pass
+
+    mostrar_sucesso(t("arquivamento.sucesso", n=len(movidas), pdfs=total_pdfs))
+    registrar_log(f"Arquivamento: {len(movidas)} matérias com mais de {idade_dias} dias.", funcao="arquivar_concluidas")
+    return movidas
+
+
+def restaurar_arquivadas(ids_texto: str):
+    """Traz matérias de volta do arquivo morto (linhas e PDFs em materias/<mes>/<nome>)."""
+    interpretados = interpretar_ids(ids_texto)
+    if interpretados is None:
+        return {}
+    ids, intervalos = interpretados
+    ids = set(ids) | {i for inicio, fim in intervalos for i in range(inicio, fim + 1)}
+
+    arquivadas = MateriaRepository.arquivadas(sorted(ids))
+    if not arquivadas:
+        mostrar_aviso(t("restaurar.nenhuma"))
+        return {}
+
+    # 1) PDFs extraídos de volta antes de mexer no banco
+    for m in arquivadas:
+        if not m.pacote or not os.path.exists(m.pacote):
+            continue
+        destino = pasta_organizada(m.mes_inicio, m.nome)
+        with zipfile.ZipFile(m.pacote) as zf:
+            for info in zf.infolist():
+                if info.filename.startswith(f"{m.id}/"):
+                    os.makedirs(destino, exist_ok=True)
+                    with zf.open(info) as origem, open(os.path.join(destino, os.path.basename(info.filename)), "wb") as saida:
+                        shutil.copyfileobj(origem, saida)
+
+    # 2) Linhas de volta às tabelas quentes
+    novos_ids = MateriaRepository.restaurar([m.id for m in arquivadas])
+
+    # 3) Pacotes compactados sem os membros restaurados
+    por_pacote = defaultdict(list)
+    for m in arquivadas:
+        if m.id in novos_ids and m.pacote and os.path.exists(m.pacote):
+            por_pacote[m.pacote].append(m.id)
+    for pacote, ids_pacote in por_pacote.items():
+        _remover_do_pacote(pacote, ids_pacote)
+
+    for antigo, novo in novos_ids.items():
+        if antigo != novo:
+            mostrar_aviso(t("restaurar.novo_id", antigo=antigo, novo=novo))
+    mostrar_sucesso(t("restaurar.sucesso", n=len(novos_ids)))
+    return novos_ids
+
+# -----------------------------
+# Listagens incluindo o arquivo morto
+# -----------------------------
+class ComArquivadas:
+    """Fonte de listagem que junta uma fonte quente (banco ou cache local) com o arquivo morto.
+
+    Mesma interface de MateriaRepository.projetar/arquivos_por_materia; as
+    matérias arquivadas aparecem com o nome marcado.
+    """
+
+    def __init__(self, fonte=MateriaRepository):
+        self.fonte = fonte
+        self._ids_arquivados = set()
+
+    def projetar(self, colunas: Sequence[str] = ("id", "nome", "mes_inicio", "concluida", "data_criacao", "data_conclusao"),
+                 **filtros):
+        quentes = self.fonte.projetar(colunas, **filtros)
+        frias = MateriaRepository.projetar(colunas, arquivadas=True, **filtros)
+        self._ids_arquivados = {m.id for m in frias}
+        if frias and "nome" in colunas:
+            Linha = namedtuple("LinhaMateria", frias[0]._fields)
+            frias = [Linha(*m)._replace(nome=t("listar.arquivada", nome=m.nome)) for m in frias]
+
+        # Mesma ordem das fontes: pela data do período (quando projetada) ou por ID
+        periodo = filtros.get("periodo")
+        coluna_data = f"data_{periodo[0]}" if periodo else None
+        if coluna_data in colunas:
+            return sorted([*quentes, *frias], key=lambda m: (getattr(m, coluna_data), m.id))
+        return sorted([*quentes, *frias], key=lambda m: m.id)
+
+    def arquivos_por_materia(self, ids: Sequence[int]) -> dict[int, Sequence[str]]:
+        frias = [i for i in ids if i in self._ids_arquivados]
+        quentes = [i for i in ids if i not in self._ids_arquivados]
+        return {**self.fonte.arquivos_por_materia(quentes), **MateriaRepository.arquivos_por_materia(frias, arquivadas=True)}
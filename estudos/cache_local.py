@@ -0,0 +1,278 @@
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+from collections.abc import Sequence
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select, func
+
+from db import Materia, ArquivoMateria, sessao_leitura, ao_gravar
+from utils import carregar_config, registrar_log, mostrar_aviso
+
+# -----------------------------
+# Configurações do cache local
+# -----------------------------
+config = carregar_config()
+_cfg_cache = config.get("cache_local", {})
+CACHE_PATH = Path(__file__).parent / _cfg_cache.get("arquivo", "cache_materias.sqlite")
+VALIDADE_SEGUNDOS = float(_cfg_cache.get("validade_segundos", 300))
+MMAP_BYTES = int(_cfg_cache.get("mmap_mb", 64)) * 1024 * 1024
+
+COLUNAS_MATERIA = ("id", "nome", "pasta_pdf", "mes_inicio", "concluida", "data_criacao", "data_conclusao", "versao")
+COLUNAS_DATA = {"data_criacao", "data_conclusao"}
+COLUNAS_ARQUIVO = ("id", "materia_id", "nome_arquivo", "paginas", "tamanho_bytes")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS materias (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    pasta_pdf TEXT NOT NULL,
+    mes_inicio TEXT NOT NULL,
+    concluida INTEGER NOT NULL,
+    data_criacao TEXT,
+    data_conclusao TEXT,
+    versao INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_concluida ON materias (concluida);
+CREATE INDEX IF NOT EXISTS idx_cache_data_criacao ON materias (data_criacao);
+CREATE INDEX IF NOT EXISTS idx_cache_data_conclusao ON materias (data_conclusao);
+CREATE TABLE IF NOT EXISTS arquivos_materia (
+    id INTEGER PRIMARY KEY,
+    materia_id INTEGER NOT NULL,
+    nome_arquivo TEXT NOT NULL,
+    paginas INTEGER,
+    tamanho_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_cache_arquivos_materia ON arquivos_materia (materia_id);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor REAL NOT NULL
+);
+"""
+
+# -----------------------------
+# Cache local (snapshot SQLite)
+# -----------------------------
+class CacheLocal:
+    """Snapshot local de `materias`/`arquivos_materia` para listagens rápidas e offline.
+
+    Expõe `projetar` e `arquivos_por_materia` com a mesma assinatura do
+    MateriaRepository, então as telas de listagem aceitam qualquer um dos dois.
+    A atualização é incremental: busca só linhas com ID acima da última marca e
+    compara uma impressão digital (COUNT, SUM(versao)) para detectar edições e
+    remoções; só nesse caso recarrega a tabela inteira.
+    """
+
+    def __init__(self, caminho: Path = CACHE_PATH, validade: float = VALIDADE_SEGUNDOS):
+        self.caminho = Path(caminho)
+        self.validade = validade
+        # `invalidar` roda no hook after_commit, na thread que gravou (ex.: previews em segundo plano)
+        self.conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._trava = threading.RLock()
+        self.conexao.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+        self.conexao.execute("PRAGMA journal_mode = WAL")
+        colunas = {linha[1] for linha in self.conexao.execute("PRAGMA table_info(arquivos_materia)")}
+        if colunas and not colunas.issuperset(COLUNAS_ARQUIVO):
+            # Snapshot de uma versão anterior do esquema: descarta e recria (é só um cache)
+            self.conexao.executescript("DROP TABLE materias; DROP TABLE arquivos_materia; DROP TABLE meta;")
+        self.conexao.executescript(_ESQUEMA)
+
+    # --- metadados ---
+    def _meta(self, chave: str, padrao: float = 0) -> float:
+        linha = self.conexao.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else padrao
+
+    def _definir_meta(self, **valores):
+        self.conexao.executemany(
+            "INSERT INTO meta (chave, valor) VALUES (?, ?) ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+            valores.items(),
+        )
+
+    def invalidar(self):
+        """Marca o snapshot como desatualizado (chamado após gravações no banco)."""
+        with self._trava:
+            self._definir_meta(atualizado_em=0)
+            self.conexao.commit()
+
+    def valido(self) -> bool:
+        return time.time() - self._meta("atualizado_em") < self.validade
+
+    # --- atualização a partir do banco ---
+    def atualizar(self, completo: bool = False):
+        """Sincroniza o snapshot com o banco. Levanta a exceção original se o banco estiver fora do ar."""
+        inicio = time.perf_counter()
+        marca_materias = 0 if completo else int(self._meta("max_id_materias"))
+        marca_arquivos = 0 if completo else int(self._meta("max_id_arquivos"))
+
+        with sessao_leitura() as session:
+            novas_materias = session.execute(
+                select(*(getattr(Materia, c) for c in COLUNAS_MATERIA)).where(Materia.id > marca_materias)
+            ).all()
+            novos_arquivos = session.execute(
+                select(*(getattr(ArquivoMateria, c) for c in COLUNAS_ARQUIVO))
+                .where(ArquivoMateria.id > marca_arquivos)
+            ).all()
+            digital_materias = tuple(session.execute(
+                select(func.count(Materia.id), func.coalesce(func.sum(Materia.versao), 0))
+            ).one())
+            # Metadados extraídos depois da cópia mudam a soma de bytes, não a contagem
+            digital_arquivos = tuple(session.execute(
+                select(func.count(ArquivoMateria.id), func.coalesce(func.sum(ArquivoMateria.tamanho_bytes), 0))
+            ).one())
+
+            with self._trava, self.conexao:
+                if completo:
+                    self.conexao.execute("DELETE FROM materias")
+                    self.conexao.execute("DELETE FROM arquivos_materia")
+                self._gravar_materias(novas_materias)
+                self._gravar_arquivos(novos_arquivos)
+
+                # Edições/remoções não mudam a marca de ID: confere a impressão digital
+                if self._digital_materias() != digital_materias:
+                    self.conexao.execute("DELETE FROM materias")
+                    self._gravar_materias(session.execute(
+                        select(*(getattr(Materia, c) for c in COLUNAS_MATERIA))
+                    ).all())
+                if self._digital_arquivos() != digital_arquivos:
+                    self.conexao.execute("DELETE FROM arquivos_materia")
+                    self._gravar_arquivos(session.execute(
+                        select(*(getattr(ArquivoMateria, c) for c in COLUNAS_ARQUIVO))
+                    ).all())
+
+                self._definir_meta(
+                    atualizado_em=time.time(),
+                    max_id_materias=self._max_id("materias"),
+                    max_id_arquivos=self._max_id("arquivos_materia"),
+                )
+
+        registrar_log(
+            f"Cache local atualizado em {(time.perf_counter() - inicio) * 1000:.1f} ms "
+            f"({len(novas_materias)} matérias e {len(novos_arquivos)} arquivos novos).",
+            funcao="atualizar",
+        )
+
+    def _gravar_materias(self, linhas):
+        self.conexao.executemany(
+            f"INSERT OR REPLACE INTO materias ({', '.join(COLUNAS_MATERIA)}) VALUES ({', '.join('?' * len(COLUNAS_MATERIA))})",
+            (
+                (m.id, m.nome, m.pasta_pdf, m.mes_inicio, int(m.concluida),
+                 m.data_criacao.isoformat(" ") if m.data_criacao else None,
+                 m.data_conclusao.isoformat(" ") if m.data_conclusao else None,
+                 m.versao)
+                for m in linhas
+            ),
+        )
+
+    def _gravar_arquivos(self, linhas):
+        self.conexao.executemany(
+            f"INSERT OR REPLACE INTO arquivos_materia ({', '.join(COLUNAS_ARQUIVO)}) VALUES ({', '.join('?' * len(COLUNAS_ARQUIVO))})",
+            (tuple(a) for a in linhas),
+        )
+
+    def _digital_materias(self) -> tuple[int, int]:
+        return tuple(self.conexao.execute("SELECT COUNT(*), COALESCE(SUM(versao), 0) FROM materias").fetchone())
+
+    def _digital_arquivos(self) -> tuple[int, int]:
+        return tuple(self.conexao.execute("SELECT COUNT(*), COALESCE(SUM(tamanho_bytes), 0) FROM arquivos_materia").fetchone())
+
+    def _max_id(self, tabela: str) -> int:
+        return self.conexao.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabela}").fetchone()[0]
+
+    def garantir_atualizado(self):
+        """Atualiza o snapshot se ele expirou; se o banco estiver inacessível, segue com o snapshot atual."""
+        if self.valido():
+            return
+        try:
+            self.atualizar()
+        except Exception as e:
+            registrar_log(f"Banco indisponível, usando cache local: {e}", tipo="WARNING", funcao="garantir_atualizado")
+            mostrar_aviso("Banco indisponível: exibindo dados do cache local (podem estar desatualizados).")
+
+    # --- leitura (mesma interface do MateriaRepository) ---
+    def projetar(self, colunas: Sequence[str] = ("id", "nome", "mes_inicio", "concluida", "data_criacao", "data_conclusao"),
+                 concluidas: int | None = None, meses: Sequence[str] | None = None,
+                 com_qtd_arquivos: bool = True,
+                 periodo: tuple[str, datetime | None, datetime | None] | None = None,
+                 com_totais: bool = False):
+        """Equivalente a MateriaRepository.projetar, servido pelo snapshot local."""
+        self.garantir_atualizado()
+        return list(self.consultar(colunas, concluidas, meses, com_qtd_arquivos, periodo, com_totais))
+
+    def consultar(self, colunas: Sequence[str], concluidas: int | None = None, meses: Sequence[str] | None = None,
+                  com_qtd_arquivos: bool = True,
+                  periodo: tuple[str, datetime | None, datetime | None] | None = None,
+                  com_totais: bool = False):
+        """Gera as linhas de `projetar` direto do snapshot, sem atualizá-lo (por ID, ou pela data do período)."""
+        campos = [c for c in colunas if c in COLUNAS_MATERIA]
+        selecao = [f"m.{c}" for c in campos]
+        if com_qtd_arquivos:
+            selecao.append("(SELECT COUNT(*) FROM arquivos_materia a WHERE a.materia_id = m.id)")
+            campos.append("qtd_arquivos")
+        if com_totais:
+            for rotulo, coluna in (("total_paginas", "paginas"), ("total_bytes", "tamanho_bytes")):
+                selecao.append(f"(SELECT COALESCE(SUM(a.{coluna}), 0) FROM arquivos_materia a WHERE a.materia_id = m.id)")
+                campos.append(rotulo)
+
+        sql = f"SELECT {', '.join(selecao)} FROM materias m"
+        filtros, parametros = [], []
+        if concluidas is not None:
+            filtros.append("m.concluida = ?")
+            parametros.append(int(bool(concluidas)))
+        if meses:
+            filtros.append(f"lower(m.mes_inicio) IN ({', '.join('?' * len(meses))})")
+            parametros.extend(m.lower() for m in meses)
+        ordem = "m.id"
+        if periodo:
+            campo, inicio, fim = periodo
+            coluna = f"m.data_{campo}"   # datas gravadas em ISO: a ordem de texto é a ordem cronológica
+            filtros.append(f"{coluna} IS NOT NULL")
+            if inicio is not None:
+                filtros.append(f"{coluna} >= ?")
+                parametros.append(inicio.isoformat(" "))
+            if fim is not None:
+                filtros.append(f"{coluna} < ?")
+                parametros.append(fim.isoformat(" "))
+            ordem = f"{coluna}, m.id"
+        if filtros:
+            sql += " WHERE " + " AND ".join(filtros)
+        sql += f" ORDER BY {ordem}"
+
+        Linha = namedtuple("LinhaMateria", campos)
+        datas = [i for i, c in enumerate(campos) if c in COLUNAS_DATA]
+        for valores in self.conexao.execute(sql, parametros):
+            if datas:
+                valores = list(valores)
+                for i in datas:
+                    valores[i] = datetime.fromisoformat(valores[i]) if valores[i] else None
+            yield Linha(*valores)
+
+    def arquivos_por_materia(self, ids: Sequence[int]) -> dict[int, list[str]]:
+        """Equivalente a MateriaRepository.arquivos_por_materia, servido pelo snapshot local."""
+        resultado = {i: [] for i in ids}
+        if not ids:
+            return resultado
+        for materia_id, nome_arquivo in self.conexao.execute(
+            f"SELECT materia_id, nome_arquivo FROM arquivos_materia WHERE materia_id IN ({', '.join('?' * len(ids))}) "
+            "ORDER BY id",
+            list(ids),
+        ):
+            resultado[materia_id].append(nome_arquivo)
+        return resultado
+
+
+_cache = None
+
+def obter_cache() -> CacheLocal:
+    """Retorna o cache local compartilhado do processo (criado na primeira chamada)."""
+    global _cache
+    if _cache is None:
+        _cache = CacheLocal()
+    return _cache
+
+@ao_gravar
+def _invalidar_apos_gravacao():
+    # Também invalida snapshots gravados por execuções anteriores
+    if _cache is not None or CACHE_PATH.exists():
+        obter_cache().invalidar()
@@ -0,0 +1,69 @@
+import json
+import marshal
+from functools import lru_cache
+from pathlib import Path
+
+# -----------------------------
+# Catálogos de mensagens (i18n)
+# -----------------------------
+# Fontes editáveis em i18n/<idioma>.json; na primeira carga cada idioma é
+# compilado para i18n/<idioma>.cat (marshal), que é reaproveitado enquanto
+# o .json não mudar. Cada idioma só é lido quando usado pela primeira vez.
+I18N_DIR = Path(__file__).parent / "i18n"
+IDIOMAS = ("pt", "en", "es")
+IDIOMA_PADRAO = "pt"
+
+_catalogos = {}
+
+
+def compilar(idioma: str) -> dict:
+    """Lê i18n/<idioma>.json e grava a versão compilada i18n/<idioma>.cat."""
+    fonte = I18N_DIR / f"{idioma}.json"
+    with open(fonte, "r", encoding="utf-8") as f:
+        mensagens = json.load(f)
+    # Blocos de várias linhas (ex.: ajuda) viram tuplas imutáveis
+    mensagens = {k: tuple(v) if isinstance(v, list) else v for k, v in mensagens.items()}
+    try:
+        (I18N_DIR / f"{idioma}.cat").write_bytes(marshal.dumps((fonte.stat().st_mtime_ns, mensagens)))
+    except OSError:
+        pass  # sem permissão de escrita: segue só com o catálogo em memória
+    return mensagens
+
+
+def catalogo(idioma: str) -> dict:
+    """Retorna o catálogo do idioma, carregando-o (do .cat, se atualizado) na primeira vez."""
+    if idioma not in _catalogos:
+        if idioma not in IDIOMAS:
+            idioma = IDIOMA_PADRAO
+        try:
+            marca, mensagens = marshal.loads((I18N_DIR / f"{idioma}.cat").read_bytes())
+            if marca != (I18N_DIR / f"{idioma}.json").stat().st_mtime_ns:
+                mensagens = compilar(idioma)
+        except (OSError, ValueError, EOFError, TypeError):
+            mensagens = compilar(idioma)
+        _catalogos[idioma] = mensagens
+    return _catalogos[idioma]
+
+
+def mensagem(idioma: str, chave: str, **kwargs):
+    """Busca a mensagem no idioma (com fallback para o padrão e, por fim, a própria chave) e formata."""
+    texto = catalogo(idioma).get(chave)
+    if texto is None:
+        texto = catalogo(IDIOMA_PADRAO).get(chave, chave)
+    if not kwargs:
+        return texto
+    try:
+        return _formatar(texto, tuple(sorted(kwargs.items())))
+    except TypeError:  # argumento não hashable: formata sem cache
+        return texto.format(**kwargs)
+
+
+@lru_cache(maxsize=2048)
+def _formatar(texto: str, argumentos: tuple) -> str:
+    return texto.format(**dict(argumentos))
+
+
+if __name__ == "__main__":
+    # python catalogo.py -> recompila todos os catálogos
+    for idioma in IDIOMAS:
+        print(f"{idioma}: {len(compilar(idioma))} mensagens compiladas")
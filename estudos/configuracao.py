@@ -0,0 +1,287 @@
+import os
+import copy
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from colorama import Fore, Style
+
+from catalogo import IDIOMAS
+
+# -----------------------------
+# Configuração tipada e validada
+# -----------------------------
+# Fonte: config.json + variáveis de ambiente ESTUDOS__<SECAO>__<CHAVE>
+# (ex.: ESTUDOS__DATABASE__URL, ESTUDOS__DATABASE__POOL_SIZE, ESTUDOS__IDIOMA).
+# O arquivo é validado por inteiro antes de entrar em uso; recargas trocam a
+# referência da config de uma vez só, então leitores nunca veem um meio-termo.
+CONFIG_PATH = Path(__file__).parent / "config.json"
+PREFIXO_ENV = "ESTUDOS__"
+
+ACOES_MENU = {
+    "add", "show", "list_month", "list_done", "list_pending",
+    "mark_done", "mark_done_batch", "list_period", "previews", "edit", "remove", "exit", "help",
+}
+
+
+class ErroConfiguracao(ValueError):
+    """Configuração inválida; `problemas` lista todos os erros encontrados."""
+
+    def __init__(self, problemas: list[str]):
+        self.problemas = problemas
+        super().__init__("Configuração inválida:\n - " + "\n - ".join(problemas))
+
+
+@dataclass(frozen=True)
+class ConfigPaginacao:
+    por_pagina: int = 5
+    maximo: int = 20
+
+
+@dataclass(frozen=True)
+class ConfigBanco:
+    url: str
+    tipo: str = "mysql"
+    test_url: str | None = None
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_recycle: int = 3600
+    replicas: tuple[str, ...] = ()
+    intervalo_saude: float = 10.0
+    janela_leitura_apos_escrita: float = 5.0
+
+
+@dataclass(frozen=True)
+class Config:
+    idioma: str
+    menu_opcoes: dict
+    paginacao: ConfigPaginacao
+    database: ConfigBanco
+    bruto: dict   # config completa (já com as variáveis de ambiente), para seções sem tipo próprio
+
+    def get(self, chave, padrao=None):
+        """Compatibilidade com o uso antigo de config como dict."""
+        return self.bruto.get(chave, padrao)
+
+# -----------------------------
+# Variáveis de ambiente
+# -----------------------------
+def _valor_env(texto: str):
+    """Interpreta números, booleanos e null; o resto fica como string."""
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
+def aplicar_env(dados: dict, ambiente=None) -> dict:
+    """Retorna uma cópia de `dados` com as sobrescritas ESTUDOS__SECAO__CHAVE aplicadas.
+
+    Levanta ErroConfiguracao se alguma variável descer por uma chave que não é seção (ex.: ESTUDOS__IDIOMA__X).
+    """
+    ambiente = os.environ if ambiente is None else ambiente
+    dados = copy.deepcopy(dados)
+    problemas = []
+    for nome, valor in ambiente.items():
+        if not nome.startswith(PREFIXO_ENV):
+            continue
+        caminho = [p.lower() for p in nome[len(PREFIXO_ENV):].split("__") if p]
+        if not caminho:
+            continue
+        alvo = dados
+        for parte in caminho[:-1]:
+            alvo = alvo.setdefault(parte, {})
+            if not isinstance(alvo, dict):
+                problemas.append(f"{nome}: '{parte}' não é uma seção do config.json (valor: {alvo!r})")
+                break
+        else:
+            alvo[caminho[-1]] = _valor_env(valor)
+    if problemas:
+        raise ErroConfiguracao(problemas)
+    return dados
+
+# -----------------------------
+# Validação
+# -----------------------------
+def _inteiro(secao: dict, chave: str, padrao: int, minimo: int, problemas: list, prefixo: str):
+    valor = secao.get(chave, padrao)
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor < minimo:
+        problemas.append(f"{prefixo}.{chave} deve ser um inteiro >= {minimo} (recebido: {valor!r})")
+        return padrao
+    return valor
+
+
+def _decimal(secao: dict, chave: str, padrao: float, problemas: list, prefixo: str) -> float:
+    valor = secao.get(chave, padrao)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or valor < 0:
+        problemas.append(f"{prefixo}.{chave} deve ser um número >= 0 (recebido: {valor!r})")
+        return padrao
+    return float(valor)
+
+
+def _numero(secao: dict, chave: str, problemas: list, prefixo: str):
+    valor = secao.get(chave)
+    if valor is not None and (isinstance(valor, bool) or not isinstance(valor, (int, float)) or valor < 0):
+        problemas.append(f"{prefixo}.{chave} deve ser um número >= 0 (recebido: {valor!r})")
+
+
+def validar(dados: dict) -> Config:
+    """Valida o dicionário de configuração inteiro e devolve a Config tipada."""
+    problemas = []
+
+    idioma = dados.get("idioma", "pt")
+    if idioma not in IDIOMAS:
+        problemas.append(f"idioma deve ser um de {', '.join(IDIOMAS)} (recebido: {idioma!r})")
+
+    menu_opcoes = dados.get("menu_opcoes", {})
+    atalhos = set()
+    if not isinstance(menu_opcoes, dict):
+        problemas.append("menu_opcoes deve ser um objeto {numero: [acao, atalho]}")
+        menu_opcoes = {}
+    for numero, opcao in menu_opcoes.items():
+        if not (isinstance(opcao, (list, tuple)) and len(opcao) == 2 and all(isinstance(x, str) for x in opcao)):
+            problemas.append(f"menu_opcoes.{numero} deve ser [acao, atalho] (recebido: {opcao!r})")
+            continue
+        acao, atalho = opcao
+        if acao not in ACOES_MENU:
+            problemas.append(f"menu_opcoes.{numero}: ação desconhecida {acao!r}")
+        if atalho.upper() in atalhos:
+            problemas.append(f"menu_opcoes.{numero}: atalho {atalho!r} repetido")
+        atalhos.add(atalho.upper())
+
+    pag = dados.get("paginacao", {})
+    por_pagina = _inteiro(pag, "por_pagina", 5, 1, problemas, "paginacao")
+    maximo = _inteiro(pag, "maximo", 20, 1, problemas, "paginacao")
+    if por_pagina > maximo:
+        problemas.append(f"paginacao.por_pagina ({por_pagina}) não pode ser maior que paginacao.maximo ({maximo})")
+
+    banco = dados.get("database", {})
+    url = banco.get("url")
+    if not url or not isinstance(url, str):
+        problemas.append("database.url é obrigatório (no config.json ou em ESTUDOS__DATABASE__URL)")
+    replicas = banco.get("replicas", [])
+    if not isinstance(replicas, list) or not all(isinstance(r, str) and r for r in replicas):
+        problemas.append(f"database.replicas deve ser uma lista de URLs (recebido: {replicas!r})")
+        replicas = []
+
+    database = ConfigBanco(
+        url=url or "",
+        tipo=banco.get("tipo", "mysql"),
+        test_url=banco.get("test_url"),
+        pool_size=_inteiro(banco, "pool_size", 5, 1, problemas, "database"),
+        max_overflow=_inteiro(banco, "max_overflow", 10, 0, problemas, "database"),
+        pool_recycle=_inteiro(banco, "pool_recycle", 3600, -1, problemas, "database"),
+        replicas=tuple(replicas),
+        intervalo_saude=_decimal(banco, "intervalo_saude", 10.0, problemas, "database"),
+        janela_leitura_apos_escrita=_decimal(banco, "janela_leitura_apos_escrita", 5.0, problemas, "database"),
+    )
+
+    for secao, chaves in {
+        "monitoramento": ("debounce_segundos", "intervalo_polling", "intervalo_recarga_pastas"),
+        "ingestao": ("workers", "tamanho_lote"),
+        "cache_local": ("validade_segundos", "mmap_mb"),
+        "arquivamento": ("idade_dias", "nivel_compressao"),
+        "migracoes": ("tamanho_lote", "pausa_entre_lotes"),
+        "fsck": ("workers", "tamanho_lote", "exemplos"),
+        "particionamento": ("validade_segundos",),
+        "previews": ("limite_mb", "largura_miniatura", "caracteres_trecho"),
+    }.items():
+        for chave in chaves:
+            _numero(dados.get(secao, {}), chave, problemas, secao)
+
+    granularidade = dados.get("particionamento", {}).get("granularidade", "semestre")
+    if granularidade not in ("semestre", "ano"):
+        problemas.append(f"particionamento.granularidade deve ser 'semestre' ou 'ano' (recebido: {granularidade!r})")
+
+    if problemas:
+        raise ErroConfiguracao(problemas)
+
+    return Config(
+        idioma=idioma,
+        menu_opcoes=menu_opcoes,
+        paginacao=ConfigPaginacao(por_pagina=por_pagina, maximo=maximo),
+        database=database,
+        bruto=dados,
+    )
+
+# -----------------------------
+# Carga, cache e recarga a quente
+# -----------------------------
+_config_atual = None
+_mtime_atual = None
+_observadores = []
+_trava = threading.Lock()
+
+
+def _mtime(caminho: Path):
+    try:
+        return caminho.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def carregar(caminho: Path = CONFIG_PATH) -> Config:
+    """Lê, aplica variáveis de ambiente e valida. Levanta ErroConfiguracao se inválida."""
+    caminho = Path(caminho)
+    if caminho.exists():
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    else:
+        print(f"{Fore.YELLOW}[AVISO] Arquivo de configuração não encontrado: {caminho}{Style.RESET_ALL}")
+        dados = {}
+    return validar(aplicar_env(dados))
+
+
+def obter_config(caminho: Path = CONFIG_PATH) -> Config:
+    """Retorna a configuração em uso (carregada e validada na primeira chamada)."""
+    global _config_atual, _mtime_atual
+    if _config_atual is None:
+        with _trava:
+            if _config_atual is None:
+                _mtime_atual = _mtime(Path(caminho))
+                _config_atual = carregar(caminho)
+    return _config_atual
+
+
+def ao_recarregar(callback):
+    """Registra callback(anterior, nova) chamado após cada recarga bem-sucedida."""
+    _observadores.append(callback)
+    return callback
+
+
+def recarregar_se_alterado(caminho: Path = CONFIG_PATH) -> bool:
+    """Recarrega o config.json se o mtime mudou. Config inválida é ignorada (mantém a atual)."""
+    global _config_atual, _mtime_atual
+    mtime = _mtime(Path(caminho))
+    if mtime == _mtime_atual:
+        return False
+    with _trava:
+        if mtime == _mtime_atual:
+            return False
+        _mtime_atual = mtime
+        try:
+            nova = carregar(caminho)
+        except (ErroConfiguracao, ValueError, OSError) as e:
+            print(f"{Fore.RED}[ERRO] config.json alterado mas inválido; mantendo a configuração atual.\n{e}{Style.RESET_ALL}")
+            return False
+        anterior, _config_atual = _config_atual, nova
+    for callback in _observadores:
+        try:
+            callback(anterior, nova)
+        except Exception as e:
+            print(f"{Fore.RED}[ERRO] Falha ao aplicar nova configuração ({callback.__name__}): {e}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}[SUCESSO] Configuração recarregada de {caminho}{Style.RESET_ALL}")
+    return True
+
+
+def iniciar_monitor_config(intervalo: float = 2.0, caminho: Path = CONFIG_PATH) -> threading.Thread:
+    """Observa o mtime do config.json numa thread daemon e recarrega quando ele muda."""
+    def _laco():
+        evento = threading.Event()
+        while not evento.wait(intervalo):
+            recarregar_se_alterado(caminho)
+
+    thread = threading.Thread(target=_laco, name="monitor-config", daemon=True)
+    thread.start()
+    return thread
@@ -1,34 +1,212 @@
 import os
-from datetime import datetime
+import time
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections.abc import Sequence
+from datetime import datetime, timedelta
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Boolean, DateTime, ForeignKey, Index
+    create_engine, Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Index, select, update,
+    insert, delete, func, or_, event, text, union_all
 )
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship, Session
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.engine import make_url
 from utils import carregar_config, registrar_log, mostrar_erro, mostrar_sucesso
 from utils import registrar_log, mostrar_erro, mostrar_sucesso, carregar_config
+from configuracao import obter_config, ao_recarregar
 
 # ------------------------------
 # Configuração do banco
 # ------------------------------
-config = carregar_config()   # <-- inicializa o config
+config = carregar_config()   # <-- inicializa o config (já validado)
 
-DATABASE_URL = config.get("database", {}).get("url")
-if not DATABASE_URL:
-    mostrar_erro("Configuração de banco não encontrada no config.json")
-    raise KeyError("Configuração de banco ausente")
+def criar_engine(cfg_banco, url: str | None = None):
+    """Cria o engine a partir da seção `database` da config (pool só para bancos servidor).
+
+    `url` permite reaproveitar as opções de pool para outra URL (ex.: réplicas).
+    """
+    url = url or cfg_banco.url
+    opcoes = {"echo": False, "future": True}
+    if not url.startswith("sqlite"):
+        opcoes.update(
+            pool_size=cfg_banco.pool_size,
+            max_overflow=cfg_banco.max_overflow,
+            pool_recycle=cfg_banco.pool_recycle,
+            pool_pre_ping=True,
+        )
+    return create_engine(url, **opcoes)
+
+def url_segura(url: str) -> str:
+    """URL do banco sem a senha, para logs."""
+    return make_url(url).render_as_string(hide_password=True)
+
+DATABASE_URL = obter_config().database.url
 
 try:
-    engine = create_engine(DATABASE_URL, echo=False, future=True)
+    engine = criar_engine(obter_config().database)
     SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-    registrar_log(f"Conectado ao banco: {DATABASE_URL}", funcao="db_init")
-    print(f"✅ Conectado ao banco: {DATABASE_URL}")
+    registrar_log(f"Conectado ao banco: {url_segura(DATABASE_URL)}", funcao="db_init")
+    print(f"✅ Conectado ao banco: {url_segura(DATABASE_URL)}")
 except Exception as e:
     mostrar_erro(f"Erro ao conectar ao banco: {e}")
     registrar_log(f"Erro ao conectar ao banco: {e}", tipo="ERRO", funcao="db_init")
     raise
 
+# -----------------------------
+# Réplicas de leitura
+# -----------------------------
+class PoolReplicas:
+    """Distribui leituras entre réplicas em round-robin, pulando as que falham no health check.
+
+    Cada réplica é testada com SELECT 1 no máximo a cada `intervalo_saude`
+    segundos; uma réplica fora do ar fica de quarentena até o próximo teste.
+    Sem réplicas saudáveis, `escolher()` retorna None e a leitura vai ao primário.
+    """
+
+    def __init__(self, urls, intervalo_saude: float = 10.0):
+        self.engines = [criar_engine(obter_config().database, url) for url in urls]
+        self.intervalo_saude = intervalo_saude
+        self._ciclo = itertools.cycle(range(len(self.engines))) if self.engines else None
+        self._saude = {}   # índice -> (saudável, instante do último teste)
+        self._trava = threading.Lock()
+
+    def _saudavel(self, indice: int) -> bool:
+        """Estado de saúde da réplica; o teste de conexão roda fora da trava (uma réplica fora do ar não segura as outras leituras)."""
+        agora = time.monotonic()
+        with self._trava:
+            saudavel, testado_em = self._saude.get(indice, (True, float("-inf")))
+            if agora - testado_em < self.intervalo_saude:
+                return saudavel
+            # Marca o teste como feito já agora: outras threads usam o estado anterior enquanto ele roda
+            self._saude[indice] = (saudavel, agora)
+        try:
+            with self.engines[indice].connect() as conexao:
+                conexao.execute(text("SELECT 1"))
+            saudavel = True
+        except Exception as e:
+            if saudavel:
+                registrar_log(f"Réplica {indice} indisponível: {e}", tipo="WARNING", funcao="PoolReplicas")
+            saudavel = False
+        with self._trava:
+            self._saude[indice] = (saudavel, agora)
+        return saudavel
+
+    def escolher(self):
+        """Próxima réplica saudável (round-robin) ou None."""
+        if not self.engines:
+            return None
+        for _ in range(len(self.engines)):
+            with self._trava:
+                indice = next(self._ciclo)
+            if self._saudavel(indice):
+                return self.engines[indice]
+        return None
+
+    def quarentena(self, replica, erro: Exception):
+        """Tira de uso, até o próximo teste de saúde, a réplica em que uma consulta falhou."""
+        if replica not in self.engines:
+            return
+        indice = self.engines.index(replica)
+        with self._trava:
+            self._saude[indice] = (False, time.monotonic())
+        registrar_log(f"Réplica {indice} em quarentena após falha na consulta: {erro}", tipo="WARNING",
+                      funcao="PoolReplicas")
+
+    def descartar(self):
+        for replica in self.engines:
+            replica.dispose()
+
+
+replicas = PoolReplicas(obter_config().database.replicas, obter_config().database.intervalo_saude)
+
+# Leituras ficam no primário dentro de uma unidade de trabalho e logo após escritas deste processo
+_fixar_primario = ContextVar("fixar_primario", default=False)
+_ultima_gravacao = 0.0
+
+@contextmanager
+def unidade_de_trabalho():
+    """Fixa no primário todas as leituras feitas dentro do bloco (ler-modificar-gravar)."""
+    token = _fixar_primario.set(True)
+    try:
+        yield
+    finally:
+        _fixar_primario.reset(token)
+
+class SessaoReplica(Session):
+    """Sessão ligada a uma réplica: se uma consulta falha na conexão, põe a réplica em
+    quarentena e refaz a consulta no primário (em vez de a listagem voltar vazia)."""
+
+    def execute(self, *args, **kwargs):
+        try:
+            return super().execute(*args, **kwargs)
+        except OperationalError as e:
+            replica = self.bind
+            if replica is engine:
+                raise
+            self.rollback()
+            replicas.quarentena(replica, e)
+            self.bind = engine
+            return super().execute(*args, **kwargs)
+
+
+SessaoReplicaLocal = sessionmaker(class_=SessaoReplica, autoflush=False, autocommit=False)
+
+def sessao_leitura():
+    """Sessão para consultas somente leitura: usa uma réplica quando é seguro, senão o primário."""
+    janela = obter_config().database.janela_leitura_apos_escrita
+    if not _fixar_primario.get() and time.monotonic() - _ultima_gravacao >= janela:
+        replica = replicas.escolher()
+        if replica is not None:
+            return SessaoReplicaLocal(bind=replica)
+    return SessionLocal()
+
+@ao_recarregar
+def _aplicar_config_banco(anterior, nova):
+    """Troca o engine (e o pool) quando a seção `database` muda no config.json."""
+    global engine, DATABASE_URL, replicas
+    if anterior.database == nova.database:
+        return
+    novo_engine = criar_engine(nova.database)
+    antigo, engine = engine, novo_engine
+    DATABASE_URL = nova.database.url
+    SessionLocal.configure(bind=novo_engine)
+    antigo.dispose()   # conexões em uso terminam normalmente; as ociosas são fechadas
+
+    replicas_antigas, replicas = replicas, PoolReplicas(nova.database.replicas, nova.database.intervalo_saude)
+    replicas_antigas.descartar()
+    registrar_log(
+        f"Engine recriado: {url_segura(DATABASE_URL)} (pool_size={nova.database.pool_size}, "
+        f"max_overflow={nova.database.max_overflow}, réplicas={len(nova.database.replicas)})",
+        funcao="_aplicar_config_banco",
+    )
+
 Base = declarative_base()
 
+# -----------------------------
+# Observadores de gravação (ex.: cache local)
+# -----------------------------
+_observadores_gravacao = []
+
+def ao_gravar(callback):
+    """Registra uma função chamada após cada commit bem-sucedido no banco."""
+    _observadores_gravacao.append(callback)
+    return callback
+
+@event.listens_for(SessionLocal, "after_commit")
+def _notificar_gravacao(session):
+    global _ultima_gravacao
+    _ultima_gravacao = time.monotonic()
+    # A gravação já foi confirmada: falha de um observador (ex.: cache local) vira log, não erro da gravação
+    for callback in _observadores_gravacao:
+        try:
+            callback()
+        except Exception as e:
+            registrar_log(f"Erro no observador de gravação {callback.__qualname__}: {e}", tipo="ERRO",
+                          funcao="_notificar_gravacao")
+
 # -----------------------------
 # Modelo de tabelas
 # -----------------------------
@@ -41,50 +219,172 @@ class Materia(Base):
     concluida = Column(Boolean, default=False, nullable=False, index=True)
     data_criacao = Column(DateTime, default=datetime.now, nullable=False)
     data_conclusao = Column(DateTime, nullable=True)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
 
     arquivos = relationship("ArquivoMateria", back_populates="materia", cascade="all, delete-orphan")
 
+    # Controle otimista de concorrência: todo UPDATE/DELETE inclui "WHERE versao = ?"
+    __mapper_args__ = {"version_id_col": versao}
+    # No SQLite, IDs de matérias arquivadas não podem ser reaproveitados por novas matérias
+    __table_args__ = {"sqlite_autoincrement": True}
+
 
 class ArquivoMateria(Base):
     __tablename__ = "arquivos_materia"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    materia_id = Column(Integer, ForeignKey("materias.id", ondelete="CASCADE"), nullable=False)
+    materia_id = Column(Integer, ForeignKey("materias.id", ondelete="CASCADE"), nullable=False, index=True)
     nome_arquivo = Column(String(255), nullable=False)
+    # Metadados extraídos do PDF (metadados_pdf.py); NULL até a extração rodar
+    paginas = Column(Integer, nullable=True)
+    titulo = Column(String(255), nullable=True)
+    tamanho_bytes = Column(BigInteger, nullable=True)
+    # SHA-256 do conteúdo: chave do cache de previews (previews.py); NULL até o preview ser gerado
+    digest = Column(String(64), nullable=True, index=True)
 
     materia = relationship("Materia", back_populates="arquivos")
 
+# -----------------------------
+# Arquivo morto (matérias concluídas antigas)
+# -----------------------------
+# Mesmas colunas das tabelas quentes, com os IDs originais preservados.
+# Os PDFs ficam em pacotes zip por mês de conclusão (ver arquivamento.py);
+# `pacote` aponta para o zip e cada PDF é o membro "<id>/<nome_arquivo>".
+class MateriaArquivada(Base):
+    __tablename__ = "materias_arquivadas"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    nome = Column(String(255), nullable=False, index=True)
+    pasta_pdf = Column(String(255), nullable=False)
+    mes_inicio = Column(String(50), nullable=False)
+    concluida = Column(Boolean, default=True, nullable=False)
+    data_criacao = Column(DateTime, nullable=False, index=True)
+    data_conclusao = Column(DateTime, nullable=True, index=True)
+    versao = Column(Integer, nullable=False, default=1)
+    data_arquivamento = Column(DateTime, default=datetime.now, nullable=False)
+    pacote = Column(String(255), nullable=True)
+
+    arquivos = relationship("ArquivoMateriaArquivado", back_populates="materia", cascade="all, delete-orphan")
+
+
+class ArquivoMateriaArquivado(Base):
+    __tablename__ = "arquivos_materia_arquivados"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    materia_id = Column(Integer, ForeignKey("materias_arquivadas.id", ondelete="CASCADE"), nullable=False, index=True)
+    nome_arquivo = Column(String(255), nullable=False)
+    paginas = Column(Integer, nullable=True)
+    titulo = Column(String(255), nullable=True)
+    tamanho_bytes = Column(BigInteger, nullable=True)
+    digest = Column(String(64), nullable=True)
+
+    materia = relationship("MateriaArquivada", back_populates="arquivos")
+
+# -----------------------------
+# Versão do esquema (migracoes.py)
+# -----------------------------
+class VersaoEsquema(Base):
+    __tablename__ = "versao_esquema"
+    versao = Column(Integer, primary_key=True, autoincrement=False)
+    descricao = Column(String(255), nullable=False)
+    aplicada_em = Column(DateTime, default=datetime.now, nullable=False)
+
 # Índices adicionais
 Index("idx_mes_inicio", Materia.mes_inicio)
 Index("idx_concluida", Materia.concluida)
+Index("idx_data_criacao", Materia.data_criacao)
+Index("idx_data_conclusao", Materia.data_conclusao)
+
+# Colunas de data consultáveis por período (ambas indexadas)
+CAMPOS_DATA = {"criacao": Materia.data_criacao, "conclusao": Materia.data_conclusao}
+GRANULARIDADES = ("semana", "mes")
+
+def _modelos(arquivadas: bool):
+    """(modelo de matéria, modelo de arquivo) das tabelas quentes ou do arquivo morto."""
+    return (MateriaArquivada, ArquivoMateriaArquivado) if arquivadas else (Materia, ArquivoMateria)
+
+def _filtro_periodo(coluna, inicio: datetime | None, fim: datetime | None) -> list:
+    """Condições `inicio <= coluna < fim` (intervalo semiaberto, usa o índice da coluna)."""
+    condicoes = [coluna.is_not(None)]
+    if inicio is not None:
+        condicoes.append(coluna >= inicio)
+    if fim is not None:
+        condicoes.append(coluna < fim)
+    return condicoes
+
+def _expr_periodo(coluna, granularidade: str, dialeto: str):
+    """Expressão SQL do balde do histograma: 'AAAA-MM' (mês) ou a segunda-feira da semana 'AAAA-MM-DD'."""
+    if dialeto == "sqlite":
+        if granularidade == "mes":
+            return func.strftime("%Y-%m", coluna)
+        return func.date(coluna, "weekday 0", "-6 days")
+    if dialeto in ("mysql", "mariadb"):
+        if granularidade == "mes":
+            return func.date_format(coluna, "%Y-%m")
+        return func.date_format(func.subdate(coluna, func.weekday(coluna)), "%Y-%m-%d")
+    if dialeto == "postgresql":
+        if granularidade == "mes":
+            return func.to_char(coluna, "YYYY-MM")
+        return func.to_char(func.date_trunc("week", coluna), "YYYY-MM-DD")
+    raise ValueError(f"Histograma não suportado para o banco '{dialeto}'.")
+
+# Colunas disponíveis para listagens por projeção (sem hidratar objetos ORM)
+COLUNAS_PROJECAO = {
+    "id": Materia.id,
+    "nome": Materia.nome,
+    "pasta_pdf": Materia.pasta_pdf,
+    "mes_inicio": Materia.mes_inicio,
+    "concluida": Materia.concluida,
+    "data_criacao": Materia.data_criacao,
+    "data_conclusao": Materia.data_conclusao,
+    "versao": Materia.versao,
+}
+
+# -----------------------------
+# Conflitos de concorrência
+# -----------------------------
+class ConflitoDeVersao(Exception):
+    """Outra sessão alterou a matéria depois que ela foi lida.
+
+    Nenhuma alteração é gravada; basta recarregar a matéria e tentar de novo.
+    """
+
+    def __init__(self, id_materia: int, versao_esperada: int | None = None):
+        self.id_materia = id_materia
+        self.versao_esperada = versao_esperada
+        super().__init__(
+            f"Matéria ID {id_materia} foi alterada por outra sessão (versão esperada: {versao_esperada})."
+        )
 
 # -----------------------------
 # Inicialização e migrations
 # -----------------------------
 def init_db():
-    """Inicializa o banco de dados e cria tabelas/índices."""
+    """Inicializa o banco de dados: cria tabelas novas e aplica as migrações pendentes."""
     try:
-        Base.metadata.create_all(bind=engine)
+        migrate_db(silencioso=True)
         registrar_log("Banco inicializado com SQLAlchemy.", funcao="init_db")
     except Exception as e:
         registrar_log(f"Erro ao inicializar banco: {e}", tipo="ERRO", funcao="init_db")
         mostrar_erro(f"Erro ao inicializar banco: {e}")
 
-def migrate_db():
-    """Exemplo simples de migration (ideal usar Alembic)."""
+def migrate_db(dry_run: bool = False, silencioso: bool = False):
+    """Aplica as migrações versionadas pendentes (ver migracoes.py). Com `dry_run`, só lista os comandos."""
+    from migracoes import aplicar_migracoes   # migracoes importa este módulo
     try:
-        Base.metadata.create_all(bind=engine)
-        registrar_log("Migration aplicada (via SQLAlchemy).", funcao="migrate_db")
+        return aplicar_migracoes(dry_run=dry_run, silencioso=silencioso)
     except Exception as e:
         registrar_log(f"Erro ao aplicar migration: {e}", tipo="ERRO", funcao="migrate_db")
         mostrar_erro(f"Erro ao aplicar migration: {e}")
+        return []
 
 # -----------------------------
 # Camada de repositório
 # -----------------------------
 class MateriaRepository:
     @staticmethod
-    def insert(nome: str, pasta: str, mes: str):
-        """Insere uma nova matéria e registra os PDFs encontrados na pasta."""
+    def insert(nome: str, pasta: str, mes: str, arquivos_pdf: Sequence[str] | None = None):
+        """Insere uma nova matéria e registra os PDFs (os informados ou os encontrados na pasta).
+
+        Matéria e arquivos são gravados numa única transação.
+        """
         if not nome.strip():
             raise ValueError("Nome da matéria não pode ser vazio.")
         if not pasta.strip():
@@ -94,22 +394,18 @@ class MateriaRepository:
 
         try:
             with SessionLocal() as session:
+                if arquivos_pdf is None:
+                    arquivos_pdf = [f for f in os.listdir(pasta) if f.lower().endswith(".pdf")]
                 materia = Materia(
                     nome=nome,
                     pasta_pdf=pasta,
-                    mes_inicio=mes,
+                    mes_inicio=mes.strip().lower(),
                     concluida=False,
+                    arquivos=[ArquivoMateria(nome_arquivo=arquivo) for arquivo in arquivos_pdf],
                 )
                 session.add(materia)
                 session.commit()
 
-                arquivos_pdf = [f for f in os.listdir(pasta) if f.lower().endswith(".pdf")]
-                for arquivo in arquivos_pdf:
-                    registro = ArquivoMateria(materia_id=materia.id, nome_arquivo=arquivo)
-                    session.add(registro)
-
-                session.commit()
-
                 registrar_log(f"Matéria inserida: {nome} com {len(arquivos_pdf)} PDFs", funcao="insert")
                 mostrar_sucesso(f"Matéria '{nome}' inserida com sucesso no banco!")
                 return materia.id
@@ -118,11 +414,62 @@ class MateriaRepository:
             mostrar_erro(f"Erro ao inserir matéria: {e}")
             return None
 
+    @staticmethod
+    def insert_lote(materias: Sequence[tuple[str, str, str, Sequence[str]]], tamanho_lote: int = 200):
+        """Insere várias matérias (nome, pasta, mês, PDFs) em transações de até `tamanho_lote` matérias.
+
+        Retorna os IDs inseridos. Se um bloco falhar, os blocos anteriores já
+        estão gravados e apenas os IDs deles são retornados.
+        """
+        ids = []
+        try:
+            with SessionLocal() as session:
+                for inicio in range(0, len(materias), tamanho_lote):
+                    bloco = materias[inicio:inicio + tamanho_lote]
+                    objs = [Materia(nome=nome, pasta_pdf=pasta, mes_inicio=mes.strip().lower(), concluida=False)
+                            for nome, pasta, mes, _ in bloco]
+                    session.add_all(objs)
+                    session.flush()
+                    ids_bloco = [o.id for o in objs]
+
+                    arquivos = [
+                        {"materia_id": id_materia, "nome_arquivo": arquivo}
+                        for id_materia, (_, _, _, pdfs) in zip(ids_bloco, bloco)
+                        for arquivo in pdfs
+                    ]
+                    if arquivos:
+                        session.execute(insert(ArquivoMateria), arquivos)
+                    session.commit()
+                    ids.extend(ids_bloco)
+                    registrar_log(f"Lote gravado: {len(bloco)} matérias, {len(arquivos)} PDFs", funcao="insert_lote")
+            return ids
+        except Exception as e:
+            registrar_log(f"Erro ao inserir lote de matérias: {e}", tipo="ERRO", funcao="insert_lote")
+            mostrar_erro(f"Erro ao inserir lote de matérias: {e}")
+            return ids
+
+    @staticmethod
+    def nomes_existentes(nomes: Sequence[str]) -> set[str]:
+        """Retorna, em minúsculas, quais dos nomes informados já estão cadastrados."""
+        if not nomes:
+            return set()
+        try:
+            with sessao_leitura() as session:
+                return {
+                    n.lower() for n in session.execute(
+                        select(Materia.nome).where(func.lower(Materia.nome).in_([n.lower() for n in nomes]))
+                    ).scalars()
+                }
+        except Exception as e:
+            registrar_log(f"Erro ao verificar nomes de matérias: {e}", tipo="ERRO", funcao="nomes_existentes")
+            mostrar_erro(f"Erro ao verificar nomes de matérias: {e}")
+            return set()
+
     @staticmethod
     def list(concluidas: int | None = None):
         """Lista matérias, opcionalmente filtrando por concluídas."""
         try:
-            with SessionLocal() as session:
+            with sessao_leitura() as session:
                 if concluidas is None:
                     materias = session.query(Materia).all()
                 else:
@@ -148,11 +495,158 @@ class MateriaRepository:
             mostrar_erro(f"Erro ao listar matérias: {e}")
             return []
 
+    @staticmethod
+    def projetar(colunas: Sequence[str] = ("id", "nome", "mes_inicio", "concluida", "data_criacao", "data_conclusao"),
+                 concluidas: int | None = None, meses: Sequence[str] | None = None,
+                 com_qtd_arquivos: bool = True,
+                 periodo: tuple[str, datetime | None, datetime | None] | None = None,
+                 arquivadas: bool = False, com_totais: bool = False):
+        """Lista apenas as colunas pedidas, como linhas leves (tuplas nomeadas), ordenadas por ID.
+
+        Datas e booleanos vêm crus; a formatação fica a cargo de quem exibe.
+        Com `com_qtd_arquivos`, inclui `qtd_arquivos` calculado por subconsulta;
+        com `com_totais`, também `total_paginas` e `total_bytes` dos PDFs.
+        `periodo=(campo, inicio, fim)` filtra `inicio <= data < fim` na coluna
+        indexada de CAMPOS_DATA e ordena por ela. Com `arquivadas`, consulta o
+        arquivo morto em vez das tabelas quentes.
+        """
+        try:
+            modelo, modelo_arquivo = _modelos(arquivadas)
+            selecionadas = [getattr(modelo, COLUNAS_PROJECAO[c].key) for c in colunas]
+            if com_qtd_arquivos:
+                selecionadas.append(
+                    select(func.count(modelo_arquivo.id))
+                    .where(modelo_arquivo.materia_id == modelo.id)
+                    .correlate(modelo)
+                    .scalar_subquery()
+                    .label("qtd_arquivos")
+                )
+            if com_totais:
+                for rotulo, coluna in (("total_paginas", modelo_arquivo.paginas), ("total_bytes", modelo_arquivo.tamanho_bytes)):
+                    selecionadas.append(
+                        select(func.coalesce(func.sum(coluna), 0))
+                        .where(modelo_arquivo.materia_id == modelo.id)
+                        .correlate(modelo)
+                        .scalar_subquery()
+                        .label(rotulo)
+                    )
+            stmt = select(*selecionadas).order_by(modelo.id)
+            if concluidas is not None:
+                stmt = stmt.where(modelo.concluida == bool(concluidas))
+            if meses:
+                # mes_inicio é gravado em minúsculas (migração 5): comparação direta usa idx_mes_inicio
+                stmt = stmt.where(modelo.mes_inicio.in_([m.lower() for m in meses]))
+            if periodo:
+                campo, inicio, fim = periodo
+                coluna = getattr(modelo, CAMPOS_DATA[campo].key)
+                stmt = stmt.where(*_filtro_periodo(coluna, inicio, fim))
+                stmt = stmt.order_by(None).order_by(coluna, modelo.id)
+
+            with sessao_leitura() as session:
+                linhas = session.execute(stmt).all()
+                registrar_log("Listagem de matérias (projeção) realizada.", funcao="projetar")
+                return linhas
+        except Exception as e:
+            registrar_log(f"Erro ao listar matérias: {e}", tipo="ERRO", funcao="projetar")
+            mostrar_erro(f"Erro ao listar matérias: {e}")
+            return []
+
+    @staticmethod
+    def arquivos_por_materia(ids: Sequence[int], arquivadas: bool = False) -> dict[int, Sequence[str]]:
+        """Retorna os nomes de arquivos das matérias informadas, agrupados por ID."""
+        resultado = {i: [] for i in ids}
+        if not ids:
+            return resultado
+        try:
+            _, modelo_arquivo = _modelos(arquivadas)
+            with sessao_leitura() as session:
+                for materia_id, nome_arquivo in session.execute(
+                    select(modelo_arquivo.materia_id, modelo_arquivo.nome_arquivo)
+                    .where(modelo_arquivo.materia_id.in_(ids))
+                    .order_by(modelo_arquivo.id)
+                ):
+                    resultado[materia_id].append(nome_arquivo)
+            return resultado
+        except Exception as e:
+            registrar_log(f"Erro ao buscar arquivos das matérias: {e}", tipo="ERRO", funcao="arquivos_por_materia")
+            mostrar_erro(f"Erro ao buscar arquivos das matérias: {e}")
+            return resultado
+
+    @staticmethod
+    def sincronizar_arquivos(alteracoes: dict[int, tuple[Sequence[str], Sequence[str]]]) -> tuple[int, int]:
+        """Aplica, numa única transação, inclusões e remoções de PDFs por matéria.
+
+        `alteracoes` mapeia o ID da matéria para (novos, removidos).
+        Retorna (inseridos, removidos).
+        """
+        novos = [
+            {"materia_id": materia_id, "nome_arquivo": nome}
+            for materia_id, (inclusoes, _) in alteracoes.items()
+            for nome in inclusoes
+        ]
+        total_removidos = 0
+        try:
+            with SessionLocal() as session:
+                if novos:
+                    session.execute(insert(ArquivoMateria), novos)
+                for materia_id, (_, remocoes) in alteracoes.items():
+                    if remocoes:
+                        total_removidos += session.execute(
+                            delete(ArquivoMateria).where(
+                                ArquivoMateria.materia_id == materia_id,
+                                ArquivoMateria.nome_arquivo.in_(remocoes),
+                            )
+                        ).rowcount
+                session.commit()
+            registrar_log(f"Sincronização: {len(novos)} PDFs inseridos, {total_removidos} removidos.",
+                          funcao="sincronizar_arquivos")
+            return len(novos), total_removidos
+        except Exception as e:
+            registrar_log(f"Erro ao sincronizar arquivos: {e}", tipo="ERRO", funcao="sincronizar_arquivos")
+            mostrar_erro(f"Erro ao sincronizar arquivos: {e}")
+            return 0, 0
+
+    @staticmethod
+    def existe_nome(nome: str) -> bool:
+        """Verifica se já existe matéria com o nome informado (sem diferenciar maiúsculas), inclusive arquivada.
+
+        No MySQL a collation padrão já ignora maiúsculas, então a comparação é
+        direta e usa o índice de `nome`; nos demais bancos (SQLite) cai para LOWER().
+        """
+        try:
+            with sessao_leitura() as session:
+                direto = session.get_bind().dialect.name == "mysql"
+                return any(
+                    session.execute(
+                        select(modelo.id).where(
+                            modelo.nome == nome if direto else func.lower(modelo.nome) == nome.lower()
+                        ).limit(1)
+                    ).first() is not None
+                    for modelo in (Materia, MateriaArquivada)
+                )
+        except Exception as e:
+            registrar_log(f"Erro ao verificar nome da matéria: {e}", tipo="ERRO", funcao="existe_nome")
+            mostrar_erro(f"Erro ao verificar nome da matéria: {e}")
+            return False
+
+    @staticmethod
+    def id_por_nome(nome: str) -> int | None:
+        """ID da matéria com o nome informado (sem diferenciar maiúsculas), lido sempre do primário."""
+        try:
+            with SessionLocal() as session:
+                return session.execute(
+                    select(Materia.id).where(func.lower(Materia.nome) == nome.lower()).limit(1)
+                ).scalar()
+        except Exception as e:
+            registrar_log(f"Erro ao buscar matéria por nome: {e}", tipo="ERRO", funcao="id_por_nome")
+            mostrar_erro(f"Erro ao buscar matéria por nome: {e}")
+            return None
+
     @staticmethod
     def get(id_materia: int):
         """Busca uma matéria pelo ID"""
         try:
-            with SessionLocal() as session:
+            with sessao_leitura() as session:
                 return session.query(Materia).filter(Materia.id == id_materia).first()
         except Exception as e:
             registrar_log(f"Erro ao buscar matéria ID {id_materia}: {e}", tipo="ERRO", funcao="get")
@@ -160,23 +654,120 @@ class MateriaRepository:
             return None
 
     @staticmethod
-    def update_concluida(id_materia: int, status: int = 1):
-        """Atualiza status de conclusão da matéria"""
+    def update_concluida(id_materia: int, status: int = 1, versao: int | None = None):
+        """Atualiza status de conclusão da matéria com UPDATE condicional pela versão.
+
+        Se `versao` não for informada, usa a versão lida no momento da chamada.
+        Levanta ConflitoDeVersao se outra sessão alterou a matéria nesse meio tempo.
+        Retorna True se a matéria foi atualizada e False se não existe ou houve erro.
+        """
         try:
             with SessionLocal() as session:
-                materia = session.query(Materia).filter(Materia.id == id_materia).first()
-                if materia:
-                    materia.concluida = bool(status)
-                    materia.data_conclusao = datetime.now() if status == 1 else None
-                    session.commit()
-                    registrar_log(f"Matéria ID {id_materia} atualizada para concluída={status}", funcao="update_concluida")
-                    mostrar_sucesso(
-                        f"Matéria '{materia.nome}' (ID {id_materia}) marcada como concluída em {materia.data_conclusao}"
-                        if status == 1 else f"Matéria '{materia.nome}' (ID {id_materia}) marcada como não concluída."
+                atual = session.execute(
+                    select(Materia.nome, Materia.versao).where(Materia.id == id_materia)
+                ).first()
+                if atual is None:
+                    return False
+                versao_esperada = atual.versao if versao is None else versao
+
+                data_conclusao = datetime.now() if status == 1 else None
+                resultado = session.execute(
+                    update(Materia)
+                    .where(Materia.id == id_materia, Materia.versao == versao_esperada)
+                    .values(
+                        concluida=bool(status),
+                        data_conclusao=data_conclusao,
+                        versao=Materia.versao + 1,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if resultado.rowcount != 1:
+                    session.rollback()
+                    registrar_log(
+                        f"Conflito de versão ao atualizar matéria ID {id_materia} (versão {versao_esperada})",
+                        tipo="WARNING", funcao="update_concluida"
                     )
+                    raise ConflitoDeVersao(id_materia, versao_esperada)
+                session.commit()
+
+                registrar_log(f"Matéria ID {id_materia} atualizada para concluída={status}", funcao="update_concluida")
+                mostrar_sucesso(
+                    f"Matéria '{atual.nome}' (ID {id_materia}) marcada como concluída em {data_conclusao}"
+                    if status == 1 else f"Matéria '{atual.nome}' (ID {id_materia}) marcada como não concluída."
+                )
+                return True
+        except ConflitoDeVersao:
+            raise
         except Exception as e:
             registrar_log(f"Erro ao atualizar matéria ID {id_materia}: {e}", tipo="ERRO", funcao="update_concluida")
             mostrar_erro(f"Erro ao atualizar matéria: {e}")
+            return False
+
+    @staticmethod
+    def _filtro_lote(ids: Sequence[int] | None = None, intervalos: Sequence[tuple[int, int]] | None = None,
+                     meses: Sequence[str] | None = None):
+        """Monta o WHERE de uma operação em lote (IDs avulsos, intervalos de IDs e/ou meses)."""
+        condicoes_id = []
+        if ids:
+            condicoes_id.append(Materia.id.in_(ids))
+        for inicio, fim in intervalos or []:
+            condicoes_id.append(Materia.id.between(inicio, fim))
+
+        filtros = []
+        if condicoes_id:
+            filtros.append(or_(*condicoes_id))
+        if meses:
+            filtros.append(Materia.mes_inicio.in_([m.lower() for m in meses]))
+        if not filtros:
+            raise ValueError("Informe ao menos um ID, intervalo de IDs ou mês para a operação em lote.")
+        return filtros
+
+    @staticmethod
+    def contar_lote(ids: Sequence[int] | None = None, intervalos: Sequence[tuple[int, int]] | None = None,
+                    meses: Sequence[str] | None = None, status: int = 1) -> int:
+        """Conta quantas matérias do lote ainda não estão no status desejado."""
+        try:
+            filtros = MateriaRepository._filtro_lote(ids, intervalos, meses)
+            with sessao_leitura() as session:
+                return session.execute(
+                    select(func.count(Materia.id)).where(*filtros, Materia.concluida != bool(status))
+                ).scalar_one()
+        except Exception as e:
+            registrar_log(f"Erro ao contar lote: {e}", tipo="ERRO", funcao="contar_lote")
+            mostrar_erro(f"Erro ao contar matérias do lote: {e}")
+            return 0
+
+    @staticmethod
+    def update_concluida_lote(ids: Sequence[int] | None = None, intervalos: Sequence[tuple[int, int]] | None = None,
+                              meses: Sequence[str] | None = None, status: int = 1) -> int:
+        """Conclui (ou reabre) várias matérias com um único UPDATE e retorna quantas foram afetadas.
+
+        A data de conclusão é a hora local da aplicação, como em `update_concluida`
+        (o NOW() do SQLite seria UTC). Matérias que já estão no status desejado
+        não são tocadas, preservando a data original.
+        """
+        try:
+            filtros = MateriaRepository._filtro_lote(ids, intervalos, meses)
+            with SessionLocal() as session:
+                resultado = session.execute(
+                    update(Materia)
+                    .where(*filtros, Materia.concluida != bool(status))
+                    .values(
+                        concluida=bool(status),
+                        data_conclusao=datetime.now() if status == 1 else None,
+                        versao=Materia.versao + 1,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                session.commit()
+                afetadas = resultado.rowcount
+                registrar_log(f"{afetadas} matérias atualizadas em lote para concluída={status}",
+                              funcao="update_concluida_lote")
+                return afetadas
+        except Exception as e:
+            registrar_log(f"Erro ao atualizar matérias em lote: {e}", tipo="ERRO", funcao="update_concluida_lote")
+            mostrar_erro(f"Erro ao atualizar matérias em lote: {e}")
+            return 0
 
     @staticmethod
     def delete_all():
@@ -207,30 +798,325 @@ class MateriaRepository:
             mostrar_erro(f"Erro ao remover objeto: {e}")
             return False
 
+    # -----------------------------
+    # Metadados dos PDFs
+    # -----------------------------
+    @staticmethod
+    def arquivos_para_metadados(materia_ids: Sequence[int] | None = None, reprocessar: bool = False,
+                                coluna: str = "tamanho_bytes"):
+        """Arquivos a enriquecer: linhas (id, nome_arquivo, pasta_pdf). Por padrão, só os com `coluna` vazia."""
+        try:
+            stmt = (
+                select(ArquivoMateria.id, ArquivoMateria.nome_arquivo, Materia.pasta_pdf)
+                .join(Materia, Materia.id == ArquivoMateria.materia_id)
+                .order_by(ArquivoMateria.id)
+            )
+            if materia_ids is not None:
+                stmt = stmt.where(ArquivoMateria.materia_id.in_(list(materia_ids)))
+            if not reprocessar:
+                stmt = stmt.where(getattr(ArquivoMateria, coluna).is_(None))
+            with SessionLocal() as session:
+                return session.execute(stmt).all()
+        except Exception as e:
+            registrar_log(f"Erro ao buscar arquivos sem metadados: {e}", tipo="ERRO", funcao="arquivos_para_metadados")
+            mostrar_erro(f"Erro ao buscar arquivos sem metadados: {e}")
+            return []
+
+    @staticmethod
+    def arquivos_com_digest(materia_ids: Sequence[int] | None = None):
+        """Arquivos que já têm digest: linhas (id, nome_arquivo, pasta_pdf, digest)."""
+        try:
+            stmt = (
+                select(ArquivoMateria.id, ArquivoMateria.nome_arquivo, Materia.pasta_pdf, ArquivoMateria.digest)
+                .join(Materia, Materia.id == ArquivoMateria.materia_id)
+                .where(ArquivoMateria.digest.is_not(None))
+                .order_by(ArquivoMateria.id)
+            )
+            if materia_ids is not None:
+                stmt = stmt.where(ArquivoMateria.materia_id.in_(list(materia_ids)))
+            with SessionLocal() as session:
+                return session.execute(stmt).all()
+        except Exception as e:
+            registrar_log(f"Erro ao buscar arquivos com digest: {e}", tipo="ERRO", funcao="arquivos_com_digest")
+            mostrar_erro(f"Erro ao buscar arquivos com digest: {e}")
+            return []
+
+    @staticmethod
+    def gravar_metadados(linhas: Sequence[dict], tamanho_lote: int = 500) -> int:
+        """Grava metadados ([{id, paginas, titulo, tamanho_bytes}] ou [{id, digest}]) em UPDATEs em lote por chave primária."""
+        try:
+            with SessionLocal() as session:
+                for inicio in range(0, len(linhas), tamanho_lote):
+                    session.execute(update(ArquivoMateria), list(linhas[inicio:inicio + tamanho_lote]))
+                session.commit()
+            return len(linhas)
+        except Exception as e:
+            registrar_log(f"Erro ao gravar metadados dos PDFs: {e}", tipo="ERRO", funcao="gravar_metadados")
+            mostrar_erro(f"Erro ao gravar metadados dos PDFs: {e}")
+            return 0
+
+    @staticmethod
+    def arquivos_da_materia(materia_id: int):
+        """PDFs de uma matéria com metadados e digest: linhas (nome_arquivo, paginas, tamanho_bytes, digest)."""
+        try:
+            with sessao_leitura() as session:
+                return session.execute(
+                    select(ArquivoMateria.nome_arquivo, ArquivoMateria.paginas,
+                           ArquivoMateria.tamanho_bytes, ArquivoMateria.digest)
+                    .where(ArquivoMateria.materia_id == materia_id)
+                    .order_by(ArquivoMateria.id)
+                ).all()
+        except Exception as e:
+            registrar_log(f"Erro ao buscar arquivos da matéria: {e}", tipo="ERRO", funcao="arquivos_da_materia")
+            mostrar_erro(f"Erro ao buscar arquivos da matéria: {e}")
+            return []
+
+    # -----------------------------
+    # Verificação de integridade (fsck.py)
+    # -----------------------------
+    @staticmethod
+    def iterar_arquivos(tamanho_lote: int = 1000):
+        """Percorre todos os PDFs em lotes, com cursor do lado do servidor (memória limitada ao lote).
+
+        Gera listas de linhas (id, materia_id, nome_arquivo, tamanho_bytes, digest,
+        pasta_pdf, mes_inicio, nome), ordenadas por ID. Linhas órfãs (matéria
+        inexistente) vêm com pasta_pdf, mes_inicio e nome nulos.
+        """
+        stmt = (
+            select(ArquivoMateria.id, ArquivoMateria.materia_id, ArquivoMateria.nome_arquivo,
+                   ArquivoMateria.tamanho_bytes, ArquivoMateria.digest,
+                   Materia.pasta_pdf, Materia.mes_inicio, Materia.nome)
+            .outerjoin(Materia, Materia.id == ArquivoMateria.materia_id)
+            .order_by(ArquivoMateria.id)
+        )
+        try:
+            with SessionLocal() as session:
+                resultado = session.execute(stmt, execution_options={"yield_per": tamanho_lote})
+                for lote in resultado.partitions():
+                    yield lote
+        except Exception as e:
+            registrar_log(f"Erro ao percorrer os arquivos: {e}", tipo="ERRO", funcao="iterar_arquivos")
+            mostrar_erro(f"Erro ao percorrer os arquivos: {e}")
+
+    @staticmethod
+    def arquivos_por_pasta_organizada(pastas: Sequence[tuple[str, str]]) -> dict[tuple[str, str], set[str]]:
+        """PDFs registrados para cada pasta materias/<mes>/<nome> informada (mês comparado em minúsculas)."""
+        resultado = {(mes.lower(), nome): set() for mes, nome in pastas}
+        if not pastas:
+            return resultado
+        try:
+            with SessionLocal() as session:
+                for mes, nome, nome_arquivo in session.execute(
+                    select(Materia.mes_inicio, Materia.nome, ArquivoMateria.nome_arquivo)
+                    .join(ArquivoMateria, ArquivoMateria.materia_id == Materia.id)
+                    .where(Materia.nome.in_({nome for _, nome in pastas}))
+                ):
+                    chave = (mes.lower(), nome)
+                    if chave in resultado:
+                        resultado[chave].add(nome_arquivo)
+            return resultado
+        except Exception as e:
+            registrar_log(f"Erro ao buscar arquivos das pastas organizadas: {e}", tipo="ERRO",
+                          funcao="arquivos_por_pasta_organizada")
+            mostrar_erro(f"Erro ao buscar arquivos das pastas organizadas: {e}")
+            return resultado
+
+    @staticmethod
+    def remover_arquivos(ids: Sequence[int], tamanho_lote: int = 1000) -> int:
+        """Remove linhas de arquivos_materia por ID, um lote por transação. Retorna quantas saíram."""
+        removidas = 0
+        try:
+            for inicio in range(0, len(ids), tamanho_lote):
+                with SessionLocal() as session:
+                    removidas += session.execute(
+                        delete(ArquivoMateria).where(ArquivoMateria.id.in_(list(ids[inicio:inicio + tamanho_lote])))
+                    ).rowcount
+                    session.commit()
+            registrar_log(f"{removidas} linhas removidas de arquivos_materia.", funcao="remover_arquivos")
+            return removidas
+        except Exception as e:
+            registrar_log(f"Erro ao remover arquivos: {e}", tipo="ERRO", funcao="remover_arquivos")
+            mostrar_erro(f"Erro ao remover arquivos: {e}")
+            return removidas
+
+    # -----------------------------
+    # Arquivo morto
+    # -----------------------------
+    @staticmethod
+    def candidatas_arquivamento(idade_dias: int):
+        """Matérias concluídas há mais de `idade_dias` dias: linhas (id, nome, mes_inicio, data_conclusao)."""
+        try:
+            limite = datetime.now() - timedelta(days=idade_dias)
+            with sessao_leitura() as session:
+                return session.execute(
+                    select(Materia.id, Materia.nome, Materia.mes_inicio, Materia.data_conclusao)
+                    .where(Materia.concluida.is_(True), Materia.data_conclusao < limite)
+                    .order_by(Materia.data_conclusao, Materia.id)
+                ).all()
+        except Exception as e:
+            registrar_log(f"Erro ao buscar matérias para arquivar: {e}", tipo="ERRO", funcao="candidatas_arquivamento")
+            mostrar_erro(f"Erro ao buscar matérias para arquivar: {e}")
+            return []
+
+    @staticmethod
+    def arquivar(pacotes: dict[int, str | None]) -> Sequence[int]:
+        """Move as matérias (id -> pacote zip dos PDFs) e seus arquivos para o arquivo morto.
+
+        Tudo numa transação, com INSERT ... SELECT + DELETE: nada é hidratado
+        em Python. Só matérias ainda concluídas são movidas; retorna os IDs movidos.
+        """
+        if not pacotes:
+            return []
+        colunas = ("id", "nome", "pasta_pdf", "mes_inicio", "concluida", "data_criacao", "data_conclusao", "versao")
+        try:
+            with SessionLocal() as session:
+                ids = session.execute(
+                    select(Materia.id).where(Materia.id.in_(list(pacotes)), Materia.concluida.is_(True))
+                ).scalars().all()
+                if not ids:
+                    return []
+                session.execute(insert(MateriaArquivada).from_select(
+                    colunas, select(*(getattr(Materia, c) for c in colunas)).where(Materia.id.in_(ids))
+                ))
+                colunas_arquivo = ("id", "materia_id", "nome_arquivo", "paginas", "titulo", "tamanho_bytes", "digest")
+                session.execute(insert(ArquivoMateriaArquivado).from_select(
+                    colunas_arquivo,
+                    select(*(getattr(ArquivoMateria, c) for c in colunas_arquivo))
+                    .where(ArquivoMateria.materia_id.in_(ids))
+                ))
+                for pacote in {pacotes[i] for i in ids} - {None}:
+                    session.execute(
+                        update(MateriaArquivada)
+                        .where(MateriaArquivada.id.in_([i for i in ids if pacotes[i] == pacote]))
+                        .values(pacote=pacote)
+                    )
+                session.execute(delete(ArquivoMateria).where(ArquivoMateria.materia_id.in_(ids)))
+                session.execute(delete(Materia).where(Materia.id.in_(ids)))
+                session.commit()
+                registrar_log(f"{len(ids)} matérias movidas para o arquivo morto.", funcao="arquivar")
+                return ids
+        except Exception as e:
+            registrar_log(f"Erro ao arquivar matérias: {e}", tipo="ERRO", funcao="arquivar")
+            mostrar_erro(f"Erro ao arquivar matérias: {e}")
+            return []
+
+    @staticmethod
+    def arquivadas(ids: Sequence[int]):
+        """Linhas (id, nome, mes_inicio, pacote) das matérias arquivadas informadas."""
+        try:
+            with sessao_leitura() as session:
+                return session.execute(
+                    select(MateriaArquivada.id, MateriaArquivada.nome, MateriaArquivada.mes_inicio, MateriaArquivada.pacote)
+                    .where(MateriaArquivada.id.in_(ids))
+                    .order_by(MateriaArquivada.id)
+                ).all()
+        except Exception as e:
+            registrar_log(f"Erro ao buscar matérias arquivadas: {e}", tipo="ERRO", funcao="arquivadas")
+            mostrar_erro(f"Erro ao buscar matérias arquivadas: {e}")
+            return []
+
+    @staticmethod
+    def restaurar(ids: Sequence[int]) -> dict[int, int]:
+        """Devolve matérias do arquivo morto às tabelas quentes. Retorna {id arquivado: id restaurado}.
+
+        O ID original é mantido; se ele já tiver sido reutilizado por outra
+        matéria, a restaurada recebe um ID novo.
+        """
+        if not ids:
+            return {}
+        try:
+            with SessionLocal() as session:
+                arquivadas = session.query(MateriaArquivada).filter(MateriaArquivada.id.in_(ids)).all()
+                ocupados = set(session.execute(
+                    select(Materia.id).where(Materia.id.in_([m.id for m in arquivadas]))
+                ).scalars())
+                novos_ids = {}
+                for arquivada in arquivadas:
+                    materia = Materia(
+                        id=None if arquivada.id in ocupados else arquivada.id,
+                        nome=arquivada.nome,
+                        pasta_pdf=arquivada.pasta_pdf,
+                        mes_inicio=arquivada.mes_inicio,
+                        concluida=arquivada.concluida,
+                        data_criacao=arquivada.data_criacao,
+                        data_conclusao=arquivada.data_conclusao,
+                        arquivos=[
+                            ArquivoMateria(nome_arquivo=a.nome_arquivo, paginas=a.paginas,
+                                           titulo=a.titulo, tamanho_bytes=a.tamanho_bytes, digest=a.digest)
+                            for a in arquivada.arquivos
+                        ],
+                    )
+                    session.add(materia)
+                    session.flush()
+                    novos_ids[arquivada.id] = materia.id
+                    session.delete(arquivada)
+                session.commit()
+                registrar_log(f"{len(novos_ids)} matérias restauradas do arquivo morto.", funcao="restaurar")
+                return novos_ids
+        except Exception as e:
+            registrar_log(f"Erro ao restaurar matérias: {e}", tipo="ERRO", funcao="restaurar")
+            mostrar_erro(f"Erro ao restaurar matérias: {e}")
+            return {}
+
     @staticmethod
     def buscar_por_mes(mes: str):
         """Busca matérias por mês"""
         try:
-            with SessionLocal() as session:
-                return session.query(Materia).filter(Materia.mes_inicio == mes).all()
+            with sessao_leitura() as session:
+                return session.query(Materia).filter(Materia.mes_inicio == mes.lower()).all()
         except Exception as e:
             registrar_log(f"Erro ao buscar matérias por mês: {e}", tipo="ERRO", funcao="buscar_por_mes")
             mostrar_erro(f"Erro ao buscar matérias por mês: {e}")
             return []
 
     @staticmethod
-    def buscar_por_periodo(inicio: datetime, fim: datetime):
-        """Busca matérias por intervalo de datas"""
+    def buscar_por_periodo(inicio: datetime, fim: datetime, campo: str = "criacao"):
+        """Busca matérias por intervalo de datas (inclusivo) em data_criacao ou data_conclusao"""
         try:
-            with SessionLocal() as session:
+            coluna = CAMPOS_DATA[campo]
+            with sessao_leitura() as session:
                 return session.query(Materia).filter(
-                    Materia.data_criacao.between(inicio, fim)
-                ).all()
+                    coluna.between(inicio, fim)
+                ).order_by(coluna).all()
         except Exception as e:
             registrar_log(f"Erro ao buscar matérias por período: {e}", tipo="ERRO", funcao="buscar_por_periodo")
             mostrar_erro(f"Erro ao buscar matérias por período: {e}")
             return []
 
+    @staticmethod
+    def histograma(campo: str = "criacao", granularidade: str = "mes",
+                   inicio: datetime | None = None, fim: datetime | None = None,
+                   incluir_arquivadas: bool = False) -> Sequence[tuple[str, int]]:
+        """Quantidade de matérias criadas/concluídas por semana ou mês, num único GROUP BY.
+
+        O filtro de período usa o índice da coluna; só as linhas do intervalo
+        são agregadas. Com `incluir_arquivadas`, soma também o arquivo morto
+        (UNION ALL das duas tabelas antes do agrupamento).
+        Retorna [(periodo, quantidade)] em ordem cronológica.
+        """
+        try:
+            if granularidade not in GRANULARIDADES:
+                raise ValueError(f"Granularidade inválida: {granularidade}")
+            consultas = []
+            for modelo in (Materia, MateriaArquivada) if incluir_arquivadas else (Materia,):
+                coluna = getattr(modelo, CAMPOS_DATA[campo].key)
+                consultas.append(select(coluna.label("data")).where(*_filtro_periodo(coluna, inicio, fim)))
+            datas = (union_all(*consultas) if len(consultas) > 1 else consultas[0]).subquery()
+            with sessao_leitura() as session:
+                balde = _expr_periodo(datas.c.data, granularidade, session.get_bind().dialect.name).label("periodo")
+                stmt = (
+                    select(balde, func.count().label("quantidade"))
+                    .group_by(balde)
+                    .order_by(balde)
+                )
+                linhas = [(str(periodo), quantidade) for periodo, quantidade in session.execute(stmt)]
+                registrar_log(f"Histograma por {granularidade} de {campo} calculado.", funcao="histograma")
+                return linhas
+        except Exception as e:
+            registrar_log(f"Erro ao calcular histograma: {e}", tipo="ERRO", funcao="histograma")
+            mostrar_erro(f"Erro ao calcular histograma: {e}")
+            return []
+
     # -----------------------------
     # Métodos genéricos de CRUD
     # -----------------------------
@@ -250,13 +1136,25 @@ class MateriaRepository:
 
     @staticmethod
     def update_obj(obj):
-        """Atualiza qualquer objeto no banco"""
+        """Atualiza qualquer objeto no banco.
+
+        Para modelos versionados (Materia) o UPDATE só é aplicado se a versão do
+        objeto ainda for a do banco; caso contrário levanta ConflitoDeVersao.
+        """
         try:
             with SessionLocal() as session:
-                session.merge(obj)
+                mesclado = session.merge(obj)
+                session.flush()
+                nova_versao = getattr(mesclado, "versao", None)
                 session.commit()
+                if nova_versao is not None:
+                    obj.versao = nova_versao
                 registrar_log(f"Objeto {obj} atualizado com sucesso.", funcao="update_obj")
                 return obj
+        except StaleDataError:
+            id_obj = getattr(obj, "id", None)
+            registrar_log(f"Conflito de versão ao atualizar objeto ID {id_obj}", tipo="WARNING", funcao="update_obj")
+            raise ConflitoDeVersao(id_obj, getattr(obj, "versao", None))
         except Exception as e:
             registrar_log(f"Erro ao atualizar objeto: {e}", tipo="ERRO", funcao="update_obj")
             mostrar_erro(f"Erro ao atualizar objeto: {e}")
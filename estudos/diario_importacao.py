@@ -0,0 +1,209 @@
+import os
+import json
+import uuid
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from db import MateriaRepository
+from utils import carregar_config, registrar_log, mostrar_erro, mostrar_aviso, t
+
+# -----------------------------
+# Configurações do diário
+# -----------------------------
+config = carregar_config()
+DIARIO_PATH = Path(__file__).parent / config.get("ingestao", {}).get("diario", "importacoes.jsonl")
+
+# -----------------------------
+# Diário de importações (write-ahead)
+# -----------------------------
+# Arquivo JSON-lines só de acréscimo. Cada importação grava, nesta ordem:
+#   {"op": "inicio", ...}    antes de tocar no banco ou nos arquivos
+#   {"op": "materia", ...}   depois do commit da matéria
+#   {"op": "copiado", ...}   depois de cada PDF copiado (cópia atômica)
+#   {"op": "fim", ...}       quando tudo terminou
+# Ao retomar, o diário é relido e cada importação sem "fim" continua do ponto
+# em que parou: só os PDFs ainda não copiados são copiados.
+@dataclass
+class Importacao:
+    id: str
+    nome: str
+    origem: str
+    mes: str
+    destino: str
+    arquivos: list[str]
+    materia_id: int | None = None
+    copiados: set[str] = field(default_factory=set)
+
+    @property
+    def restantes(self) -> list[str]:
+        return [a for a in self.arquivos if a not in self.copiados]
+
+
+def copiar_atomico(origem: str, destino: str):
+    """Copia para um temporário na pasta de destino e renomeia: o destino nunca fica pela metade."""
+    temporario = os.path.join(os.path.dirname(destino), f".{os.path.basename(destino)}.tmp")
+    shutil.copy2(origem, temporario)
+    with open(temporario, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(temporario, destino)
+
+
+class DiarioImportacao:
+    def __init__(self, caminho: Path = DIARIO_PATH):
+        self.caminho = Path(caminho)
+        self._trava = threading.Lock()
+        self._arquivo = open(self.caminho, "a", encoding="utf-8")
+
+    def _gravar(self, registro: dict, sincronizar: bool = True):
+        with self._trava:
+            self._arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self._arquivo.flush()
+            if sincronizar:
+                os.fsync(self._arquivo.fileno())
+
+    def iniciar(self, nome: str, origem: str, mes: str, destino: str, arquivos: list[str]) -> Importacao:
+        importacao = Importacao(uuid.uuid4().hex, nome, origem, mes, destino, list(arquivos))
+        self._gravar({
+            "op": "inicio", "id": importacao.id, "nome": nome, "origem": origem,
+            "mes": mes, "destino": destino, "arquivos": importacao.arquivos,
+        })
+        return importacao
+
+    def registrar_materia(self, importacao: Importacao, materia_id: int):
+        importacao.materia_id = materia_id
+        self._gravar({"op": "materia", "id": importacao.id, "materia_id": materia_id})
+
+    def registrar_copia(self, importacao: Importacao, arquivo: str):
+        # Sem fsync por arquivo: a cópia atômica já garante que um destino existente está completo
+        importacao.copiados.add(arquivo)
+        self._gravar({"op": "copiado", "id": importacao.id, "arquivo": arquivo}, sincronizar=False)
+
+    def concluir(self, importacao: Importacao):
+        self._gravar({"op": "fim", "id": importacao.id})
+
+    def pendentes(self) -> list[Importacao]:
+        """Relê o diário e retorna as importações iniciadas e não concluídas."""
+        importacoes = {}
+        with open(self.caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    continue   # última linha truncada por uma queda no meio da escrita
+                op, id_importacao = registro.get("op"), registro.get("id")
+                if op == "inicio":
+                    importacoes[id_importacao] = Importacao(
+                        id_importacao, registro["nome"], registro["origem"], registro["mes"],
+                        registro["destino"], registro["arquivos"],
+                    )
+                elif id_importacao not in importacoes:
+                    continue
+                elif op == "materia":
+                    importacoes[id_importacao].materia_id = registro["materia_id"]
+                elif op == "copiado":
+                    importacoes[id_importacao].copiados.add(registro["arquivo"])
+                elif op == "fim":
+                    del importacoes[id_importacao]
+        return list(importacoes.values())
+
+    def compactar(self):
+        """Reescreve o diário só com as importações pendentes (vazio quando não há nenhuma)."""
+        pendentes = self.pendentes()
+        with self._trava:
+            self._arquivo.close()
+            temporario = self.caminho.with_suffix(".tmp")
+            with open(temporario, "w", encoding="utf-8") as f:
+                for imp in pendentes:
+                    f.write(json.dumps({
+                        "op": "inicio", "id": imp.id, "nome": imp.nome, "origem": imp.origem,
+                        "mes": imp.mes, "destino": imp.destino, "arquivos": imp.arquivos,
+                    }, ensure_ascii=False) + "\n")
+                    if imp.materia_id is not None:
+                        f.write(json.dumps({"op": "materia", "id": imp.id, "materia_id": imp.materia_id}) + "\n")
+                    for arquivo in sorted(imp.copiados):
+                        f.write(json.dumps({"op": "copiado", "id": imp.id, "arquivo": arquivo}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.caminho)
+            self._arquivo = open(self.caminho, "a", encoding="utf-8")
+
+
+_diario = None
+
+def obter_diario() -> DiarioImportacao:
+    """Retorna o diário compartilhado do processo (criado na primeira chamada)."""
+    global _diario
+    if _diario is None:
+        _diario = DiarioImportacao()
+    return _diario
+
+# -----------------------------
+# Execução / retomada
+# -----------------------------
+def garantir_materia(diario: DiarioImportacao, importacao: Importacao) -> int | None:
+    """Cadastra a matéria da importação, se ainda não foi. Idempotente após uma queda."""
+    if importacao.materia_id is None:
+        # Queda entre o commit e o registro no diário: a matéria já existe com esse nome
+        materia_id = MateriaRepository.id_por_nome(importacao.nome)
+        if materia_id is None:
+            materia_id = MateriaRepository.insert(importacao.nome, importacao.origem, importacao.mes, importacao.arquivos)
+        if materia_id is None:
+            return None
+        diario.registrar_materia(importacao, materia_id)
+    return importacao.materia_id
+
+
+def copiar_restantes(diario: DiarioImportacao, importacao: Importacao) -> int:
+    """Copia só os PDFs que faltam e registra cada um no diário. Retorna quantos foram copiados agora."""
+    os.makedirs(importacao.destino, exist_ok=True)
+    copiados = 0
+    for arquivo in importacao.restantes:
+        origem = os.path.join(importacao.origem, arquivo)
+        destino = os.path.join(importacao.destino, arquivo)
+        if not (os.path.exists(destino) and os.path.getsize(destino) == os.path.getsize(origem)):
+            copiar_atomico(origem, destino)
+            copiados += 1
+        diario.registrar_copia(importacao, arquivo)
+    return copiados
+
+
+def executar_importacao(importacao: Importacao, diario: DiarioImportacao | None = None) -> int | None:
+    """Leva uma importação até o fim (matéria no banco + PDFs copiados). Retorna o ID da matéria."""
+    diario = diario or obter_diario()
+    materia_id = garantir_materia(diario, importacao)
+    if materia_id is None:
+        return None
+    try:
+        copiar_restantes(diario, importacao)
+    except OSError as e:
+        registrar_log(f"Importação de '{importacao.nome}' interrompida: {e}", tipo="ERRO", funcao="executar_importacao")
+        mostrar_erro(t("importacao.erro_copia", nome=importacao.nome, erro=e))
+        return None
+    diario.concluir(importacao)
+    return materia_id
+
+
+def retomar_importacoes() -> int:
+    """Conclui as importações interrompidas registradas no diário. Retorna quantas foram concluídas."""
+    diario = obter_diario()
+    pendentes = diario.pendentes()
+    if not pendentes:
+        diario.compactar()   # só havia importações concluídas: esvazia o diário
+        return 0
+    mostrar_aviso(t("importacao.retomando", n=len(pendentes)))
+    concluidas = 0
+    for importacao in pendentes:
+        if not os.path.isdir(importacao.origem):
+            mostrar_erro(t("importacao.origem_sumiu", nome=importacao.nome, origem=importacao.origem))
+            continue
+        faltavam = len(importacao.restantes)
+        if executar_importacao(importacao, diario) is not None:
+            concluidas += 1
+            registrar_log(
+                f"Importação de '{importacao.nome}' retomada: {faltavam} de {len(importacao.arquivos)} PDFs restantes.",
+                funcao="retomar_importacoes",
+            )
+    diario.compactar()
+    return concluidas
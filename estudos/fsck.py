@@ -0,0 +1,263 @@
+import os
+import time
+import shutil
+from collections import Counter, namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from db import MateriaRepository
+from diario_importacao import copiar_atomico
+from materias import pasta_organizada
+from previews import digest_arquivo
+from utils import carregar_config, registrar_log, mostrar_erro, mostrar_aviso, mostrar_sucesso, formatar_tabela, t
+
+# -----------------------------
+# Configurações da verificação
+# -----------------------------
+config = carregar_config()
+_cfg_fsck = config.get("fsck", {})
+WORKERS = int(_cfg_fsck.get("workers") or min(32, (os.cpu_count() or 1) * 4))
+TAMANHO_LOTE = int(_cfg_fsck.get("tamanho_lote", 1000))
+EXEMPLOS = int(_cfg_fsck.get("exemplos", 10))
+# Cópias órfãs não são apagadas: vão para <quarentena>/<mes>/<nome>/, para conferência manual
+PASTA_QUARENTENA = _cfg_fsck.get("quarentena", "materias_quarentena")
+
+# Temporários de cópias atômicas mais novos que isso podem ser de uma importação em andamento
+IDADE_MINIMA_TEMPORARIO = 3600
+
+# -----------------------------
+# Achados
+# -----------------------------
+# Cada problema encontrado vira um Achado. Os tipos reparáveis são corrigidos
+# com --reparar; os demais (pasta inacessível, erro de leitura) só são
+# relatados, porque corrigi-los exigiria apagar dados que podem voltar
+# (ex.: um HD externo desmontado). Nenhum reparo apaga a última cópia de um PDF:
+# sem a origem, a cópia organizada é devolvida à pasta de origem; cópias sem
+# registro vão para a quarentena. `origem` é de onde o reparo copia `caminho`.
+Achado = namedtuple("Achado", ["tipo", "arquivo_id", "materia_id", "caminho", "origem"])
+
+# Tipos de achado; o rótulo de cada um está nos catálogos (fsck.tipo_<tipo>)
+TIPOS = (
+    "linha_orfa", "origem_ausente", "origem_ausente_com_copia", "pasta_inacessivel", "erro_leitura",
+    "copia_ausente", "copia_corrompida", "metadados_desatualizados", "copia_orfa", "temporario",
+)
+
+
+@lru_cache(maxsize=65536)
+def _pasta_existe(pasta: str) -> bool:
+    return os.path.isdir(pasta)
+
+
+def _raiz_copias() -> str:
+    return os.path.join(os.getcwd(), "materias")   # raiz de pasta_organizada
+
+
+def verificar_arquivo(linha, com_hash: bool = False) -> list[Achado]:
+    """Confere uma linha de arquivos_materia com a origem e a cópia organizada. Roda nas threads do pool."""
+    if linha.pasta_pdf is None:
+        return [Achado("linha_orfa", linha.id, linha.materia_id, linha.nome_arquivo, None)]
+
+    def achado(tipo, caminho, origem=None):
+        return [Achado(tipo, linha.id, linha.materia_id, caminho, origem)]
+
+    origem = os.path.join(linha.pasta_pdf, linha.nome_arquivo)
+    if not _pasta_existe(linha.pasta_pdf):
+        return achado("pasta_inacessivel", origem)
+    copia = os.path.join(pasta_organizada(linha.mes_inicio, linha.nome), linha.nome_arquivo)
+    try:
+        st_origem = os.stat(origem)
+    except FileNotFoundError:
+        if os.path.isfile(copia):
+            return achado("origem_ausente_com_copia", origem, copia)
+        return achado("origem_ausente", origem)
+    except OSError:
+        return achado("erro_leitura", origem)
+
+    achados = []
+    try:
+        digest = digest_arquivo(origem) if com_hash else None
+    except OSError:
+        return achado("erro_leitura", origem)
+    if (linha.tamanho_bytes is not None and linha.tamanho_bytes != st_origem.st_size) or \
+            (digest and linha.digest and linha.digest != digest):
+        achados += achado("metadados_desatualizados", origem)
+
+    # Sem a pasta organizada, a matéria foi ingerida sem cópia (--sem-copia): nada a conferir
+    if _pasta_existe(os.path.dirname(copia)):
+        try:
+            if os.stat(copia).st_size != st_origem.st_size or (digest and digest_arquivo(copia) != digest):
+                achados += achado("copia_corrompida", copia, origem)
+        except FileNotFoundError:
+            achados += achado("copia_ausente", copia, origem)
+        except OSError:
+            achados += achado("erro_leitura", copia)
+    return achados
+
+
+def _varrer_copias(raiz: str, tamanho_lote: int = TAMANHO_LOTE):
+    """Gera os achados de materias/<mes>/<nome>: PDFs sem registro e temporários abandonados.
+
+    As pastas são consultadas no banco em lotes de `tamanho_lote`, sem carregar o catálogo inteiro.
+    """
+    def conferir(lote):
+        registrados = MateriaRepository.arquivos_por_pasta_organizada([(mes, nome) for mes, nome, _ in lote])
+        limite_tmp = time.time() - IDADE_MINIMA_TEMPORARIO
+        for mes, nome, pasta in lote:
+            esperados = registrados.get((mes.lower(), nome), set())
+            try:
+                entradas = list(os.scandir(pasta))
+            except OSError:
+                continue
+            for entrada in entradas:
+                if not entrada.is_file():
+                    continue
+                if entrada.name.startswith(".") and entrada.name.endswith(".tmp"):
+                    if entrada.stat().st_mtime < limite_tmp:
+                        yield Achado("temporario", None, None, entrada.path, None)
+                elif entrada.name.lower().endswith(".pdf") and entrada.name not in esperados:
+                    yield Achado("copia_orfa", None, None, entrada.path, None)
+
+    lote = []
+    try:
+        meses = [e for e in os.scandir(raiz) if e.is_dir()]
+    except FileNotFoundError:
+        return
+    for mes in meses:
+        for materia in os.scandir(mes.path):
+            if materia.is_dir():
+                lote.append((mes.name, materia.name, materia.path))
+                if len(lote) >= tamanho_lote:
+                    yield from conferir(lote)
+                    lote = []
+    if lote:
+        yield from conferir(lote)
+
+# -----------------------------
+# Reparos (em lotes)
+# -----------------------------
+def _reparar(pendentes: dict[str, list[Achado]], workers: int, tamanho_lote: int) -> Counter:
+    """Aplica os reparos acumulados na verificação. Retorna quantos de cada tipo foram corrigidos."""
+    reparados = Counter()
+
+    # Linhas sem matéria ou sem PDF em lugar nenhum saem do banco, como o monitor faria ao ver a remoção
+    for tipo in ("linha_orfa", "origem_ausente"):
+        if pendentes[tipo]:
+            reparados[tipo] = MateriaRepository.remover_arquivos([a.arquivo_id for a in pendentes[tipo]], tamanho_lote)
+
+    # Metadados zerados são reextraídos (e os previews regerados) só para as matérias afetadas
+    desatualizados = pendentes["metadados_desatualizados"]
+    if desatualizados:
+        from metadados_pdf import enriquecer_metadados
+        from previews import gerar_previews
+        linhas = [{"id": a.arquivo_id, "paginas": None, "titulo": None, "tamanho_bytes": None, "digest": None}
+                  for a in desatualizados]
+        for inicio in range(0, len(linhas), tamanho_lote):
+            reparados["metadados_desatualizados"] += MateriaRepository.gravar_metadados(linhas[inicio:inicio + tamanho_lote])
+        materia_ids = sorted({a.materia_id for a in desatualizados})
+        enriquecer_metadados(materia_ids)
+        gerar_previews(materia_ids)
+
+    def recopiar(a: Achado) -> bool:
+        try:
+            os.makedirs(os.path.dirname(a.caminho), exist_ok=True)
+            copiar_atomico(a.origem, a.caminho)
+            return True
+        except OSError as e:
+            registrar_log(f"Erro ao recopiar {a.origem}: {e}", tipo="ERRO", funcao="_reparar")
+            return False
+
+    def quarentenar(a: Achado) -> bool:
+        destino = os.path.join(os.getcwd(), PASTA_QUARENTENA, os.path.relpath(a.caminho, _raiz_copias()))
+        base, extensao = os.path.splitext(destino)
+        sufixo = 1
+        while os.path.exists(destino):
+            destino, sufixo = f"{base}.{sufixo}{extensao}", sufixo + 1
+        try:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.move(a.caminho, destino)
+            return True
+        except OSError as e:
+            registrar_log(f"Erro ao mover {a.caminho} para a quarentena: {e}", tipo="ERRO", funcao="_reparar")
+            return False
+
+    def remover(a: Achado) -> bool:
+        try:
+            os.remove(a.caminho)
+            return True
+        except OSError as e:
+            registrar_log(f"Erro ao remover {a.caminho}: {e}", tipo="ERRO", funcao="_reparar")
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Temporários saem antes das recópias, que reaproveitam o mesmo nome .tmp
+        for tipo, acao in (("copia_orfa", quarentenar), ("temporario", remover),
+                           ("origem_ausente_com_copia", recopiar),
+                           ("copia_ausente", recopiar), ("copia_corrompida", recopiar)):
+            reparados[tipo] = sum(pool.map(acao, pendentes[tipo]))
+    return reparados
+
+# -----------------------------
+# Verificação completa
+# -----------------------------
+def verificar_integridade(com_hash: bool = False, reparar: bool = False, workers: int = WORKERS,
+                          tamanho_lote: int = TAMANHO_LOTE) -> Counter:
+    """Reconcilia arquivos_materia com as pastas de origem e com as cópias em materias/<mes>/<nome>.
+
+    As linhas vêm do banco em lotes (cursor no servidor) e cada lote é conferido
+    num pool de threads (stat, ou SHA-256 com `com_hash`); só os achados ficam em
+    memória. Com `reparar`, os achados reparáveis são corrigidos ao final, em
+    transações por lote. Retorna a contagem de achados por tipo.
+    """
+    inicio = time.perf_counter()
+    contagem, exemplos = Counter(), defaultdict(list)
+    pendentes = defaultdict(list)
+    verificados = 0
+    _pasta_existe.cache_clear()
+
+    def registrar(achado: Achado):
+        contagem[achado.tipo] += 1
+        if len(exemplos[achado.tipo]) < EXEMPLOS:
+            exemplos[achado.tipo].append(achado.caminho)
+        if reparar:
+            pendentes[achado.tipo].append(achado)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for lote in MateriaRepository.iterar_arquivos(tamanho_lote):
+                for achados in pool.map(verificar_arquivo, lote, [com_hash] * len(lote)):
+                    for achado in achados:
+                        registrar(achado)
+                verificados += len(lote)
+        for achado in _varrer_copias(_raiz_copias(), tamanho_lote):
+            registrar(achado)
+    except Exception as e:
+        registrar_log(f"Erro na verificação de integridade: {e}", tipo="ERRO", funcao="verificar_integridade")
+        mostrar_erro(t("fsck.erro", erro=e))
+        return contagem
+
+    reparados = _reparar(pendentes, workers, tamanho_lote) if reparar and contagem else Counter()
+    segundos = time.perf_counter() - inicio
+    registrar_log(
+        f"fsck: {verificados} PDFs verificados em {segundos:.1f}s, {sum(contagem.values())} achados, "
+        f"{sum(reparados.values())} reparados.",
+        funcao="verificar_integridade",
+    )
+
+    if not contagem:
+        mostrar_sucesso(t("fsck.sem_problemas", verificados=verificados, segundos=segundos))
+        return contagem
+    formatar_tabela(
+        [[t(f"fsck.tipo_{tipo}"), qtd, reparados.get(tipo, "-") if reparar else "-"]
+         for tipo, qtd in contagem.most_common()],
+        [t("fsck.problema"), t("fsck.quantidade"), t("fsck.reparados")],
+    )
+    for tipo, caminhos in exemplos.items():
+        mostrar_aviso(t("fsck.exemplos", tipo=t(f"fsck.tipo_{tipo}"), n=EXEMPLOS))
+        for caminho in caminhos:
+            mostrar_aviso(f"   {caminho}")
+    resumo = {"verificados": verificados, "segundos": segundos, "problemas": sum(contagem.values())}
+    if reparar:
+        mostrar_sucesso(t("fsck.resumo_reparados", reparados=sum(reparados.values()), **resumo))
+    else:
+        mostrar_aviso(t("fsck.resumo", **resumo))
+    return contagem
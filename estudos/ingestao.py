@@ -0,0 +1,141 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from db import MateriaRepository
+from sessao import escrever
+from diario_importacao import obter_diario, copiar_restantes
+from metadados_pdf import enriquecer_metadados
+from materias import mes_por_nome, motivo_pasta_invalida, pasta_organizada
+from utils import (
+    carregar_config,
+    registrar_log,
+    mostrar_erro,
+    mostrar_aviso,
+    mostrar_sucesso,
+    formatar_tabela,
+    listar_pdfs,
+    t,
+)
+
+# -----------------------------
+# Configurações da ingestão
+# -----------------------------
+config = carregar_config()
+_cfg_ingestao = config.get("ingestao", {})
+WORKERS = _cfg_ingestao.get("workers") or os.cpu_count() or 1
+TAMANHO_LOTE = int(_cfg_ingestao.get("tamanho_lote", 200))
+
+# -----------------------------
+# Fases da ingestão
+# -----------------------------
+def descobrir_pastas(raiz: str) -> tuple[list[tuple[str, str, str]], list[tuple[str, str]]]:
+    """Percorre <raiz>/<mes>/<nome> e retorna ([(mes, nome, pasta)], [(caminho, motivo)] ignorados)."""
+    encontradas, ignoradas = [], []
+    with os.scandir(raiz) as meses:
+        for entrada_mes in sorted(meses, key=lambda e: e.name):
+            if not entrada_mes.is_dir():
+                continue
+            mes = mes_por_nome(entrada_mes.name)
+            if not mes:
+                ignoradas.append((entrada_mes.path, t("ingestao.pasta_nao_e_mes")))
+                continue
+            with os.scandir(entrada_mes.path) as materias:
+                for entrada in sorted(materias, key=lambda e: e.name):
+                    if entrada.is_dir():
+                        encontradas.append((mes, entrada.name, entrada.path))
+    return encontradas, ignoradas
+
+
+def ingerir_raiz(raiz: str, workers: int = WORKERS, copiar: bool = True):
+    """Cadastra todas as matérias de uma árvore <raiz>/<mes>/<nome>/*.pdf de uma vez.
+
+    A varredura das pastas roda num pool de processos; a gravação no banco é
+    feita em transações de TAMANHO_LOTE matérias. Exibe o tempo de cada fase.
+    """
+    if not os.path.isdir(raiz):
+        mostrar_erro(t("ingestao.raiz_invalida", raiz=raiz))
+        return []
+
+    tempos = {}   # fase (chave ingestao.fase_*) -> segundos
+
+    # 1. Descoberta de <mes>/<nome>
+    inicio = time.perf_counter()
+    candidatas, ignoradas = descobrir_pastas(raiz)
+    tempos["descoberta"] = time.perf_counter() - inicio
+
+    # 2. Varredura dos PDFs em paralelo
+    inicio = time.perf_counter()
+    pastas = [pasta for _, _, pasta in candidatas]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pdfs_por_pasta = list(pool.map(listar_pdfs, pastas, chunksize=max(1, len(pastas) // (workers * 4))))
+    tempos["varredura"] = time.perf_counter() - inicio
+
+    # 3. Validação (regras de validar_pasta + nomes únicos)
+    inicio = time.perf_counter()
+    existentes = MateriaRepository.nomes_existentes([nome for _, nome, _ in candidatas])
+    vistos = set()
+    validas = []
+    for (mes, nome, pasta), pdfs in zip(candidatas, pdfs_por_pasta):
+        motivo = motivo_pasta_invalida(pasta, pdfs)
+        if not motivo and nome.lower() in existentes:
+            motivo = t("materia.nome_existente")
+        if not motivo and nome.lower() in vistos:
+            motivo = t("ingestao.nome_repetido")
+        if motivo:
+            ignoradas.append((pasta, motivo))
+            continue
+        vistos.add(nome.lower())
+        validas.append((nome, pasta, mes, pdfs))
+    tempos["validacao"] = time.perf_counter() - inicio
+
+    # 4. Gravação em lotes (cada matéria entra no diário antes, para a cópia poder ser retomada)
+    inicio = time.perf_counter()
+    diario = obter_diario()
+    importacoes = [
+        diario.iniciar(nome, pasta, mes, pasta_organizada(mes, nome), pdfs)
+        for nome, pasta, mes, pdfs in validas
+    ] if copiar else []
+    ids = MateriaRepository.insert_lote(validas, tamanho_lote=TAMANHO_LOTE) if validas else []
+    gravadas = validas[:len(ids)]
+    for importacao, materia_id in zip(importacoes, ids):
+        diario.registrar_materia(importacao, materia_id)
+    tempos["gravacao"] = time.perf_counter() - inicio
+
+    # 5. Metadados dos PDFs (páginas, título, tamanho) no mesmo pool de processos
+    if ids:
+        inicio = time.perf_counter()
+        enriquecer_metadados(ids, workers=workers)
+        tempos["metadados"] = time.perf_counter() - inicio
+
+    # 6. Cópia atômica para materias/<mes>/<nome>
+    copiados = 0
+    if copiar and gravadas:
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futuros = {pool.submit(copiar_restantes, diario, imp): imp for imp in importacoes[:len(ids)]}
+            for futuro, importacao in futuros.items():
+                try:
+                    copiados += futuro.result()
+                    diario.concluir(importacao)
+                except OSError as e:
+                    registrar_log(f"Erro ao copiar PDFs: {e}", tipo="ERRO", funcao="ingerir_raiz")
+                    mostrar_erro(t("importacao.erro_copia", nome=importacao.nome, erro=e))
+        tempos["copia"] = time.perf_counter() - inicio
+
+    # Resumo
+    if ignoradas:
+        mostrar_aviso(t("ingestao.ignoradas", n=len(ignoradas)))
+        formatar_tabela([[caminho, motivo] for caminho, motivo in ignoradas], [t("coluna.pasta"), t("coluna.motivo")])
+    escrever()
+    formatar_tabela(
+        [[t(f"ingestao.fase_{fase}"), f"{segundos:.3f}"] for fase, segundos in tempos.items()],
+        [t("coluna.fase"), t("coluna.tempo_s")],
+    )
+    total_pdfs = sum(len(pdfs) for *_, pdfs in gravadas)
+    if copiar:
+        mostrar_sucesso(t("ingestao.resumo_copia", materias=len(gravadas), pdfs=total_pdfs, copiados=copiados))
+    else:
+        mostrar_sucesso(t("ingestao.resumo", materias=len(gravadas), pdfs=total_pdfs))
+    registrar_log(f"Ingestão de '{raiz}': {len(gravadas)} matérias, {len(ignoradas)} ignoradas.", funcao="ingerir_raiz")
+    return ids
@@ -2,13 +2,17 @@ import sys
 import argparse
 
 # Banco de dados
-from db import Base, engine, init_db
+from db import init_db, MateriaRepository
+from cache_local import obter_cache
+from particionamento import obter_catalogo, ATIVO as PARTICIONADO
 
 # Utilitários
-from utils import carregar_config, registrar_log, mostrar_erro, mostrar_sucesso
+from utils import carregar_config, registrar_log, mostrar_erro, mostrar_sucesso, mostrar_aviso, formatar_tabela, t
+from configuracao import iniciar_monitor_config
+from sessao import ler, RoteiroDivergente
 
 # Menu
-from menu import exibir_menu, MSG, interpretar_escolha, mostrar_ajuda
+from menu import exibir_menu, interpretar_escolha, mostrar_ajuda
 
 # Operações com matérias
 from materias import (
@@ -18,15 +22,15 @@ from materias import (
     listar_concluidas,
     listar_nao_concluidas,
     marcar_concluida,
+    marcar_concluidas_lote,
+    listar_por_periodo,
+    listar_previews,
     remover_materia,
     editar_materia
 )
 
 VERSION = "1.2.0"
 
-# Garante que as tabelas sejam criadas no banco
-Base.metadata.create_all(bind=engine)
-
 
 def main():
     """
@@ -39,6 +43,10 @@ def main():
     # ✅ Inicializa o banco de dados antes de qualquer operação
     init_db()
 
+    # 🔹 Importações interrompidas numa execução anterior são concluídas antes do menu
+    from diario_importacao import retomar_importacoes
+    retomar_importacoes()
+
     # 🔹 Logs iniciais
     registrar_log(f"Sistema Estudos Faculdade v{VERSION} iniciado.", funcao="main")
     mostrar_sucesso(f"Sistema Estudos Faculdade v{VERSION} conectado ao banco com sucesso.")
@@ -46,7 +54,7 @@ def main():
     while True:
         try:
             exibir_menu()
-            escolha = input(MSG["choice"]).strip()
+            escolha = ler(t("menu.escolha")).strip()
             acao = interpretar_escolha(escolha)
 
             # 🔹 Loop principal mais limpo com match/case
@@ -58,7 +66,8 @@ def main():
                     mostrar_materias()
                     registrar_log("Listagem de matérias exibida.", funcao="main")
                 case "list_month":
-                    listar_por_mes()
+                    # Com particionamento, só as partições dos semestres pedidos são lidas
+                    listar_por_mes(fonte=obter_catalogo() if PARTICIONADO else MateriaRepository)
                     registrar_log("Listagem de matérias por mês exibida.", funcao="main")
                 case "list_done":
                     listar_concluidas()
@@ -69,6 +78,15 @@ def main():
                 case "mark_done":
                     marcar_concluida()
                     registrar_log("Matéria marcada como concluída.", funcao="main")
+                case "mark_done_batch":
+                    marcar_concluidas_lote()
+                    registrar_log("Matérias atualizadas em lote.", funcao="main")
+                case "list_period":
+                    listar_por_periodo()
+                    registrar_log("Listagem de matérias por período exibida.", funcao="main")
+                case "previews":
+                    listar_previews()
+                    registrar_log("Previews dos PDFs exibidos.", funcao="main")
                 case "edit":
                     editar_materia()
                     registrar_log("Matéria editada.", funcao="main")
@@ -82,14 +100,43 @@ def main():
                     mostrar_ajuda()   # ✅ Agora exibe a versão detalhada da ajuda
                     registrar_log("Ajuda detalhada exibida.", funcao="main")
                 case _:
-                    mostrar_erro(MSG["invalid"])
+                    mostrar_erro(t("menu.invalida"))
 
+        except EOFError:
+            # 🔹 Fim da entrada (Ctrl+D); o fim de um roteiro reproduzido (FimDoRoteiro) sobe até `reproduzir`
+            break
         except Exception as e:
             # 🔹 Tratamento global de exceções
             mostrar_erro(f"Ocorreu um erro inesperado: {e}")
             registrar_log(f"Erro inesperado no main: {e}", tipo="ERRO", funcao="main")
 
 
+def reproduzir_roteiro(caminho: str, repeticoes: int = 1, estrito: bool = False):
+    """Roda o menu sem tela com um roteiro e mostra a vazão (respostas/s) e os passos mais lentos."""
+    from sessao import carregar_roteiro, reproduzir
+    try:
+        entradas = carregar_roteiro(caminho)
+        relatorio = reproduzir(entradas, main, repeticoes=repeticoes, estrito=estrito)
+    except OSError as e:
+        mostrar_erro(f"Não foi possível ler o roteiro: {e}")
+        return None
+    except RoteiroDivergente as e:
+        mostrar_erro(f"Roteiro divergente: {e}")
+        return None
+
+    mostrar_sucesso(
+        f"{relatorio.execucoes} execuções, {relatorio.respostas} respostas em {relatorio.segundos:.2f}s "
+        f"({relatorio.respostas_por_segundo:.1f} respostas/s, {relatorio.linhas_escritas} linhas renderizadas)."
+    )
+    if relatorio.divergencias:
+        mostrar_aviso(f"{relatorio.divergencias} entradas pedidas com um prompt diferente do gravado.")
+    formatar_tabela(
+        [[prompt[:50], f"{segundos * 1000:.1f}"] for prompt, segundos in relatorio.tempo_por_prompt.most_common(10)],
+        ["Passo (prompt)", "Tempo total (ms)"]
+    )
+    return relatorio
+
+
 def cli():
     """
     Interface de linha de comando (CLI).
@@ -103,22 +150,161 @@ def cli():
     parser.add_argument("--concluidas", action="store_true", help="Listar matérias concluídas")
     parser.add_argument("--nao-concluidas", action="store_true", help="Listar matérias não concluídas")
     parser.add_argument("--ajuda", action="store_true", help="Exibir ajuda detalhada")
+    parser.add_argument("--meses", metavar="MESES", help="Listar matérias por meses (ex: março-junho ou janeiro,julho)")
+    parser.add_argument("--ao-vivo", action="store_true", help="Nas listagens, ler direto do banco em vez do cache local")
+    parser.add_argument("--concluir", metavar="IDS", help="Concluir matérias em lote por IDs (ex: 1,4,10-20)")
+    parser.add_argument("--concluir-meses", metavar="MESES", help="Concluir matérias em lote por meses (ex: março-junho)")
+    parser.add_argument("--reabrir", action="store_true", help="Com --concluir/--concluir-meses, marca como em andamento")
+    parser.add_argument("--sim", action="store_true", help="Não pedir confirmação nas operações em lote")
+    parser.add_argument("--periodo", nargs=2, metavar=("INICIO", "FIM"),
+                        help="Listar matérias por período (AAAA-MM-DD; use '' para não limitar um dos lados)")
+    parser.add_argument("--campo", choices=("criacao", "conclusao"), default="criacao",
+                        help="Com --periodo/--histograma, data usada no filtro (padrão: criacao)")
+    parser.add_argument("--histograma", choices=("semana", "mes"),
+                        help="Histograma de matérias criadas/concluídas por semana ou mês")
+    parser.add_argument("--include-archived", action="store_true",
+                        help="Nas listagens e no histograma, incluir também as matérias do arquivo morto")
+    parser.add_argument("--arquivar", action="store_true",
+                        help="Mover matérias concluídas antigas (e seus PDFs) para o arquivo morto")
+    parser.add_argument("--idade-dias", type=int, metavar="N",
+                        help="Com --arquivar, idade mínima da conclusão em dias (padrão: config.json)")
+    parser.add_argument("--restaurar", metavar="IDS", help="Restaurar matérias do arquivo morto (ex: 3,7-9)")
+    parser.add_argument("--retomar-importacoes", action="store_true",
+                        help="Concluir importações interrompidas (copia só os PDFs que faltaram)")
+    parser.add_argument("--extrair-metadados", action="store_true",
+                        help="Extrair páginas, título e tamanho dos PDFs que ainda não têm metadados")
+    parser.add_argument("--previews", metavar="ID", type=int, help="Mostrar os previews dos PDFs de uma matéria")
+    parser.add_argument("--gerar-previews", action="store_true",
+                        help="Gerar miniaturas e trechos de texto dos PDFs ainda sem preview")
+    parser.add_argument("--reprocessar", action="store_true",
+                        help="Com --extrair-metadados, refaz a extração de todos os PDFs")
+    parser.add_argument("--migrar", action="store_true",
+                        help="Aplicar as migrações de esquema pendentes e sair")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Com --migrar, só lista os comandos planejados, sem alterar o banco")
+    parser.add_argument("--verificar-migracoes", action="store_true",
+                        help="Aplicar todas as migrações num SQLite temporário com o esquema original e conferir com os modelos")
+    parser.add_argument("--reparticionar", action="store_true",
+                        help="Redistribuir todo o catálogo nas partições por período (particionamento.ativo)")
+    parser.add_argument("--gravar", metavar="ROTEIRO",
+                        help="Rodar o menu gravando cada entrada digitada em ROTEIRO (JSON-lines)")
+    parser.add_argument("--reproduzir", metavar="ROTEIRO",
+                        help="Rodar o menu sem tela com as entradas de ROTEIRO (gravado ou uma resposta por linha)")
+    parser.add_argument("--repeticoes", type=int, default=1, metavar="N", help="Com --reproduzir, repete o roteiro N vezes")
+    parser.add_argument("--estrito", action="store_true",
+                        help="Com --reproduzir, para se o programa pedir uma entrada diferente da gravada")
+    parser.add_argument("--fsck", action="store_true",
+                        help="Conferir arquivos_materia com as pastas de origem e as cópias em materias/<mes>/<nome>")
+    parser.add_argument("--hash", action="store_true",
+                        help="Com --fsck, compara o conteúdo (SHA-256) além do tamanho")
+    parser.add_argument("--reparar", action="store_true",
+                        help="Com --fsck, corrige os problemas reparáveis encontrados")
+    parser.add_argument("--ingerir", metavar="RAIZ", help="Cadastrar em lote todas as matérias de <RAIZ>/<mes>/<nome>/*.pdf")
+    parser.add_argument("--sem-copia", action="store_true", help="Com --ingerir, não copia os PDFs para materias/<mes>/<nome>")
+    parser.add_argument("--monitorar", action="store_true", help="Monitorar as pastas de PDFs e sincronizar o banco em tempo real")
+    parser.add_argument("--polling", action="store_true", help="Com --monitorar, usa varredura periódica em vez de inotify")
 
     args = parser.parse_args()
 
-    # ✅ Inicializa o banco antes de qualquer operação
+    # ✅ Recarrega o config.json automaticamente quando ele for alterado
+    iniciar_monitor_config()
+
+    # ✅ Listagens são servidas pelo cache local (ou pelas partições por período), sem esperar o banco
+    if args.listar or args.concluidas or args.nao_concluidas or args.meses:
+        if args.ao_vivo:
+            init_db()
+            fonte = MateriaRepository
+        elif PARTICIONADO:
+            fonte = obter_catalogo()
+        else:
+            fonte = obter_cache()
+        if args.include_archived:
+            from arquivamento import ComArquivadas
+            init_db()
+            fonte = ComArquivadas(fonte)
+        if args.meses:
+            listar_por_mes(args.meses, fonte)
+        elif args.listar:
+            mostrar_materias(fonte)
+        elif args.concluidas:
+            listar_concluidas(fonte)
+        else:
+            listar_nao_concluidas(fonte)
+        return
+
+    # ✅ Migrações explícitas (init_db já aplicaria as pendentes, sem o relatório)
+    if args.migrar:
+        from db import migrate_db
+        migrate_db(dry_run=args.dry_run)
+        return
+    if args.verificar_migracoes:
+        from migracoes import verificar_migracoes
+        if not verificar_migracoes():
+            sys.exit(1)
+        return
+
+    # ✅ Inicializa o banco antes de qualquer outra operação
     init_db()
 
-    if args.listar:
-        mostrar_materias()
-    elif args.adicionar:
+    if args.adicionar:
         adicionar_materia()
-    elif args.concluidas:
-        listar_concluidas()
-    elif args.nao_concluidas:
-        listar_nao_concluidas()
     elif args.ajuda:
         mostrar_ajuda()   # ✅ Também disponível via CLI
+    elif args.concluir or args.concluir_meses:
+        marcar_concluidas_lote(
+            ids_texto=args.concluir,
+            meses_texto=args.concluir_meses,
+            status=0 if args.reabrir else 1,
+            confirmar=not args.sim,
+        )
+    elif args.periodo or args.histograma:
+        inicio, fim = args.periodo or ("", "")
+        fonte = obter_catalogo() if PARTICIONADO and not args.ao_vivo else MateriaRepository
+        if args.include_archived:
+            from arquivamento import ComArquivadas
+            fonte = ComArquivadas(fonte)
+        listar_por_periodo(args.campo, inicio, fim, granularidade=args.histograma, listar=bool(args.periodo),
+                           fonte=fonte, incluir_arquivadas=args.include_archived)
+    elif args.arquivar:
+        from arquivamento import arquivar_concluidas, IDADE_DIAS
+        arquivar_concluidas(args.idade_dias if args.idade_dias is not None else IDADE_DIAS, confirmar=not args.sim)
+    elif args.restaurar:
+        from arquivamento import restaurar_arquivadas
+        restaurar_arquivadas(args.restaurar)
+    elif args.retomar_importacoes:
+        from diario_importacao import retomar_importacoes
+        concluidas = retomar_importacoes()
+        mostrar_sucesso(t("importacao.concluidas", n=concluidas))
+    elif args.extrair_metadados:
+        from metadados_pdf import enriquecer_metadados
+        mostrar_sucesso(f"Metadados extraídos de {enriquecer_metadados(reprocessar=args.reprocessar)} PDFs.")
+    elif args.previews:
+        listar_previews(args.previews, abrir=False)
+    elif args.gerar_previews:
+        from previews import gerar_previews
+        mostrar_sucesso(f"Previews gerados para {gerar_previews(reprocessar=args.reprocessar)} PDFs.")
+    elif args.reparticionar:
+        catalogo = obter_catalogo()
+        catalogo.atualizar(completo=True)
+        mostrar_sucesso(f"Catálogo redistribuído em {len(catalogo.periodos())} partições: {', '.join(catalogo.periodos())}.")
+    elif args.gravar:
+        from sessao import TerminalGravador, usar_terminal
+        gravador = TerminalGravador(args.gravar)
+        with usar_terminal(gravador):
+            main()
+        gravador.fechar()
+        mostrar_sucesso(f"Sessão gravada em {args.gravar}.")
+    elif args.reproduzir:
+        reproduzir_roteiro(args.reproduzir, args.repeticoes, args.estrito)
+    elif args.fsck:
+        from fsck import verificar_integridade
+        verificar_integridade(com_hash=args.hash, reparar=args.reparar)
+    elif args.ingerir:
+        from ingestao import ingerir_raiz
+        ingerir_raiz(args.ingerir, copiar=not args.sem_copia)
+    elif args.monitorar:
+        from monitor_pastas import monitorar_pastas
+        monitorar_pastas(forcar_polling=args.polling)
     else:
         # Se não passar argumentos, roda o fluxo normal (menu interativo)
         main()
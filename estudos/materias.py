@@ -1,59 +1,104 @@
-import tkinter as tk
-from tkinter import filedialog
 import os
-from datetime import datetime
-import shutil
+from datetime import datetime, timedelta
 import platform
 import subprocess
-from menu import MSG
 
-from db import MateriaRepository, SessionLocal
+from db import MateriaRepository, ConflitoDeVersao, unidade_de_trabalho
+from configuracao import obter_config
+from sessao import ler, escrever, terminal_atual
+from diario_importacao import obter_diario, executar_importacao
+from metadados_pdf import enriquecer_metadados
+from previews import obter_cache_previews, gerar_previews_em_segundo_plano
 from utils import (
     mostrar_erro,
     mostrar_sucesso,
+    mostrar_aviso,
     input_numero,
-    normalizar_nome_arquivo,
     confirmacao,
     formatar_tabela,
+    formatar_data,
+    formatar_sim_nao,
+    interpretar_ids,
+    interpretar_data,
+    formatar_histograma,
+    formatar_bytes,
+    listar_pdfs,
+    t,
 )
 
+MESES = [
+    "janeiro", "fevereiro", "março", "abril", "maio", "junho",
+    "julho", "agosto", "setembro", "outubro", "novembro", "dezembro"
+]
+
 # -----------------------------
 # Helpers de validação
 # -----------------------------
 def validar_nome(nome: str) -> bool:
     if not nome.strip():
-        mostrar_erro("Nome da matéria não pode ser vazio.")
+        mostrar_erro(t("materia.nome_vazio"))
         return False
-    materias = MateriaRepository.list()
-    if any(m["nome"].lower() == nome.lower() for m in materias):
-        mostrar_erro("Já existe uma matéria com esse nome.")
+    if MateriaRepository.existe_nome(nome):
+        mostrar_erro(t("materia.nome_existente"))
         return False
     return True
 
-def validar_pasta(pasta: str) -> bool:
+def motivo_pasta_invalida(pasta: str, arquivos_pdf: list[str] | None = None) -> str | None:
+    """Aplica as regras de pasta de PDFs; retorna o motivo da recusa ou None se a pasta é válida."""
     if not pasta or not os.path.isdir(pasta):
-        mostrar_erro("Pasta inválida ou inexistente.")
-        return False
-    arquivos_pdf = [f for f in os.listdir(pasta) if f.lower().endswith(".pdf")]
+        return t("pasta.invalida")
+    if arquivos_pdf is None:
+        arquivos_pdf = listar_pdfs(pasta)
     if not arquivos_pdf:
-        mostrar_erro("A pasta selecionada não contém PDFs.")
+        return t("pasta.sem_pdfs")
+    return None
+
+def validar_pasta(pasta: str) -> bool:
+    motivo = motivo_pasta_invalida(pasta)
+    if motivo:
+        mostrar_erro(motivo)
         return False
     return True
 
+def mes_por_nome(texto: str) -> str | None:
+    """Interpreta 'Março', 'marco', '3' ou '03' como o mês correspondente."""
+    texto = texto.strip().lower()
+    if texto.isdigit():
+        indice = int(texto)
+        return MESES[indice - 1] if 1 <= indice <= 12 else None
+    if texto in MESES:
+        return texto
+    return "março" if texto == "marco" else None
+
 def validar_mes(indice: int) -> str | None:
-    meses = [
-        "janeiro", "fevereiro", "março", "abril", "maio", "junho",
-        "julho", "agosto", "setembro", "outubro", "novembro", "dezembro"
-    ]
     if 1 <= indice <= 12:
-        return meses[indice - 1]
-    mostrar_erro("Mês inválido.")
+        return MESES[indice - 1]
+    mostrar_erro(t("mes.invalido"))
     return None
 
+def interpretar_meses(entrada: str) -> list[str] | None:
+    """Converte 'março-junho' ou 'janeiro,fevereiro' na lista de meses correspondente."""
+    entrada = entrada.strip().lower()
+    if "-" in entrada:  # intervalo
+        inicio, fim = (m.strip() for m in entrada.split("-", 1))
+        if inicio in MESES and fim in MESES:
+            idx_inicio, idx_fim = MESES.index(inicio), MESES.index(fim)
+            return MESES[idx_inicio:idx_fim+1]
+        mostrar_erro(t("mes.intervalo_invalido"))
+        return None
+    # múltiplos meses
+    return [m.strip() for m in entrada.split(",") if m.strip()]
+
+def pasta_organizada(mes: str, nome: str) -> str:
+    """Pasta onde os PDFs da matéria são organizados: materias/<mes>/<nome>."""
+    return os.path.join(os.getcwd(), "materias", mes, nome)
+
 # -----------------------------
 # Função para abrir PDFs
 # -----------------------------
 def abrir_pdf(caminho_pdf: str):
+    if not terminal_atual().interativo:
+        return   # sessão reproduzida sem tela: nenhum visualizador é aberto
     sistema = platform.system()
     try:
         if sistema == "Windows":
@@ -63,26 +108,61 @@ def abrir_pdf(caminho_pdf: str):
         elif sistema == "Linux":
             subprocess.call(["xdg-open", caminho_pdf])
         else:
-            mostrar_erro(f"Sistema operacional '{sistema}' não suportado para abrir PDFs.")
+            mostrar_erro(t("pdf.so_nao_suportado", sistema=sistema))
     except Exception as e:
-        mostrar_erro(f"Não foi possível abrir o PDF: {e}")
+        mostrar_erro(t("pdf.erro_abrir", erro=e))
+
+# -----------------------------
+# Previews dos PDFs (cache em disco, sem abrir os arquivos)
+# -----------------------------
+def listar_previews(materia_id: int | None = None, abrir: bool = True):
+    if materia_id is None:
+        materia_id = input_numero(t("previews.id"), 1, 9999)
+    materia = MateriaRepository.get(materia_id)
+    if not materia:
+        mostrar_erro(t("materia.nao_encontrada"))
+        return
+    arquivos = MateriaRepository.arquivos_da_materia(materia_id)
+    if not arquivos:
+        mostrar_erro(t("nenhum_dado"))
+        return
+
+    previews = obter_cache_previews().obter([a.digest for a in arquivos if a.digest])
+    escrever(f"\n{t('previews.titulo', nome=materia.nome)}")
+    linhas = []
+    for i, a in enumerate(arquivos, start=1):
+        preview = previews.get(a.digest)
+        trecho = (preview.texto or "-") if preview else "-"
+        linhas.append([
+            i, a.nome_arquivo, a.paginas or "-", formatar_bytes(a.tamanho_bytes),
+            trecho if len(trecho) <= 60 else trecho[:59] + "…",
+            (preview.miniatura or "-") if preview else "-",
+        ])
+    formatar_tabela(linhas, [t("coluna.id"), t("coluna.arquivo"), t("coluna.paginas"), t("coluna.tamanho"),
+                             t("coluna.trecho"), t("coluna.miniatura")])
+    sem_preview = sum(1 for a in arquivos if a.digest not in previews)
+    if sem_preview:
+        # Sem digest ainda ou entrada despejada do cache: regenera em segundo plano
+        gerar_previews_em_segundo_plano([materia_id])
+        mostrar_aviso(t("previews.pendentes", qtd=sem_preview))
+
+    if abrir:
+        escolha = ler(t("previews.abrir")).strip()
+        if escolha.isdigit() and 1 <= int(escolha) <= len(arquivos):
+            abrir_pdf(os.path.join(materia.pasta_pdf, arquivos[int(escolha) - 1].nome_arquivo))
 
 # -----------------------------
 # Escolher pasta PDF
 # -----------------------------
 def escolher_pasta_pdf():
-    root = tk.Tk()
-    root.withdraw()
-    root.attributes("-topmost", True)
-    pasta = filedialog.askdirectory(title="Selecione a pasta PDF", parent=root)
-    root.destroy()
-    return pasta if pasta else None
+    # Janela do Tkinter no terminal real; em sessões reproduzidas, a pasta vem do roteiro
+    return terminal_atual().escolher_pasta(t("pasta.selecionar"))
 
 # -----------------------------
 # Adicionar matéria
 # -----------------------------
 def adicionar_materia():
-    nome = input("Digite o nome da matéria: ").strip()
+    nome = ler(t("adicionar.nome")).strip()
     if not validar_nome(nome):
         return
 
@@ -90,99 +170,111 @@ def adicionar_materia():
     if not validar_pasta(pasta):
         return
 
-    print("\nSelecione o mês de início:")
-    for i, mes_nome in enumerate([
-        "janeiro", "fevereiro", "março", "abril", "maio", "junho",
-        "julho", "agosto", "setembro", "outubro", "novembro", "dezembro"
-    ], start=1):
-        print(f"{i} - {mes_nome.capitalize()}")
+    escrever(f"\n{t('adicionar.selecione_mes')}")
+    for i, mes_nome in enumerate(MESES, start=1):
+        escrever(f"{i} - {mes_nome.capitalize()}")
 
-    escolha_mes = input_numero("Digite o número do mês (1-12):", 1, 12)
+    escolha_mes = input_numero(t("adicionar.numero_mes"), 1, 12)
     mes = validar_mes(escolha_mes)
     if not mes:
         return
 
     data_criacao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    MateriaRepository.insert(nome, pasta, mes)
-
-    pasta_raiz = os.path.join(os.getcwd(), "materias", mes, nome)
-    os.makedirs(pasta_raiz, exist_ok=True)
-
-    arquivos_detectados = []
-    for arquivo in os.listdir(pasta):
-        if arquivo.lower().endswith(".pdf"):
-            origem = os.path.join(pasta, arquivo)
-            destino = os.path.join(pasta_raiz, arquivo)
-            shutil.copy2(origem, destino)
-            arquivos_detectados.append(arquivo)
+    # Registrada no diário antes de gravar: se cair no meio, --retomar-importacoes continua daqui
+    arquivos_detectados = listar_pdfs(pasta) or []
+    importacao = obter_diario().iniciar(nome, pasta, mes, pasta_organizada(mes, nome), arquivos_detectados)
+    materia_id = executar_importacao(importacao)
+    if materia_id is None:
+        return
+    enriquecer_metadados([materia_id])
+    gerar_previews_em_segundo_plano([materia_id])
 
     mostrar_sucesso(
-        f"{MSG.get('sucesso', 'Operação realizada com sucesso!')} "
-        f"Matéria '{nome}' adicionada (Mês: {mes.capitalize()}, Criada em: {data_criacao}, {len(arquivos_detectados)} PDFs organizados)"
+        t("adicionar.sucesso", nome=nome, mes=mes.capitalize(), data=data_criacao, qtd=len(arquivos_detectados))
     )
 
     if arquivos_detectados:
-        print("Arquivos detectados:")
+        escrever(t("adicionar.arquivos_detectados"))
         for arq in arquivos_detectados:
-            print(f" - {arq}")
+            escrever(f" - {arq}")
 
 # -----------------------------
 # Editar matéria
 # -----------------------------
+@unidade_de_trabalho()   # ler-modificar-gravar: leituras no primário
 def editar_materia():
-    id_materia = input_numero("Digite o ID da matéria a editar:", 1, 9999)
-    materia = MateriaRepository.get(id_materia)
+    id_materia = input_numero(t("editar.id"), 1, 9999)
 
-    if not materia:
-        mostrar_erro(MSG.get("erro", "Matéria não encontrada."))
-        return
+    while True:
+        materia = MateriaRepository.get(id_materia)
 
-    print(f"Editando matéria: {materia.nome}")
-    novo_nome = input(f"Novo nome (Enter para manter '{materia.nome}'): ").strip() or materia.nome
-    nova_pasta = escolher_pasta_pdf() or materia.pasta_pdf
+        if not materia:
+            mostrar_erro(t("materia.nao_encontrada"))
+            return
 
-    if not validar_nome(novo_nome) or not validar_pasta(nova_pasta):
-        return
+        escrever(t("editar.editando", nome=materia.nome))
+        novo_nome = ler(t("editar.novo_nome", nome=materia.nome)).strip() or materia.nome
+        nova_pasta = escolher_pasta_pdf() or materia.pasta_pdf
 
-    materia.nome = novo_nome
-    materia.pasta_pdf = nova_pasta
-    MateriaRepository.update_obj(materia)
+        if not validar_nome(novo_nome) or not validar_pasta(nova_pasta):
+            return
+
+        materia.nome = novo_nome
+        materia.pasta_pdf = nova_pasta
+        try:
+            MateriaRepository.update_obj(materia)
+        except ConflitoDeVersao:
+            mostrar_aviso(t("editar.conflito"))
+            if confirmacao(t("editar.recarregar")):
+                continue
+            mostrar_erro(t("editar.descartada"))
+            return
+        break
 
-    mostrar_sucesso(f"{MSG.get('sucesso', 'Operação realizada com sucesso!')} Matéria '{novo_nome}' (ID {id_materia}) atualizada.")
+    mostrar_sucesso(t("editar.sucesso", nome=novo_nome, id=id_materia))
 
 # -----------------------------
 # Mostrar matérias (com paginação)
 # -----------------------------
-def mostrar_materias():
-    materias = MateriaRepository.list()
+def mostrar_materias(fonte=MateriaRepository):
+    materias = fonte.projetar(
+        ("id", "nome", "pasta_pdf", "mes_inicio", "concluida", "data_criacao", "data_conclusao"),
+        com_totais=True,
+    )
     if not materias:
-        mostrar_erro(MSG.get("nenhum_dado", "Nenhum dado para exibir."))
+        mostrar_erro(t("nenhum_dado"))
         return
 
-    por_pagina = input_numero("Quantos registros por página deseja visualizar? (1-20):", 1, 20)
+    maximo = obter_config().paginacao.maximo
+    por_pagina = input_numero(t("listar.por_pagina", maximo=maximo), 1, maximo)
 
     def exibir_pagina(pagina=1):
         inicio = (pagina - 1) * por_pagina
         fim = inicio + por_pagina
         pagina_materias = materias[inicio:fim]
+        # Nomes dos arquivos só para as matérias desta página
+        arquivos = fonte.arquivos_por_materia([m.id for m in pagina_materias])
 
         colunas = [
-            "ID", "Nome", "Pasta", "Mês", "Concluída",
-            "Data de Criação", "Data de Conclusão", "Arquivos (PDFs)"
+            t("coluna.id"), t("coluna.nome"), t("coluna.pasta"), t("coluna.mes"), t("coluna.concluida"),
+            t("coluna.data_criacao"), t("coluna.data_conclusao"), t("coluna.paginas"), t("coluna.tamanho"),
+            t("coluna.arquivos")
         ]
 
         formatar_tabela(
             [
                 [
-                    m["id"],
-                    f"{m['nome']} ({len(m['arquivos'])} PDFs)",
-                    m["pasta_pdf"],
-                    m["mes_inicio"],
-                    m["concluida"],
-                    m["data_criacao"],
-                    m["data_conclusao"] if m["data_conclusao"] else "-",
-                    ", ".join(m["arquivos"]) if m["arquivos"] else "-"
+                    m.id,
+                    t("listar.qtd_pdfs", nome=m.nome, qtd=m.qtd_arquivos),
+                    m.pasta_pdf,
+                    m.mes_inicio,
+                    formatar_sim_nao(m.concluida),
+                    formatar_data(m.data_criacao, ""),
+                    formatar_data(m.data_conclusao),
+                    m.total_paginas or "-",
+                    formatar_bytes(m.total_bytes),
+                    ", ".join(arquivos[m.id]) if arquivos[m.id] else "-"
                 ]
                 for m in pagina_materias
             ],
@@ -190,8 +282,8 @@ def mostrar_materias():
         )
 
         if fim < len(materias):
-            print("\nDigite 'n' para próxima página ou Enter para sair.")
-            if input().strip().lower() == "n":
+            escrever(f"\n{t('listar.proxima_pagina')}")
+            if ler().strip().lower() == t("listar.tecla_proxima"):
                 exibir_pagina(pagina + 1)
 
     exibir_pagina()
@@ -199,43 +291,30 @@ def mostrar_materias():
 # -----------------------------
 # Listar matérias por mês ou intervalo
 # -----------------------------
-def listar_por_mes():
-    entrada = input("Digite os meses separados por vírgula ou intervalo (ex: janeiro,fevereiro ou março-junho): ").strip().lower()
-    materias = MateriaRepository.list()
-
-    meses = [
-        "janeiro", "fevereiro", "março", "abril", "maio", "junho",
-        "julho", "agosto", "setembro", "outubro", "novembro", "dezembro"
-    ]
-
-    filtradas = []
-    if "-" in entrada:  # intervalo
-        inicio, fim = entrada.split("-")
-        if inicio in meses and fim in meses:
-            idx_inicio, idx_fim = meses.index(inicio), meses.index(fim)
-            intervalo = meses[idx_inicio:idx_fim+1]
-            filtradas = [m for m in materias if m["mes_inicio"].lower() in intervalo]
-        else:
-            mostrar_erro(MSG.get("erro", "Intervalo de meses inválido."))
-            return
-    else:  # múltiplos meses
-        escolhidos = [m.strip() for m in entrada.split(",")]
-        filtradas = [m for m in materias if m["mes_inicio"].lower() in escolhidos]
+def listar_por_mes(entrada: str | None = None, fonte=MateriaRepository):
+    if entrada is None:
+        entrada = ler(t("listar.meses"))
+    entrada = entrada.strip().lower()
+    escolhidos = interpretar_meses(entrada)
+    if escolhidos is None:
+        return
+    filtradas = fonte.projetar(meses=escolhidos) if escolhidos else []
 
     if not filtradas:
-        mostrar_erro(f"{MSG.get('nenhum_dado', 'Nenhum dado para exibir.')} Entrada: '{entrada}'")
+        mostrar_erro(t("listar.nenhum_para_entrada", entrada=entrada))
         return
 
-    colunas = ["ID", "Nome", "Mês", "Concluída", "Data de Criação", "Data de Conclusão"]
+    colunas = [t("coluna.id"), t("coluna.nome"), t("coluna.mes"), t("coluna.concluida"),
+               t("coluna.data_criacao"), t("coluna.data_conclusao")]
     formatar_tabela(
         [
             [
-                m["id"],
-                f"{m['nome']} ({len(m['arquivos'])} PDFs)",
-                m["mes_inicio"],
-                m["concluida"],
-                m["data_criacao"],
-                m["data_conclusao"] if m["data_conclusao"] else "-"
+                m.id,
+                t("listar.qtd_pdfs", nome=m.nome, qtd=m.qtd_arquivos),
+                m.mes_inicio,
+                formatar_sim_nao(m.concluida),
+                formatar_data(m.data_criacao, ""),
+                formatar_data(m.data_conclusao)
             ]
             for m in filtradas
         ],
@@ -243,99 +322,226 @@ def listar_por_mes():
     )
 
 # -----------------------------
-# Listar concluídas
+# Listar concluídas / não concluídas
 # -----------------------------
-def listar_concluidas():
-    materias = MateriaRepository.list(concluidas=1)
+def _listar_por_status(concluidas: int, fonte=MateriaRepository):
+    materias = fonte.projetar(
+        ("id", "nome", "mes_inicio", "data_criacao", "data_conclusao"), concluidas=concluidas
+    )
     if not materias:
-        mostrar_erro(MSG.get("nenhum_dado", "Nenhum dado para exibir."))
+        mostrar_erro(t("nenhum_dado"))
         return
 
-    colunas = ["ID", "Nome", "Mês", "Data de Criação", "Data de Conclusão"]
+    colunas = [t("coluna.id"), t("coluna.nome"), t("coluna.mes"), t("coluna.data_criacao"), t("coluna.data_conclusao")]
     formatar_tabela(
-        [[m["id"], f"{m['nome']} ({len(m['arquivos'])} PDFs)", m["mes_inicio"], m["data_criacao"], m["data_conclusao"] or "-"]
+        [[m.id, t("listar.qtd_pdfs", nome=m.nome, qtd=m.qtd_arquivos), m.mes_inicio,
+          formatar_data(m.data_criacao, ""), formatar_data(m.data_conclusao)]
          for m in materias],
         colunas
     )
 
+def listar_concluidas(fonte=MateriaRepository):
+    _listar_por_status(concluidas=1, fonte=fonte)
+
+def listar_nao_concluidas(fonte=MateriaRepository):
+    _listar_por_status(concluidas=0, fonte=fonte)
+
 # -----------------------------
-# Listar não concluídas
+# Listar por período (criação/conclusão) + histograma
 # -----------------------------
-def listar_nao_concluidas():
-    materias = MateriaRepository.list(concluidas=0)
-    if not materias:
-        mostrar_erro(MSG.get("nenhum_dado", "Nenhum dado para exibir."))
+def _ler_periodo(inicio_texto: str, fim_texto: str):
+    """Converte as datas digitadas em (inicio, fim exclusivo); vazio = sem limite. None se inválidas."""
+    inicio = fim = None
+    if inicio_texto:
+        inicio = interpretar_data(inicio_texto)
+        if inicio is None:
+            mostrar_erro(t("periodo.data_invalida", data=inicio_texto))
+            return None
+    if fim_texto:
+        fim = interpretar_data(fim_texto)
+        if fim is None:
+            mostrar_erro(t("periodo.data_invalida", data=fim_texto))
+            return None
+        fim += timedelta(days=1)   # a data final digitada entra inteira no intervalo
+    if inicio and fim and inicio >= fim:
+        mostrar_erro(t("periodo.intervalo_invalido"))
+        return None
+    return inicio, fim
+
+def listar_por_periodo(campo: str | None = None, inicio_texto: str = "", fim_texto: str = "",
+                       granularidade: str | None = "mes", listar: bool = True,
+                       fonte=MateriaRepository, incluir_arquivadas: bool = False):
+    """Lista matérias criadas/concluídas num intervalo de datas e exibe o histograma por semana ou mês.
+
+    Sem `campo`, pergunta tudo ao usuário (uso pelo menu).
+    """
+    if campo is None:
+        escrever(f"\n{t('periodo.titulo')}")
+        escrever(t("periodo.opcao_criacao"))
+        escrever(t("periodo.opcao_conclusao"))
+        escolha = ler(t("periodo.escolha")).strip()
+        if escolha not in ("1", "2"):
+            mostrar_erro(t("menu.invalida"))
+            return
+        campo = "criacao" if escolha == "1" else "conclusao"
+        inicio_texto = ler(t("periodo.inicio")).strip()
+        fim_texto = ler(t("periodo.fim")).strip()
+        escrever(t("periodo.opcao_semana"))
+        escrever(t("periodo.opcao_mes"))
+        escolha = ler(t("periodo.escolha")).strip()
+        if escolha not in ("1", "2"):
+            mostrar_erro(t("menu.invalida"))
+            return
+        granularidade = "semana" if escolha == "1" else "mes"
+
+    periodo = _ler_periodo(inicio_texto, fim_texto)
+    if periodo is None:
         return
+    inicio, fim = periodo
 
-    colunas = ["ID", "Nome", "Mês", "Data de Criação", "Data de Conclusão"]
-    formatar_tabela(
-        [[m["id"], f"{m['nome']} ({len(m['arquivos'])} PDFs)", m["mes_inicio"], m["data_criacao"], m["data_conclusao"] or "-"]
-         for m in materias],
-        colunas
-    )
+    if listar:
+        coluna_data = "data_criacao" if campo == "criacao" else "data_conclusao"
+        materias = fonte.projetar(
+            ("id", "nome", "mes_inicio", coluna_data), periodo=(campo, inicio, fim)
+        )
+        if not materias:
+            mostrar_erro(t("nenhum_dado"))
+            return
+        formatar_tabela(
+            [[m.id, t("listar.qtd_pdfs", nome=m.nome, qtd=m.qtd_arquivos), m.mes_inicio,
+              formatar_data(getattr(m, coluna_data))]
+             for m in materias],
+            [t("coluna.id"), t("coluna.nome"), t("coluna.mes"), t(f"coluna.{coluna_data}")]
+        )
+
+    if granularidade:
+        escrever(f"\n{t(f'periodo.histograma_{campo}_{granularidade}')}")
+        formatar_histograma(MateriaRepository.histograma(campo, granularidade, inicio, fim, incluir_arquivadas))
 
 # -----------------------------
 # Concluir matéria com confirmação
 # -----------------------------
+@unidade_de_trabalho()   # ler-modificar-gravar: leituras no primário
 def marcar_concluida():
-    id_materia = input_numero("Digite o ID da matéria a concluir:", 1, 9999)
-    materia = MateriaRepository.get(id_materia)
+    id_materia = input_numero(t("concluir.id"), 1, 9999)
 
-    if not materia:
-        mostrar_erro(MSG.get("erro", "Matéria não encontrada."))
-        return
+    while True:
+        materia = MateriaRepository.get(id_materia)
+
+        if not materia:
+            mostrar_erro(t("materia.nao_encontrada"))
+            return
+
+        escrever(f"\n{t('concluir.opcao_concluida')}")
+        escrever(t("concluir.opcao_andamento"))
+        escolha = ler(t("concluir.escolha")).strip()
 
-    print("\n1 - Marcar como concluída")
-    print("2 - Marcar como em andamento")
-    escolha = input("Digite sua escolha: ").strip()
+        try:
+            if escolha == "1":
+                if confirmacao(t("concluir.confirmar", nome=materia.nome)):
+                    MateriaRepository.update_concluida(id_materia, status=1, versao=materia.versao)
+                    mostrar_sucesso(t("concluir.concluida"))
+                else:
+                    mostrar_erro(t("acao_cancelada"))
+            elif escolha == "2":
+                MateriaRepository.update_concluida(id_materia, status=0, versao=materia.versao)
+                mostrar_sucesso(t("concluir.andamento"))
+            else:
+                mostrar_erro(t("menu.invalida"))
+        except ConflitoDeVersao:
+            mostrar_aviso(t("concluir.conflito", id=id_materia))
+            continue
+        return
 
-    if escolha == "1":
-        if confirmacao(f"Você tem certeza que deseja marcar a matéria '{materia.nome}' como concluída?"):
-            MateriaRepository.update_concluida(id_materia, status=1)
-            mostrar_sucesso(MSG.get("sucesso", "Matéria marcada como concluída."))
+# -----------------------------
+# Concluir/reabrir matérias em lote
+# -----------------------------
+def marcar_concluidas_lote(ids_texto: str | None = None, meses_texto: str | None = None,
+                           status: int | None = None, confirmar: bool = True):
+    """Conclui ou reabre várias matérias de uma vez (lista/intervalo de IDs ou meses)."""
+    if ids_texto is None and meses_texto is None:
+        escrever(f"\n{t('lote.titulo')}")
+        escrever(t("lote.por_ids"))
+        escrever(t("lote.por_meses"))
+        escolha = ler(t("lote.escolha")).strip()
+        if escolha == "1":
+            ids_texto = ler(t("lote.ids")).strip()
+        elif escolha == "2":
+            meses_texto = ler(t("lote.meses")).strip()
         else:
-            mostrar_erro(MSG.get("aviso", "Ação cancelada pelo usuário."))
-    elif escolha == "2":
-        MateriaRepository.update_concluida(id_materia, status=0)
-        mostrar_sucesso(MSG.get("sucesso", "Matéria marcada como em andamento."))
-    else:
-        mostrar_erro(MSG.get("invalid", "Opção inválida."))
+            mostrar_erro(t("menu.invalida"))
+            return
+
+    if status is None:
+        escrever(f"\n{t('lote.opcao_concluidas')}")
+        escrever(t("lote.opcao_andamento"))
+        escolha = ler(t("concluir.escolha")).strip()
+        if escolha not in ("1", "2"):
+            mostrar_erro(t("menu.invalida"))
+            return
+        status = 1 if escolha == "1" else 0
+
+    ids, intervalos, meses = None, None, None
+    if ids_texto:
+        interpretados = interpretar_ids(ids_texto)
+        if interpretados is None:
+            return
+        ids, intervalos = interpretados
+    if meses_texto:
+        meses = interpretar_meses(meses_texto)
+        if not meses:
+            return
+
+    total = MateriaRepository.contar_lote(ids, intervalos, meses, status=status)
+    if total == 0:
+        mostrar_aviso(t("lote.nada_a_fazer"))
+        return
+
+    acao = t("lote.acao_concluidas") if status == 1 else t("lote.acao_andamento")
+    if confirmar and not confirmacao(t("lote.confirmar", total=total, acao=acao)):
+        mostrar_erro(t("acao_cancelada"))
+        return
+
+    afetadas = MateriaRepository.update_concluida_lote(ids, intervalos, meses, status=status)
+    mostrar_sucesso(t("lote.sucesso", total=afetadas, acao=acao))
+    return afetadas
 
 # -------------------------------
 # Remover matéria (com confirmação)
 # -------------------------------
+@unidade_de_trabalho()   # ler-modificar-gravar: leituras no primário
 def remover_materia():
     try:
-        print("\n=== Remover Matéria ===")
-        print("1 - Remover uma matéria específica")
-        print("2 - Remover TODAS as matérias")
-        escolha = input("Digite sua escolha (1 ou 2): ").strip()
+        escrever(f"\n{t('remover.titulo')}")
+        escrever(t("remover.uma"))
+        escrever(t("remover.todas"))
+        escolha = ler(t("remover.escolha")).strip()
 
         if escolha == "1":
-            materia_id = input_numero("Digite o ID da matéria a remover:", 1, 9999)
+            materia_id = input_numero(t("remover.id"), 1, 9999)
             materia = MateriaRepository.get(materia_id)
 
             if not materia:
-                mostrar_erro(MSG.get("erro", "Matéria não encontrada."))
+                mostrar_erro(t("materia.nao_encontrada"))
                 return
 
-            if confirmacao(f"Tem certeza que deseja remover a matéria '{materia.nome}' (ID {materia_id})?"):
+            if confirmacao(t("remover.confirmar", nome=materia.nome, id=materia_id)):
                 if MateriaRepository.delete_obj(materia):
-                    mostrar_sucesso(MSG.get("sucesso", f"Matéria '{materia.nome}' (ID {materia_id}) removida com sucesso!"))
+                    mostrar_sucesso(t("remover.sucesso", nome=materia.nome, id=materia_id))
                 else:
-                    mostrar_erro(MSG.get("erro", "Falha ao remover a matéria."))
+                    mostrar_erro(t("remover.falha"))
             else:
-                mostrar_erro(MSG.get("aviso", "Operação cancelada pelo usuário."))
+                mostrar_erro(t("operacao_cancelada"))
 
         elif escolha == "2":
-            if confirmacao("Tem certeza que deseja remover TODAS as matérias?"):
+            if confirmacao(t("remover.confirmar_todas")):
                 MateriaRepository.delete_all()
-                mostrar_sucesso(MSG.get("sucesso", "Todas as matérias foram removidas com sucesso!"))
+                mostrar_sucesso(t("remover.sucesso_todas"))
             else:
-                mostrar_erro(MSG.get("aviso", "Operação cancelada pelo usuário."))
+                mostrar_erro(t("operacao_cancelada"))
 
         else:
-            mostrar_erro(MSG.get("invalid", "Opção inválida."))
+            mostrar_erro(t("menu.invalida"))
 
     except Exception as e:
-        mostrar_erro(MSG.get("erro", f"Falha ao remover matéria: {e}"))
\ No newline at end of file
+        mostrar_erro(t("remover.erro", erro=e))
\ No newline at end of file
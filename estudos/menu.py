@@ -1,17 +1,19 @@
+import json
+import hashlib
+from functools import lru_cache
+
 from utils import mostrar_erro, mostrar_sucesso, carregar_config
+from catalogo import mensagem
+from configuracao import obter_config, ao_recarregar
+from sessao import escrever
 
 # -----------------------------
 # Carregar configurações
 # -----------------------------
 config = carregar_config()
-MSG = config.get("mensagens_menu", {
-    "menu_title": "=== Menu Principal ===",
-    "choice": "Digite sua escolha (número ou letra): ",
-    "invalid": "Opção inválida."
-})
 
 # Atalhos configuráveis via config.json
-MENU_OPTIONS = config.get("menu_opcoes", {
+MENU_PADRAO = {
     "1": ("add", "A"),
     "2": ("show", "M"),
     "3": ("list_month", "L"),
@@ -20,45 +22,82 @@ MENU_OPTIONS = config.get("menu_opcoes", {
     "6": ("mark_done", "D"),
     "7": ("edit", "E"),
     "8": ("remove", "R"),
+    "9": ("mark_done_batch", "B"),
+    "10": ("list_period", "T"),
+    "11": ("previews", "V"),
     "0": ("exit", "S"),
     "H": ("help", "H")
-})
+}
+MENU_OPTIONS = config.get("menu_opcoes") or MENU_PADRAO
+
+def _hash_menu(opcoes: dict) -> str:
+    """Chave de cache das telas pré-renderizadas: muda se as opções do menu mudarem."""
+    return hashlib.sha1(json.dumps(opcoes, sort_keys=True).encode()).hexdigest()
+
+HASH_MENU = _hash_menu(MENU_OPTIONS)
+_OPCOES_POR_HASH = {HASH_MENU: MENU_OPTIONS}
+
+@ao_recarregar
+def _recarregar_menu(anterior, nova):
+    global MENU_OPTIONS, HASH_MENU
+    opcoes = nova.menu_opcoes or MENU_PADRAO
+    novo_hash = _hash_menu(opcoes)
+    _OPCOES_POR_HASH[novo_hash] = opcoes
+    MENU_OPTIONS, HASH_MENU = opcoes, novo_hash
 
 # -----------------------------
-# Exibir menu principal
+# Telas pré-renderizadas (cache por idioma + config)
 # -----------------------------
-def exibir_menu():
-    """Exibe o menu principal com alinhamento e atalhos configuráveis."""
-    # Título principal (sem legenda ao lado)
-    print("\033[94m\n=== Menu Principal ===\033[0m")
-
-    # Legenda das cores logo abaixo do título
-    print("   \033[94m🔹 Azul = opções normais\033[0m")
-    print("   \033[92m🟢 Verde = ajuda (suporte)\033[0m")
-    print("   \033[91m🔴 Vermelho = sair (encerramento)\033[0m\n")
+@lru_cache(maxsize=16)
+def renderizar_menu(idioma: str, hash_menu: str) -> str:
+    """Monta o menu principal completo uma única vez por idioma/configuração."""
+    linhas = [
+        # Título principal (sem legenda ao lado)
+        f"\033[94m\n{mensagem(idioma, 'menu.titulo')}\033[0m",
+        # Legenda das cores logo abaixo do título
+        f"   \033[94m{mensagem(idioma, 'menu.legenda_normal')}\033[0m",
+        f"   \033[92m{mensagem(idioma, 'menu.legenda_ajuda')}\033[0m",
+        f"   \033[91m{mensagem(idioma, 'menu.legenda_sair')}\033[0m\n",
+    ]
 
     # Exibição das opções
-    for numero, (chave, atalho) in MENU_OPTIONS.items():
-        descricao = {
-            "add": "Adicionar matérias",
-            "show": "Mostrar matérias",
-            "list_month": "Listar matérias por mês",
-            "list_done": "Listar matérias concluídas",
-            "list_pending": "Listar matérias pendentes",
-            "mark_done": "Marcar matérias como concluída",
-            "edit": "Editar matérias",
-            "remove": "Remover matérias",
-            "exit": "Sair",
-            "help": "Ajuda"
-        }.get(chave, chave.capitalize())
+    for numero, (chave, atalho) in _OPCOES_POR_HASH[hash_menu].items():
+        descricao = mensagem(idioma, f"menu.{chave}")
+        if descricao == f"menu.{chave}":
+            descricao = chave.capitalize()
 
         # 🔹 Destaque especial para Ajuda e Sair
         if chave == "help":
-            print(f"\033[92m{numero:<2} ({atalho}) - {descricao}\033[0m")  # Verde
+            linhas.append(f"\033[92m{numero:<2} ({atalho}) - {descricao}\033[0m")  # Verde
         elif chave == "exit":
-            print(f"\033[91m{numero:<2} ({atalho}) - {descricao}\033[0m")  # Vermelho
+            linhas.append(f"\033[91m{numero:<2} ({atalho}) - {descricao}\033[0m")  # Vermelho
         else:
-            print(f"\033[94m{numero:<2} ({atalho}) - {descricao}\033[0m")  # Azul
+            linhas.append(f"\033[94m{numero:<2} ({atalho}) - {descricao}\033[0m")  # Azul
+    return "\n".join(linhas)
+
+
+@lru_cache(maxsize=16)
+def renderizar_ajuda(idioma: str, hash_menu: str) -> str:
+    """Monta o texto da ajuda detalhada uma única vez por idioma/configuração."""
+    linhas = [f"\n{mensagem(idioma, 'ajuda.titulo')}"]
+    linhas.extend(mensagem(idioma, "ajuda.intro"))
+    linhas.append("")
+
+    for numero, (chave, atalho) in _OPCOES_POR_HASH[hash_menu].items():
+        linhas.append(f"{numero} ({atalho}) - {mensagem(idioma, f'menu.{chave}')}")
+        for linha in mensagem(idioma, f"ajuda.{chave}"):
+            linhas.append(f"   ➝ {linha.format(numero=numero, atalho=atalho)}")
+        linhas.append("")
+
+    linhas.append(mensagem(idioma, "ajuda.dica"))
+    return "\n".join(linhas)
+
+# -----------------------------
+# Exibir menu principal
+# -----------------------------
+def exibir_menu():
+    """Exibe o menu principal com alinhamento e atalhos configuráveis."""
+    escrever(renderizar_menu(obter_config().idioma, HASH_MENU))
 
 # -----------------------------
 # Interpretar escolha
@@ -78,53 +117,4 @@ def interpretar_escolha(escolha: str):
 # -----------------------------
 def mostrar_ajuda():
     """Exibe instruções detalhadas de cada funcionalidade com exemplos práticos."""
-    print("\n=== Ajuda ===")
-    print("Este sistema organiza e gerencia matérias da faculdade.")
-    print("Você pode usar números ou letras para acessar as opções do menu.")
-    print("Abaixo está o guia completo de cada funcionalidade, com explicações e exemplos:\n")
-
-    print("1 (A) - Adicionar matéria")
-    print("   ➝ Permite cadastrar uma nova matéria no sistema.")
-    print("   ➝ Você deverá informar o nome da matéria, a pasta onde estão os PDFs e o mês de início.")
-    print("   ➝ O sistema organiza automaticamente os arquivos PDF em uma estrutura de pastas.")
-    print("   ➝ Exemplo: digite '1' ou 'A', informe 'Matemática', escolha a pasta com PDFs e selecione 'Março'.\n")
-
-    print("2 (M) - Mostrar matérias")
-    print("   ➝ Lista todas as matérias cadastradas, exibindo informações detalhadas como nome, pasta, mês, status e arquivos.")
-    print("   ➝ Possui paginação: você escolhe quantos registros deseja ver por página.")
-    print("   ➝ Exemplo: digite '2' ou 'M' e informe '5' para visualizar 5 matérias por página.\n")
-
-    print("3 (L) - Listar matérias por mês")
-    print("   ➝ Filtra matérias por meses específicos ou intervalos de meses.")
-    print("   ➝ Útil para organizar matérias que começam em determinados períodos do semestre.")
-    print("   ➝ Exemplo: digite '3' ou 'L' e informe 'março-junho' para listar matérias nesse intervalo.\n")
-
-    print("4 (C) - Listar matérias concluídas")
-    print("   ➝ Exibe apenas as matérias que já foram concluídas.")
-    print("   ➝ Útil para acompanhar o progresso e revisar matérias finalizadas.\n")
-
-    print("5 (P) - Listar matérias pendentes")
-    print("   ➝ Exibe apenas as matérias que ainda não foram concluídas.")
-    print("   ➝ Ajuda a identificar quais matérias ainda precisam ser estudadas.\n")
-
-    print("6 (D) - Marcar matéria como concluída")
-    print("   ➝ Permite alterar o status de uma matéria para concluída ou em andamento.")
-    print("   ➝ Exemplo: digite '6' ou 'D', informe o ID da matéria e escolha '1' para concluída ou '2' para em andamento.\n")
-
-    print("7 (E) - Editar matéria")
-    print("   ➝ Permite alterar o nome ou a pasta de PDFs de uma matéria existente.")
-    print("   ➝ Útil para corrigir erros de cadastro ou atualizar informações.")
-    print("   ➝ Exemplo: digite '7' ou 'E', informe o ID da matéria e forneça o novo nome ou pasta.\n")
-
-    print("8 (R) - Remover matéria")
-    print("   ➝ Submenu com duas opções: remover uma matéria específica ou todas de uma vez.")
-    print("   ➝ O sistema pede confirmação antes de excluir para evitar perdas acidentais.")
-    print("   ➝ Exemplo: digite '8' ou 'R', escolha '1' para remover uma matéria e informe o ID.\n")
-
-    print("0 (S) - Sair")
-    print("   ➝ Fecha o programa com segurança, garantindo que todas as alterações foram salvas.\n")
-
-    print("H (H) - Ajuda")
-    print("   ➝ Exibe este guia novamente, sempre que precisar consultar as instruções.\n")
-
-    print("💡 Dica prática: use '3' para listar matérias de um intervalo de meses, como 'março-junho', e combine com '5' para ver apenas as pendentes nesse período.")
\ No newline at end of file
+    escrever(renderizar_ajuda(obter_config().idioma, HASH_MENU))
@@ -0,0 +1,392 @@
+import os
+import re
+import mmap
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from db import MateriaRepository
+from utils import carregar_config, registrar_log, mostrar_aviso
+
+# -----------------------------
+# Configurações da extração
+# -----------------------------
+config = carregar_config()
+WORKERS = config.get("ingestao", {}).get("workers") or os.cpu_count() or 1
+MINIMO_PARA_POOL = 16   # abaixo disso, abrir processos custa mais que extrair
+
+# -----------------------------
+# Leitura de PDF pelo trailer/xref
+# -----------------------------
+# Nada de ler o documento inteiro: a partir do `startxref` no fim do arquivo
+# segue a tabela (ou stream) de referências cruzadas até o catálogo, a árvore
+# de páginas (/Count) e o dicionário /Info (/Title). O arquivo é mapeado com
+# mmap, então só as páginas de disco efetivamente tocadas são lidas.
+_RE_REF = re.compile(rb"\s*(\d+)\s+(\d+)\s+R")
+_RE_INTEIRO = re.compile(rb"\s*(-?\d+)")
+
+
+class PdfInvalido(ValueError):
+    pass
+
+
+def _valor(dicionario: bytes, chave: bytes):
+    """Posição logo após `/Chave` no dicionário (ou -1). Evita casar /Count com /CountX."""
+    for m in re.finditer(rb"/" + chave + rb"(?![A-Za-z0-9])", dicionario):
+        return m.end()
+    return -1
+
+
+def _ref(dicionario: bytes, chave: bytes) -> int | None:
+    inicio = _valor(dicionario, chave)
+    if inicio < 0:
+        return None
+    m = _RE_REF.match(dicionario, inicio)
+    return int(m.group(1)) if m else None
+
+
+def _inteiro(dicionario: bytes, chave: bytes) -> int | None:
+    inicio = _valor(dicionario, chave)
+    if inicio < 0:
+        return None
+    m = _RE_INTEIRO.match(dicionario, inicio)
+    return int(m.group(1)) if m else None
+
+
+def _lista_inteiros(dicionario: bytes, chave: bytes) -> list[int]:
+    inicio = _valor(dicionario, chave)
+    if inicio < 0:
+        return []
+    abre, fecha = dicionario.find(b"[", inicio), dicionario.find(b"]", inicio)
+    return [int(n) for n in dicionario[abre + 1:fecha].split()]
+
+
+def _dicionario(dados: bytes, inicio: int = 0) -> tuple[bytes, int]:
+    """Recorta o primeiro dicionário << ... >> (com aninhamento) a partir de `inicio`; retorna (dicionário, fim)."""
+    abre = dados.find(b"<<", inicio)
+    if abre < 0:
+        raise PdfInvalido("dicionário não encontrado")
+    nivel, i = 0, abre
+    while i < len(dados) - 1:
+        par = dados[i:i + 2]
+        if par == b"<<":
+            nivel += 1
+            i += 2
+            continue
+        if par == b">>":
+            nivel -= 1
+            i += 2
+            if nivel == 0:
+                return dados[abre:i], i
+            continue
+        i += 1
+    raise PdfInvalido("dicionário sem fechamento")
+
+
+def _desfazer_preditor_png(dados: bytes, colunas: int) -> bytes:
+    """Desfaz o preditor PNG (usado em quase todo xref stream; na prática, sempre 'Up')."""
+    largura = colunas + 1
+    saida, anterior = bytearray(), bytearray(colunas)
+    for i in range(0, len(dados), largura):
+        tipo, linha = dados[i], bytearray(dados[i + 1:i + largura])
+        if tipo == 2:
+            linha = bytearray((a + b) & 0xFF for a, b in zip(linha, anterior))
+        elif tipo != 0:
+            raise PdfInvalido(f"preditor PNG {tipo} não suportado")
+        saida += linha
+        anterior = linha
+    return bytes(saida)
+
+
+def _conteudo_stream(mm, dicionario: bytes, fim_dicionario: int) -> bytes:
+    inicio = mm.find(b"stream", fim_dicionario) + len(b"stream")
+    if mm[inicio:inicio + 2] == b"\r\n":
+        inicio += 2
+    elif mm[inicio:inicio + 1] in (b"\n", b"\r"):
+        inicio += 1
+    tamanho = None if _ref(dicionario, b"Length") is not None else _inteiro(dicionario, b"Length")
+    if tamanho is None:   # /Length indireto: procura o fim do stream
+        tamanho = mm.find(b"endstream", inicio) - inicio
+    dados = mm[inicio:inicio + tamanho]
+    if b"/FlateDecode" in dicionario:
+        dados = zlib.decompress(dados)
+        preditor = _inteiro(dicionario, b"Predictor")
+        if preditor and preditor >= 10:
+            dados = _desfazer_preditor_png(dados, _inteiro(dicionario, b"Columns") or 1)
+    elif b"/Filter" in dicionario:
+        raise PdfInvalido("filtro de stream não suportado")
+    return dados
+
+
+class LeitorPdf:
+    """Localiza objetos de um PDF pelas referências cruzadas, sem percorrer o documento."""
+
+    def __init__(self, mm):
+        self.mm = mm
+        self.posicoes = {}       # objeto -> deslocamento no arquivo
+        self.comprimidos = {}    # objeto -> (stream de objetos, índice)
+        self.trailer = b""
+        self._streams_objetos = {}
+        self._ler_xrefs()
+
+    def _ler_xrefs(self):
+        fim = self.mm.rfind(b"startxref", max(0, len(self.mm) - 2048))
+        if fim < 0:
+            raise PdfInvalido("startxref não encontrado")
+        inicio = int(_RE_INTEIRO.match(self.mm, fim + len(b"startxref")).group(1))
+        visitados = set()
+        # A seção mais recente vem primeiro; /Prev aponta para as atualizações anteriores
+        while inicio is not None and inicio not in visitados:
+            visitados.add(inicio)
+            if self.mm[inicio:inicio + 4] == b"xref":
+                dicionario = self._xref_tabela(inicio)
+            else:
+                dicionario = self._xref_stream(inicio)
+            if not self.trailer:
+                self.trailer = dicionario
+            inicio = _inteiro(dicionario, b"Prev")
+
+    def _xref_tabela(self, inicio: int) -> bytes:
+        trailer = self.mm.find(b"trailer", inicio)
+        linhas = self.mm[inicio + 4:trailer].splitlines()
+        numero = 0
+        for linha in linhas:
+            partes = linha.split()
+            if len(partes) == 2:
+                numero = int(partes[0])
+            elif len(partes) == 3:
+                if partes[2] == b"n":
+                    self.posicoes.setdefault(numero, int(partes[0]))
+                numero += 1
+        return _dicionario(self.mm, trailer)[0]
+
+    def _xref_stream(self, inicio: int) -> bytes:
+        dicionario, fim_dicionario = _dicionario(self.mm, inicio)
+        dados = _conteudo_stream(self.mm, dicionario, fim_dicionario)
+        larguras = _lista_inteiros(dicionario, b"W")
+        indice = _lista_inteiros(dicionario, b"Index") or [0, _inteiro(dicionario, b"Size") or 0]
+        tamanho_entrada, pos = sum(larguras), 0
+        for primeiro, quantidade in zip(indice[::2], indice[1::2]):
+            for numero in range(primeiro, primeiro + quantidade):
+                entrada = dados[pos:pos + tamanho_entrada]
+                pos += tamanho_entrada
+                campos, i = [], 0
+                for largura in larguras:
+                    campos.append(int.from_bytes(entrada[i:i + largura], "big") if largura else None)
+                    i += largura
+                tipo = campos[0] if larguras[0] else 1
+                if tipo == 1:
+                    self.posicoes.setdefault(numero, campos[1])
+                elif tipo == 2:
+                    self.comprimidos.setdefault(numero, (campos[1], campos[2]))
+        return dicionario
+
+    def objeto(self, numero: int) -> bytes:
+        """Corpo do objeto `numero` (o que vem entre `obj` e `endobj`)."""
+        if numero in self.posicoes:
+            inicio = self.mm.find(b"obj", self.posicoes[numero]) + 3
+            return self.mm[inicio:self.mm.find(b"endobj", inicio)]
+        if numero in self.comprimidos:
+            stream, indice = self.comprimidos[numero]
+            if stream not in self._streams_objetos:
+                if stream not in self.posicoes:
+                    raise PdfInvalido(f"stream de objetos {stream} ausente das referências cruzadas")
+                dicionario, fim_dicionario = _dicionario(self.mm, self.posicoes[stream])
+                self._streams_objetos[stream] = (dicionario, _conteudo_stream(self.mm, dicionario, fim_dicionario))
+            dicionario, dados = self._streams_objetos[stream]
+            primeiro = _inteiro(dicionario, b"First")
+            cabecalho = [int(n) for n in dados[:primeiro].split()]
+            deslocamentos = cabecalho[1::2]
+            inicio = primeiro + deslocamentos[indice]
+            fim = primeiro + deslocamentos[indice + 1] if indice + 1 < len(deslocamentos) else len(dados)
+            return dados[inicio:fim]
+        raise PdfInvalido(f"objeto {numero} ausente das referências cruzadas")
+
+    def stream(self, numero: int) -> bytes:
+        """Conteúdo decodificado do stream `numero` (streams nunca ficam dentro de object streams)."""
+        if numero not in self.posicoes:
+            raise PdfInvalido(f"stream {numero} ausente das referências cruzadas")
+        dicionario, fim_dicionario = _dicionario(self.mm, self.posicoes[numero])
+        return _conteudo_stream(self.mm, dicionario, fim_dicionario)
+
+
+def _texto_pdf(dados: bytes, inicio: int) -> str | None:
+    """Decodifica a string PDF (literal ou hexadecimal) que começa em `inicio`."""
+    dados = dados[inicio:].lstrip()
+    if dados.startswith(b"("):
+        bruto, nivel, i = bytearray(), 0, 0
+        escapes = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+        while i < len(dados):
+            c = dados[i:i + 1]
+            if c == b"\\":
+                prox = dados[i + 1:i + 2]
+                octal = re.match(rb"[0-7]{1,3}", dados[i + 1:i + 4])
+                if octal:
+                    bruto.append(int(octal.group(), 8) & 0xFF)
+                    i += 1 + len(octal.group())
+                    continue
+                if prox not in (b"\n", b"\r"):
+                    bruto += escapes.get(prox, prox)
+                i += 2
+                continue
+            if c == b"(":
+                nivel += 1
+                if nivel == 1:
+                    i += 1
+                    continue
+            elif c == b")":
+                nivel -= 1
+                if nivel == 0:
+                    break
+            bruto += c
+            i += 1
+    elif dados.startswith(b"<"):
+        hexa = re.sub(rb"\s", b"", dados[1:dados.find(b">")])
+        bruto = bytes.fromhex((hexa + b"0" * (len(hexa) % 2)).decode())
+    else:
+        return None
+    bruto = bytes(bruto)
+    if bruto.startswith(b"\xfe\xff"):
+        return bruto[2:].decode("utf-16-be", errors="replace").strip() or None
+    return bruto.decode("latin-1").strip() or None
+
+
+def _contar_paginas_varrendo(mm) -> int | None:
+    """Plano B para PDFs com xref danificada: maior /Count perto de um /Type /Pages."""
+    contagens = []
+    for m in re.finditer(rb"/Type\s*/Pages\b", mm):
+        janela = mm[max(0, m.start() - 256):m.end() + 256]
+        contagens += [int(c) for c in re.findall(rb"/Count\s+(\d+)", janela)]
+    return max(contagens) if contagens else None
+
+
+def extrair_metadados(caminho: str) -> tuple[int | None, str | None, int]:
+    """(páginas, título, tamanho em bytes) de um PDF. Campos ilegíveis voltam como None."""
+    tamanho = os.path.getsize(caminho)
+    if tamanho == 0:
+        return None, None, 0
+    with open(caminho, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        try:
+            leitor = LeitorPdf(mm)
+            paginas = titulo = None
+            raiz = _ref(leitor.trailer, b"Root")
+            if raiz is not None:
+                arvore = _ref(leitor.objeto(raiz), b"Pages")
+                if arvore is not None:
+                    paginas = _inteiro(leitor.objeto(arvore), b"Count")
+            info = _ref(leitor.trailer, b"Info")
+            if info is not None and _valor(leitor.trailer, b"Encrypt") < 0:
+                corpo = leitor.objeto(info)
+                inicio = _valor(corpo, b"Title")
+                if inicio >= 0:
+                    titulo = _texto_pdf(corpo, inicio)
+            return paginas, titulo, tamanho
+        except (PdfInvalido, ValueError, IndexError, zlib.error, AttributeError, TypeError):
+            return _contar_paginas_varrendo(mm), None, tamanho
+
+
+def _refs(dicionario: bytes, chave: bytes) -> list[int]:
+    """Referências de `/Chave` (uma só ou um array [a 0 R b 0 R])."""
+    inicio = _valor(dicionario, chave)
+    if inicio < 0:
+        return []
+    resto = dicionario[inicio:].lstrip()
+    if resto.startswith(b"["):
+        return [int(n) for n, _ in _RE_REF.findall(resto[1:resto.find(b"]")])]
+    ref = _ref(dicionario, chave)
+    return [ref] if ref is not None else []
+
+
+_RE_BLOCO_TEXTO = re.compile(rb"\bBT\b(.*?)\bET\b", re.S)
+_RE_LITERAL = re.compile(rb"\((?:\\.|[^\\()])*\)", re.S)
+
+
+def _texto_bloco(bloco: bytes) -> str:
+    """Junta as strings de um bloco BT/ET. Entre strings do mesmo array TJ só há ajuste de
+    espaçamento (números); ajustes grandes (<= -200) ou outros operadores viram espaço."""
+    partes, fim_anterior = [], None
+    for literal in _RE_LITERAL.finditer(bloco):
+        if fim_anterior is not None:
+            intervalo = bloco[fim_anterior:literal.start()]
+            numeros = re.fullmatch(rb"[\s\d.\-]*", intervalo)
+            if not numeros or any(float(n) <= -200 for n in re.findall(rb"-?\d+(?:\.\d+)?", intervalo)):
+                partes.append(" ")
+        partes.append(_texto_pdf(literal.group(), 0) or "")
+        fim_anterior = literal.end()
+    return "".join(partes) + " "
+
+
+def texto_primeira_pagina(caminho: str, limite: int = 300) -> str | None:
+    """Trecho do texto da primeira página (strings literais dos blocos BT/ET), ou None se ilegível.
+
+    Fontes com codificação própria (CID/Identity-H) não têm texto recuperável sem
+    a tabela ToUnicode; nesses casos o trecho é descartado.
+    """
+    if os.path.getsize(caminho) == 0:
+        return None
+    with open(caminho, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        try:
+            leitor = LeitorPdf(mm)
+            pagina = _ref(leitor.objeto(_ref(leitor.trailer, b"Root")), b"Pages")
+            for _ in range(32):   # desce pela árvore de páginas até a primeira folha
+                filhos = _refs(leitor.objeto(pagina), b"Kids")
+                if not filhos:
+                    break
+                pagina = filhos[0]
+            pedacos = []
+            for conteudo in _refs(leitor.objeto(pagina), b"Contents"):
+                for bloco in _RE_BLOCO_TEXTO.finditer(leitor.stream(conteudo)):
+                    pedacos.append(_texto_bloco(bloco.group(1)))
+                if sum(map(len, pedacos)) >= limite:
+                    break
+        except (PdfInvalido, ValueError, IndexError, zlib.error, AttributeError, TypeError):
+            return None
+    texto = " ".join("".join(pedacos).split())
+    if not texto or sum(c.isprintable() for c in texto) < 0.9 * len(texto):
+        return None
+    return "".join(c for c in texto if c.isprintable())[:limite]
+
+
+def _extrair_seguro(caminho: str):
+    """Versão para o pool: nunca levanta (arquivo sumido/ilegível vira None).
+
+    Um PDF malformado de um jeito não previsto não pode derrubar o lote inteiro.
+    """
+    try:
+        return extrair_metadados(caminho)
+    except OSError:
+        return None
+    except Exception as e:
+        registrar_log(f"Erro ao extrair metadados de {caminho}: {e!r}", tipo="ERRO", funcao="_extrair_seguro")
+        return None
+
+# -----------------------------
+# Enriquecimento do catálogo
+# -----------------------------
+def enriquecer_metadados(materia_ids=None, reprocessar: bool = False, workers: int = WORKERS) -> int:
+    """Extrai páginas/título/tamanho dos PDFs ainda sem metadados e grava no banco.
+
+    Com `materia_ids`, só os arquivos dessas matérias; com `reprocessar`, inclui
+    os que já têm metadados. Lotes grandes vão para um pool de processos.
+    Retorna a quantidade de arquivos atualizados.
+    """
+    pendentes = MateriaRepository.arquivos_para_metadados(materia_ids, reprocessar=reprocessar)
+    if not pendentes:
+        return 0
+
+    caminhos = [os.path.join(a.pasta_pdf, a.nome_arquivo) for a in pendentes]
+    if len(caminhos) < MINIMO_PARA_POOL or workers <= 1:
+        resultados = list(map(_extrair_seguro, caminhos))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultados = list(pool.map(_extrair_seguro, caminhos, chunksize=max(1, len(caminhos) // (workers * 4))))
+
+    linhas = [
+        {"id": a.id, "paginas": r[0], "titulo": (r[1] or "")[:255] or None, "tamanho_bytes": r[2]}
+        for a, r in zip(pendentes, resultados) if r is not None
+    ]
+    ausentes = len(pendentes) - len(linhas)
+    if ausentes:
+        mostrar_aviso(f"{ausentes} PDFs não encontrados ou ilegíveis; metadados não extraídos.")
+    atualizados = MateriaRepository.gravar_metadados(linhas)
+    registrar_log(f"Metadados extraídos de {atualizados} PDFs.", funcao="enriquecer_metadados")
+    return atualizados
@@ -0,0 +1,287 @@
+import os
+import time
+import tempfile
+from dataclasses import dataclass
+from collections.abc import Callable
+
+from sqlalchemy import BigInteger, Column, Integer, String, create_engine, inspect, select, insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateTable
+
+import db
+from db import Base, VersaoEsquema
+from utils import carregar_config, registrar_log, mostrar_erro, mostrar_aviso, mostrar_sucesso
+
+# -----------------------------
+# Configurações das migrações
+# -----------------------------
+config = carregar_config()
+_cfg_migracoes = config.get("migracoes", {})
+TAMANHO_LOTE = int(_cfg_migracoes.get("tamanho_lote", 5000))
+PAUSA_ENTRE_LOTES = float(_cfg_migracoes.get("pausa_entre_lotes", 0))
+
+# -----------------------------
+# Contexto de execução
+# -----------------------------
+# Cada comando roda na sua própria transação curta: um ALTER/CREATE INDEX não
+# segura a tabela enquanto um backfill roda, e cada lote do backfill é
+# confirmado antes do próximo. Em dry-run os comandos só são registrados
+# (as consultas de leitura, como MIN/MAX dos IDs, ainda vão ao banco).
+class ContextoMigracao:
+    def __init__(self, engine, dry_run: bool = False, tamanho_lote: int = TAMANHO_LOTE):
+        self.engine = engine
+        self.dry_run = dry_run
+        self.tamanho_lote = tamanho_lote
+        self.dialeto = engine.dialect.name
+        self.comandos: list[str] = []
+
+    def tem_tabela(self, tabela: str) -> bool:
+        return inspect(self.engine).has_table(tabela)
+
+    def tem_coluna(self, tabela: str, coluna: str) -> bool:
+        return any(c["name"] == coluna for c in inspect(self.engine).get_columns(tabela))
+
+    def tem_indice(self, tabela: str, indice: str) -> bool:
+        return any(i["name"] == indice for i in inspect(self.engine).get_indexes(tabela))
+
+    def executar(self, sql: str, **params) -> int:
+        """Registra o comando e, fora do dry-run, executa numa transação própria. Retorna as linhas afetadas."""
+        self.comandos.append(sql if not params else f"{sql}  -- {params}")
+        if self.dry_run:
+            return 0
+        with self.engine.begin() as conexao:
+            return conexao.execute(text(sql), params).rowcount
+
+    def adicionar_coluna(self, tabela: str, coluna: Column):
+        """ALTER TABLE ... ADD COLUMN com a definição congelada na migração (não faz nada se já existir).
+
+        Tabela ainda inexistente é criada completa pelo create_all, então também é ignorada.
+        """
+        if not self.tem_tabela(tabela) or self.tem_coluna(tabela, coluna.name):
+            return
+        ddl = f"ALTER TABLE {tabela} ADD COLUMN {coluna.name} {coluna.type.compile(dialect=self.engine.dialect)}"
+        if coluna.server_default is not None:
+            ddl += f" DEFAULT {coluna.server_default.arg}"
+        if not coluna.nullable:
+            ddl += " NOT NULL"
+        self.executar(ddl)
+
+    def criar_indice(self, tabela: str, nome: str, *colunas: str):
+        """CREATE INDEX nomeado; no MySQL sem bloquear escritas (ALGORITHM=INPLACE, LOCK=NONE)."""
+        if not self.tem_tabela(tabela) or self.tem_indice(tabela, nome):
+            return
+        ddl = f"CREATE INDEX {nome} ON {tabela} ({', '.join(colunas)})"
+        if self.dialeto == "mysql":
+            ddl += " ALGORITHM=INPLACE LOCK=NONE"
+        self.executar(ddl)
+
+    def em_lotes(self, tabela: str, set_sql: str, where_sql: str | None = None) -> int:
+        """UPDATE em fatias de `tamanho_lote` IDs, cada fatia na sua transação. Retorna as linhas alteradas."""
+        if not self.tem_tabela(tabela):
+            return 0
+        filtro = f" AND ({where_sql})" if where_sql else ""
+        with self.engine.connect() as conexao:
+            menor, maior = conexao.execute(
+                text(f"SELECT MIN(id), MAX(id) FROM {tabela} WHERE 1=1{filtro}")
+            ).one()
+        if menor is None:
+            return 0
+
+        alteradas = 0
+        for inicio in range(menor, maior + 1, self.tamanho_lote):
+            alteradas += self.executar(
+                f"UPDATE {tabela} SET {set_sql} WHERE id >= :inicio AND id < :fim{filtro}",
+                inicio=inicio, fim=inicio + self.tamanho_lote,
+            )
+            if PAUSA_ENTRE_LOTES and not self.dry_run:
+                time.sleep(PAUSA_ENTRE_LOTES)   # folga para réplicas e outras transações
+        return alteradas
+
+# -----------------------------
+# Migrações (ordenadas por versão)
+# -----------------------------
+# Toda migração é idempotente: bancos criados antes do versionamento já podem
+# ter parte do esquema (create_all cria tabelas novas completas), então cada
+# passo verifica antes de alterar. Nunca reordene ou renumere; só acrescente.
+# Colunas e índices são escritos por extenso em cada migração, nunca lidos dos
+# modelos de db.py: mudar um modelo não pode mudar o que uma migração antiga faz.
+@dataclass(frozen=True)
+class Migracao:
+    versao: int
+    descricao: str
+    aplicar: Callable[[ContextoMigracao], None]
+
+
+MIGRACOES: list[Migracao] = []
+
+def migracao(versao: int, descricao: str):
+    """Registra a função decorada como a migração `versao`."""
+    def registrar(funcao):
+        MIGRACOES.append(Migracao(versao, descricao, funcao))
+        MIGRACOES.sort(key=lambda m: m.versao)
+        return funcao
+    return registrar
+
+
+@migracao(1, "Coluna materias.versao (controle otimista de concorrência)")
+def _versao_materias(ctx: ContextoMigracao):
+    ctx.adicionar_coluna("materias", Column("versao", Integer, nullable=False, server_default="1"))
+
+
+@migracao(2, "Índice em arquivos_materia.materia_id")
+def _indice_arquivos_materia(ctx: ContextoMigracao):
+    ctx.criar_indice("arquivos_materia", "ix_arquivos_materia_materia_id", "materia_id")
+
+
+@migracao(3, "Índices de data_criacao/data_conclusao e mes_inicio")
+def _indices_datas(ctx: ContextoMigracao):
+    ctx.criar_indice("materias", "idx_mes_inicio", "mes_inicio")
+    ctx.criar_indice("materias", "idx_data_criacao", "data_criacao")
+    ctx.criar_indice("materias", "idx_data_conclusao", "data_conclusao")
+
+
+@migracao(4, "Colunas de metadados dos PDFs (paginas, titulo, tamanho_bytes)")
+def _metadados_pdf(ctx: ContextoMigracao):
+    for tabela in ("arquivos_materia", "arquivos_materia_arquivados"):
+        ctx.adicionar_coluna(tabela, Column("paginas", Integer, nullable=True))
+        ctx.adicionar_coluna(tabela, Column("titulo", String(255), nullable=True))
+        ctx.adicionar_coluna(tabela, Column("tamanho_bytes", BigInteger, nullable=True))
+
+
+@migracao(5, "mes_inicio em minúsculas (filtros por mês usam idx_mes_inicio sem LOWER())")
+def _mes_minusculo(ctx: ContextoMigracao):
+    # Em MySQL com collation case-insensitive o "<>" não distingue caixa; o UPDATE
+    # roda em todas as fatias e o próprio MySQL ignora as linhas sem mudança
+    filtro = None if ctx.dialeto == "mysql" else "mes_inicio <> LOWER(mes_inicio)"
+    for tabela in ("materias", "materias_arquivadas"):
+        ctx.em_lotes(tabela, "mes_inicio = LOWER(mes_inicio)", filtro)
+
+
+@migracao(6, "Coluna digest (SHA-256) dos PDFs, chave do cache de previews")
+def _digest_pdf(ctx: ContextoMigracao):
+    ctx.adicionar_coluna("arquivos_materia", Column("digest", String(64), nullable=True))
+    ctx.adicionar_coluna("arquivos_materia_arquivados", Column("digest", String(64), nullable=True))
+    ctx.criar_indice("arquivos_materia", "ix_arquivos_materia_digest", "digest")
+
+# -----------------------------
+# Execução
+# -----------------------------
+def versoes_aplicadas(engine) -> set[int]:
+    if not inspect(engine).has_table(VersaoEsquema.__tablename__):
+        return set()
+    with engine.connect() as conexao:
+        return set(conexao.execute(select(VersaoEsquema.versao)).scalars())
+
+
+def aplicar_migracoes(dry_run: bool = False, silencioso: bool = False, engine=None) -> list[str]:
+    """Cria as tabelas que faltam e aplica, em ordem, as migrações ainda não registradas em versao_esquema.
+
+    Usa o banco configurado, ou `engine` se informado. Retorna os comandos executados (ou planejados, em dry-run).
+    """
+    engine = engine if engine is not None else db.engine
+    ctx = ContextoMigracao(engine, dry_run=dry_run)
+
+    # Tabelas inteiramente novas nascem com o esquema atual
+    for tabela in Base.metadata.sorted_tables:
+        if not ctx.tem_tabela(tabela.name):
+            ctx.comandos.append(str(CreateTable(tabela).compile(dialect=engine.dialect)).strip())
+    if dry_run and ctx.comandos:
+        print("-- Tabelas novas (create_all)")
+        for comando in ctx.comandos:
+            print(f"   {comando};")
+    if not dry_run:
+        Base.metadata.create_all(bind=engine)
+
+    aplicadas = versoes_aplicadas(engine)
+    pendentes = [m for m in MIGRACOES if m.versao not in aplicadas]
+    for m in pendentes:
+        inicio = len(ctx.comandos)
+        t0 = time.perf_counter()
+        m.aplicar(ctx)
+        if dry_run:
+            print(f"-- {m.versao}: {m.descricao}")
+            for comando in ctx.comandos[inicio:]:
+                print(f"   {comando};")
+            continue
+        try:
+            with engine.begin() as conexao:
+                conexao.execute(insert(VersaoEsquema).values(versao=m.versao, descricao=m.descricao))
+        except IntegrityError:
+            pass   # outro processo aplicou a mesma migração ao mesmo tempo (os passos são idempotentes)
+        registrar_log(
+            f"Migração {m.versao} aplicada ({len(ctx.comandos) - inicio} comandos, {time.perf_counter() - t0:.2f}s): {m.descricao}",
+            funcao="aplicar_migracoes",
+        )
+
+    if dry_run:
+        mostrar_aviso(f"Dry-run: {len(pendentes)} migrações pendentes, {len(ctx.comandos)} comandos planejados (nada foi alterado).")
+    elif pendentes and not silencioso:
+        mostrar_sucesso(f"{len(pendentes)} migrações aplicadas; esquema na versão {MIGRACOES[-1].versao}.")
+    elif pendentes:
+        registrar_log(f"Esquema atualizado para a versão {MIGRACOES[-1].versao}.", funcao="aplicar_migracoes")
+    elif not silencioso:
+        mostrar_sucesso(f"Esquema já está na versão {MIGRACOES[-1].versao}.")
+    return ctx.comandos
+
+# -----------------------------
+# Verificação sobre o esquema original
+# -----------------------------
+# Esquema anterior ao versionamento, em SQL literal: a verificação não pode
+# depender dos modelos atuais, senão só confirmaria o próprio create_all.
+ESQUEMA_ORIGINAL = (
+    """CREATE TABLE materias (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome VARCHAR(255) NOT NULL,
+        pasta_pdf VARCHAR(255) NOT NULL,
+        mes_inicio VARCHAR(50) NOT NULL,
+        concluida BOOLEAN NOT NULL,
+        data_criacao DATETIME NOT NULL,
+        data_conclusao DATETIME
+    )""",
+    "CREATE INDEX ix_materias_nome ON materias (nome)",
+    "CREATE INDEX ix_materias_concluida ON materias (concluida)",
+    "CREATE INDEX idx_mes_inicio ON materias (mes_inicio)",
+    "CREATE INDEX idx_concluida ON materias (concluida)",
+    """CREATE TABLE arquivos_materia (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        materia_id INTEGER NOT NULL REFERENCES materias (id) ON DELETE CASCADE,
+        nome_arquivo VARCHAR(255) NOT NULL
+    )""",
+    "INSERT INTO materias VALUES (1, 'Exemplo', 'exemplo', 'Março', 0, '2024-03-01 00:00:00', NULL)",
+    "INSERT INTO arquivos_materia VALUES (1, 1, 'exemplo.pdf')",
+)
+
+
+def verificar_migracoes() -> bool:
+    """Aplica todas as migrações num SQLite temporário com o esquema original e compara o resultado com db.py.
+
+    Retorna True se nenhuma migração falhou e nenhuma coluna ou índice dos modelos ficou faltando.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'original.db')}")
+        try:
+            with engine.begin() as conexao:
+                for ddl in ESQUEMA_ORIGINAL:
+                    conexao.execute(text(ddl))
+            aplicar_migracoes(silencioso=True, engine=engine)
+
+            inspetor = inspect(engine)
+            faltando = []
+            for tabela in Base.metadata.sorted_tables:
+                colunas = {c["name"] for c in inspetor.get_columns(tabela.name)}
+                indices = {i["name"] for i in inspetor.get_indexes(tabela.name)}
+                faltando += [f"{tabela.name}.{c.name}" for c in tabela.columns if c.name not in colunas]
+                faltando += [f"{tabela.name}:{i.name}" for i in tabela.indexes if i.name not in indices]
+        except Exception as e:
+            registrar_log(f"Migrações falharam sobre o esquema original: {e}", tipo="ERRO", funcao="verificar_migracoes")
+            mostrar_erro(f"Migrações falharam sobre o esquema original: {e}")
+            return False
+        finally:
+            engine.dispose()
+
+    if faltando:
+        registrar_log(f"Esquema migrado difere dos modelos: {', '.join(faltando)}", tipo="ERRO", funcao="verificar_migracoes")
+        mostrar_erro(f"Esquema migrado difere dos modelos (falta {', '.join(faltando)}).")
+        return False
+    mostrar_sucesso(f"Migrações 1-{MIGRACOES[-1].versao} aplicadas sobre o esquema original sem divergências.")
+    return True
@@ -0,0 +1,285 @@
+import os
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+
+from db import MateriaRepository
+from materias import pasta_organizada
+from diario_importacao import copiar_atomico
+from metadados_pdf import enriquecer_metadados
+from previews import gerar_previews_em_segundo_plano
+from utils import carregar_config, registrar_log, mostrar_aviso, mostrar_sucesso, mostrar_erro
+
+# -----------------------------
+# Configurações do monitor
+# -----------------------------
+config = carregar_config()
+_cfg_monitor = config.get("monitoramento", {})
+DEBOUNCE_SEGUNDOS = float(_cfg_monitor.get("debounce_segundos", 2))
+INTERVALO_POLLING = float(_cfg_monitor.get("intervalo_polling", 5))
+INTERVALO_RECARGA = float(_cfg_monitor.get("intervalo_recarga_pastas", 30))
+
+# -----------------------------
+# Snapshot de pasta (size, mtime)
+# -----------------------------
+def snapshot_pasta(pasta: str) -> dict[str, tuple[int, float]] | None:
+    """Retorna {nome_pdf: (tamanho, mtime)} da pasta, ou None se ela não puder ser lida."""
+    snapshot = {}
+    try:
+        with os.scandir(pasta) as entradas:
+            for entrada in entradas:
+                if entrada.name.lower().endswith(".pdf") and entrada.is_file():
+                    st = entrada.stat()
+                    snapshot[entrada.name] = (st.st_size, st.st_mtime)
+    except OSError:
+        return None
+    return snapshot
+
+# -----------------------------
+# Fonte de eventos: inotify (Linux)
+# -----------------------------
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+MASCARA_EVENTOS = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+_EVENTO = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class FonteInotify:
+    """Recebe eventos do kernel via inotify (libc + ctypes, sem dependências externas)."""
+
+    def __init__(self):
+        nome_libc = ctypes.util.find_library("c")
+        if not nome_libc:
+            raise OSError("libc não encontrada")
+        self._libc = ctypes.CDLL(nome_libc, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self._pastas_por_wd = {}
+        self._wd_por_pasta = {}
+
+    def adicionar(self, pasta: str):
+        if pasta in self._wd_por_pasta:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(pasta), MASCARA_EVENTOS)
+        if wd < 0:
+            mostrar_aviso(f"Não foi possível monitorar a pasta '{pasta}' (errno {ctypes.get_errno()}).")
+            return
+        self._pastas_por_wd[wd] = pasta
+        self._wd_por_pasta[pasta] = wd
+
+    def remover(self, pasta: str):
+        wd = self._wd_por_pasta.pop(pasta, None)
+        if wd is not None:
+            self._pastas_por_wd.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def ler(self, timeout: float) -> set[str]:
+        """Espera até `timeout` segundos e retorna as pastas que tiveram eventos."""
+        prontos, _, _ = select.select([self._fd], [], [], timeout)
+        if not prontos:
+            return set()
+        alteradas = set()
+        while True:
+            try:
+                dados = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(dados):
+                wd, mascara, _, tamanho = _EVENTO.unpack_from(dados, pos)
+                pos += _EVENTO.size + tamanho
+                if mascara & IN_Q_OVERFLOW:
+                    # Fila do kernel estourou: considera todas as pastas alteradas
+                    alteradas.update(self._wd_por_pasta)
+                elif wd in self._pastas_por_wd:
+                    alteradas.add(self._pastas_por_wd[wd])
+        return alteradas
+
+    def fechar(self):
+        os.close(self._fd)
+
+# -----------------------------
+# Fonte de eventos: polling (fallback)
+# -----------------------------
+class FontePolling:
+    """Detecta mudanças comparando snapshots (size, mtime) feitos com os.scandir."""
+
+    def __init__(self, intervalo: float = INTERVALO_POLLING):
+        self.intervalo = intervalo
+        self._snapshots = {}
+        self._proxima_varredura = time.monotonic() + intervalo
+
+    def adicionar(self, pasta: str):
+        self._snapshots.setdefault(pasta, snapshot_pasta(pasta))
+
+    def remover(self, pasta: str):
+        self._snapshots.pop(pasta, None)
+
+    def ler(self, timeout: float) -> set[str]:
+        espera = self._proxima_varredura - time.monotonic()
+        if espera > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(espera, 0))
+        self._proxima_varredura = time.monotonic() + self.intervalo
+
+        alteradas = set()
+        for pasta, anterior in self._snapshots.items():
+            atual = snapshot_pasta(pasta)
+            if atual != anterior:
+                self._snapshots[pasta] = atual
+                alteradas.add(pasta)
+        return alteradas
+
+    def fechar(self):
+        self._snapshots.clear()
+
+# -----------------------------
+# Monitor de pastas
+# -----------------------------
+class MonitorPastas:
+    """Mantém `arquivos_materia` e as cópias em materias/<mes>/<nome> em sincronia com as pastas de PDFs.
+
+    Eventos em rajada são agrupados (debounce): uma pasta só é reprocessada depois
+    de ficar `debounce` segundos sem eventos, e todas as pastas prontas são
+    gravadas numa única transação.
+    """
+
+    def __init__(self, debounce: float = DEBOUNCE_SEGUNDOS, forcar_polling: bool = False):
+        self.debounce = debounce
+        self.fonte = None
+        if not forcar_polling:
+            try:
+                self.fonte = FonteInotify()
+                registrar_log("Monitor usando inotify.", funcao="MonitorPastas")
+            except (OSError, AttributeError) as e:
+                mostrar_aviso(f"inotify indisponível ({e}); usando polling.")
+        if self.fonte is None:
+            self.fonte = FontePolling()
+            registrar_log(f"Monitor usando polling a cada {self.fonte.intervalo}s.", funcao="MonitorPastas")
+
+        self.materias_por_pasta = {}   # pasta -> [(id, nome, mes_inicio)]
+        self.snapshots = {}            # pasta -> {nome_pdf: (tamanho, mtime)} já aplicado
+        self.pendentes = {}            # pasta -> instante do último evento
+
+    def recarregar_pastas(self):
+        """Relê as matérias cadastradas e ajusta as pastas monitoradas. Retorna as pastas novas."""
+        atuais = {}
+        for m in MateriaRepository.projetar(("id", "nome", "mes_inicio", "pasta_pdf"), com_qtd_arquivos=False):
+            atuais.setdefault(os.path.normpath(m.pasta_pdf), []).append((m.id, m.nome, m.mes_inicio))
+
+        for pasta in set(self.materias_por_pasta) - set(atuais):
+            self.fonte.remover(pasta)
+            self.snapshots.pop(pasta, None)
+            self.pendentes.pop(pasta, None)
+        novas = set(atuais) - set(self.materias_por_pasta)
+        for pasta in novas:
+            self.fonte.adicionar(pasta)
+
+        self.materias_por_pasta = atuais
+        return novas
+
+    def aplicar(self, pastas):
+        """Reconcilia as pastas informadas com o banco e com as cópias organizadas."""
+        alteracoes = {}
+        copias = []
+        modificadas = set()
+        for pasta in pastas:
+            snapshot = snapshot_pasta(pasta)
+            if snapshot is None:
+                mostrar_aviso(f"Pasta inacessível, ignorada nesta rodada: {pasta}")
+                continue
+            anterior = self.snapshots.get(pasta, {})
+            modificados = {n for n, info in snapshot.items() if n in anterior and anterior[n] != info}
+
+            materias = self.materias_por_pasta.get(pasta, [])
+            no_banco = MateriaRepository.arquivos_por_materia([m[0] for m in materias])
+            for id_materia, nome, mes in materias:
+                registrados = set(no_banco.get(id_materia, []))
+                novos = set(snapshot) - registrados
+                removidos = registrados - set(snapshot)
+                if novos or removidos:
+                    alteracoes[id_materia] = (sorted(novos), sorted(removidos))
+                if modificados & registrados:
+                    modificadas.add(id_materia)
+                for arquivo in novos | modificados:
+                    copias.append((os.path.join(pasta, arquivo), pasta_organizada(mes, nome), arquivo))
+            self.snapshots[pasta] = snapshot
+
+        inseridos, removidos = MateriaRepository.sincronizar_arquivos(alteracoes) if alteracoes else (0, 0)
+
+        for origem, destino_pasta, arquivo in copias:
+            try:
+                os.makedirs(destino_pasta, exist_ok=True)
+                copiar_atomico(origem, os.path.join(destino_pasta, arquivo))
+            except OSError as e:
+                registrar_log(f"Erro ao copiar {origem}: {e}", tipo="ERRO", funcao="aplicar")
+
+        # Metadados dos PDFs novos e dos que mudaram de conteúdo
+        if inseridos:
+            enriquecer_metadados(list(alteracoes))
+        if modificadas:
+            enriquecer_metadados(sorted(modificadas), reprocessar=True)
+        # Previews em segundo plano: não seguram o monitor
+        if inseridos:
+            gerar_previews_em_segundo_plano(list(alteracoes))
+        if modificadas:
+            gerar_previews_em_segundo_plano(sorted(modificadas), reprocessar=True)
+
+        if inseridos or removidos or copias:
+            mostrar_sucesso(
+                f"Sincronizado: {inseridos} PDFs novos, {removidos} removidos, {len(copias)} cópias atualizadas."
+            )
+
+    def executar(self, sincronizar_inicio: bool = True):
+        """Laço principal do monitor (Ctrl+C para encerrar)."""
+        novas = self.recarregar_pastas()
+        if sincronizar_inicio:
+            self.aplicar(novas)
+        else:
+            for pasta in novas:
+                self.snapshots[pasta] = snapshot_pasta(pasta) or {}
+        mostrar_sucesso(f"Monitorando {len(self.materias_por_pasta)} pastas de PDFs. Ctrl+C para encerrar.")
+
+        proxima_recarga = time.monotonic() + INTERVALO_RECARGA
+        try:
+            while True:
+                for pasta in self.fonte.ler(timeout=self.debounce):
+                    self.pendentes[pasta] = time.monotonic()
+
+                agora = time.monotonic()
+                prontas = [p for p, t in self.pendentes.items() if agora - t >= self.debounce]
+                if prontas:
+                    for pasta in prontas:
+                        del self.pendentes[pasta]
+                    self.aplicar(prontas)
+
+                if agora >= proxima_recarga:
+                    novas = self.recarregar_pastas()
+                    if novas:
+                        self.aplicar(novas)
+                    proxima_recarga = agora + INTERVALO_RECARGA
+        except KeyboardInterrupt:
+            mostrar_sucesso("Monitor de pastas encerrado.")
+        except Exception as e:
+            registrar_log(f"Erro no monitor de pastas: {e}", tipo="ERRO", funcao="executar")
+            mostrar_erro(f"Erro no monitor de pastas: {e}")
+        finally:
+            self.fonte.fechar()
+
+
+def monitorar_pastas(forcar_polling: bool = False):
+    """Inicia o monitor de pastas em primeiro plano."""
+    MonitorPastas(forcar_polling=forcar_polling).executar()
@@ -0,0 +1,293 @@
+import time
+import heapq
+import sqlite3
+import threading
+from collections import defaultdict
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import select, func
+
+from db import Materia, ArquivoMateria, sessao_leitura, ao_gravar
+from cache_local import CacheLocal, COLUNAS_MATERIA, COLUNAS_ARQUIVO
+from materias import MESES
+from utils import carregar_config, registrar_log, mostrar_aviso
+
+# -----------------------------
+# Configurações do particionamento
+# -----------------------------
+config = carregar_config()
+_cfg_particoes = config.get("particionamento", {})
+ATIVO = bool(_cfg_particoes.get("ativo", False))
+PASTA_PARTICOES = Path(__file__).parent / _cfg_particoes.get("pasta", "particoes")
+GRANULARIDADE = _cfg_particoes.get("granularidade", "semestre")   # "semestre" ou "ano"
+VALIDADE_SEGUNDOS = float(_cfg_particoes.get("validade_segundos", 300))
+
+LOTE_INDICE = 900   # abaixo do limite de parâmetros por comando do SQLite
+
+# -----------------------------
+# Período letivo de uma matéria
+# -----------------------------
+# Ano de data_criacao + semestre de mes_inicio (janeiro–junho = 1, julho–dezembro = 2).
+# Meses fora da lista (cadastros antigos) usam o mês de data_criacao.
+def periodo_letivo(data_criacao: datetime, mes_inicio: str) -> str:
+    if GRANULARIDADE == "ano":
+        return f"{data_criacao.year}"
+    mes = mes_inicio.strip().lower()
+    indice = MESES.index(mes) if mes in MESES else data_criacao.month - 1
+    return f"{data_criacao.year}-{1 if indice < 6 else 2}"
+
+
+def _ano(periodo: str) -> int:
+    return int(periodo.split("-")[0])
+
+
+def _semestre(periodo: str) -> int | None:
+    partes = periodo.split("-")
+    return int(partes[1]) if len(partes) > 1 else None
+
+# -----------------------------
+# Partição (um arquivo SQLite por período)
+# -----------------------------
+class Particao(CacheLocal):
+    """Um período letivo: mesmo esquema e consultas do cache local, mas quem o atualiza é o catálogo."""
+
+    def __init__(self, caminho: Path):
+        super().__init__(caminho, validade=float("inf"))
+
+    def garantir_atualizado(self):
+        pass
+
+
+# -----------------------------
+# Catálogo particionado por período
+# -----------------------------
+# O MySQL não serve aqui como particionamento nativo: tabelas InnoDB
+# particionadas não aceitam chaves estrangeiras (arquivos_materia depende do
+# ON DELETE CASCADE) e toda chave única teria de incluir a coluna do período.
+# Então o banco continua sendo a fonte da verdade e o catálogo distribui uma
+# cópia das linhas em arquivos particoes/<periodo>.sqlite, atualizada de forma
+# incremental como o cache local. `indice.sqlite` guarda o período de cada ID.
+class CatalogoParticionado:
+    """Fonte de listagem particionada: mesma interface de MateriaRepository.projetar/arquivos_por_materia.
+
+    Filtros por mês ou por período só abrem as partições que podem conter as
+    linhas; listagens que cruzam partições são intercaladas por ID (k-way merge
+    sobre os cursores de cada partição, sem carregar uma partição inteira antes).
+    """
+
+    def __init__(self, pasta: Path = PASTA_PARTICOES, validade: float = VALIDADE_SEGUNDOS):
+        self.pasta = Path(pasta)
+        self.validade = validade
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        # `invalidar` roda no hook after_commit, na thread que gravou (como no cache local)
+        self.indice = sqlite3.connect(self.pasta / "indice.sqlite", check_same_thread=False)
+        self._trava = threading.RLock()
+        self.indice.execute("PRAGMA journal_mode = WAL")
+        self.indice.executescript("""
+            CREATE TABLE IF NOT EXISTS indice (id INTEGER PRIMARY KEY, periodo TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor REAL NOT NULL);
+        """)
+        self._particoes: dict[str, Particao] = {}
+
+    # --- partições ---
+    def periodos(self) -> list[str]:
+        return sorted(p.stem for p in self.pasta.glob("*.sqlite") if p.stem != "indice")
+
+    def particao(self, periodo: str) -> Particao:
+        if periodo not in self._particoes:
+            self._particoes[periodo] = Particao(self.pasta / f"{periodo}.sqlite")
+        return self._particoes[periodo]
+
+    def _podar(self, meses: Sequence[str] | None, periodo) -> list[str]:
+        """Partições que podem ter linhas para os filtros informados."""
+        periodos = self.periodos()
+        if meses and GRANULARIDADE == "semestre":
+            meses = [m.strip().lower() for m in meses]
+            if all(m in MESES for m in meses):
+                semestres = {1 if MESES.index(m) < 6 else 2 for m in meses}
+                periodos = [p for p in periodos if _semestre(p) in semestres]
+        if periodo:
+            campo, inicio, fim = periodo
+            ano_fim = (fim - timedelta(microseconds=1)).year if fim else None
+            if ano_fim is not None:
+                # Conclusão nunca é anterior à criação: só partições criadas até o fim do intervalo
+                periodos = [p for p in periodos if _ano(p) <= ano_fim]
+            if campo == "criacao" and inicio is not None:
+                periodos = [p for p in periodos if _ano(p) >= inicio.year]
+        return periodos
+
+    # --- metadados ---
+    def _meta(self, chave: str, padrao: float = 0) -> float:
+        linha = self.indice.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else padrao
+
+    def _definir_meta(self, **valores):
+        self.indice.executemany(
+            "INSERT INTO meta (chave, valor) VALUES (?, ?) ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+            valores.items(),
+        )
+
+    def invalidar(self):
+        with self._trava:
+            self._definir_meta(atualizado_em=0)
+            self.indice.commit()
+
+    def valido(self) -> bool:
+        return time.time() - self._meta("atualizado_em") < self.validade
+
+    # --- atualização a partir do banco ---
+    def atualizar(self, completo: bool = False):
+        """Distribui as linhas novas do banco pelas partições; edições e remoções forçam redistribuir tudo."""
+        with self._trava:
+            self._atualizar(completo)
+
+    def _atualizar(self, completo: bool):
+        inicio = time.perf_counter()
+        marca_materias = 0 if completo else int(self._meta("max_id_materias"))
+        marca_arquivos = 0 if completo else int(self._meta("max_id_arquivos"))
+        colunas_materia = [getattr(Materia, c) for c in COLUNAS_MATERIA]
+        colunas_arquivo = [getattr(ArquivoMateria, c) for c in COLUNAS_ARQUIVO]
+
+        with sessao_leitura() as session:
+            novas_materias = session.execute(select(*colunas_materia).where(Materia.id > marca_materias)).all()
+            novos_arquivos = session.execute(select(*colunas_arquivo).where(ArquivoMateria.id > marca_arquivos)).all()
+            digital_materias = tuple(session.execute(
+                select(func.count(Materia.id), func.coalesce(func.sum(Materia.versao), 0))
+            ).one())
+            digital_arquivos = tuple(session.execute(
+                select(func.count(ArquivoMateria.id), func.coalesce(func.sum(ArquivoMateria.tamanho_bytes), 0))
+            ).one())
+
+            if completo:
+                self._esvaziar(materias=True, arquivos=True)
+            self._distribuir_materias(novas_materias)
+            self._distribuir_arquivos(novos_arquivos)
+
+            if self._somar("_digital_materias") != digital_materias:
+                self._esvaziar(materias=True, arquivos=True)
+                self._distribuir_materias(session.execute(select(*colunas_materia)).all())
+                self._distribuir_arquivos(session.execute(select(*colunas_arquivo)).all())
+            elif self._somar("_digital_arquivos") != digital_arquivos:
+                self._esvaziar(arquivos=True)
+                self._distribuir_arquivos(session.execute(select(*colunas_arquivo)).all())
+
+        with self.indice:
+            self._definir_meta(
+                atualizado_em=time.time(),
+                max_id_materias=max((self.particao(p)._max_id("materias") for p in self.periodos()), default=0),
+                max_id_arquivos=max((self.particao(p)._max_id("arquivos_materia") for p in self.periodos()), default=0),
+            )
+        registrar_log(
+            f"Partições atualizadas em {(time.perf_counter() - inicio) * 1000:.1f} ms "
+            f"({len(novas_materias)} matérias e {len(novos_arquivos)} arquivos novos, {len(self.periodos())} períodos).",
+            funcao="atualizar",
+        )
+
+    def _esvaziar(self, materias: bool = False, arquivos: bool = False):
+        for periodo in self.periodos():
+            with self.particao(periodo).conexao as conexao:
+                if materias:
+                    conexao.execute("DELETE FROM materias")
+                if arquivos:
+                    conexao.execute("DELETE FROM arquivos_materia")
+        if materias:
+            with self.indice:
+                self.indice.execute("DELETE FROM indice")
+
+    def _distribuir_materias(self, linhas):
+        por_periodo = defaultdict(list)
+        for m in linhas:
+            por_periodo[periodo_letivo(m.data_criacao, m.mes_inicio)].append(m)
+        for periodo, materias in por_periodo.items():
+            with self.particao(periodo).conexao:
+                self.particao(periodo)._gravar_materias(materias)
+            with self.indice:
+                self.indice.executemany(
+                    "INSERT OR REPLACE INTO indice (id, periodo) VALUES (?, ?)", ((m.id, periodo) for m in materias)
+                )
+
+    def _distribuir_arquivos(self, linhas):
+        linhas = list(linhas)
+        periodos = self._periodos_por_id({a.materia_id for a in linhas})
+        por_periodo = defaultdict(list)
+        for a in linhas:
+            if a.materia_id in periodos:
+                por_periodo[periodos[a.materia_id]].append(a)
+        for periodo, arquivos in por_periodo.items():
+            with self.particao(periodo).conexao:
+                self.particao(periodo)._gravar_arquivos(arquivos)
+
+    def _periodos_por_id(self, ids) -> dict[int, str]:
+        ids, resultado = list(ids), {}
+        for i in range(0, len(ids), LOTE_INDICE):
+            bloco = ids[i:i + LOTE_INDICE]
+            resultado.update(self.indice.execute(
+                f"SELECT id, periodo FROM indice WHERE id IN ({', '.join('?' * len(bloco))})", bloco
+            ))
+        return resultado
+
+    def _somar(self, digital: str) -> tuple[int, int]:
+        total_linhas = total_soma = 0
+        for periodo in self.periodos():
+            linhas, soma = getattr(self.particao(periodo), digital)()
+            total_linhas, total_soma = total_linhas + linhas, total_soma + soma
+        return total_linhas, total_soma
+
+    def garantir_atualizado(self):
+        """Atualiza as partições se expiraram; se o banco estiver inacessível, segue com as atuais."""
+        if self.valido():
+            return
+        try:
+            self.atualizar()
+        except Exception as e:
+            registrar_log(f"Banco indisponível, usando partições locais: {e}", tipo="WARNING", funcao="garantir_atualizado")
+            mostrar_aviso("Banco indisponível: exibindo dados das partições locais (podem estar desatualizados).")
+
+    # --- leitura (mesma interface do MateriaRepository) ---
+    def iterar(self, colunas: Sequence[str] = ("id", "nome", "mes_inicio", "concluida", "data_criacao", "data_conclusao"),
+               concluidas: int | None = None, meses: Sequence[str] | None = None,
+               com_qtd_arquivos: bool = True,
+               periodo: tuple[str, datetime | None, datetime | None] | None = None,
+               com_totais: bool = False):
+        """Gera as linhas de todas as partições relevantes já intercaladas (por ID, ou pela data do período)."""
+        cursores = [
+            self.particao(p).consultar(colunas, concluidas, meses, com_qtd_arquivos, periodo, com_totais)
+            for p in self._podar(meses, periodo)
+        ]
+        coluna_data = f"data_{periodo[0]}" if periodo else None
+        if coluna_data in colunas:
+            return heapq.merge(*cursores, key=lambda m: (getattr(m, coluna_data), m.id))
+        return heapq.merge(*cursores, key=lambda m: m.id)
+
+    def projetar(self, colunas: Sequence[str] = ("id", "nome", "mes_inicio", "concluida", "data_criacao", "data_conclusao"),
+                 **filtros):
+        """Equivalente a MateriaRepository.projetar, servido pelas partições."""
+        self.garantir_atualizado()
+        return list(self.iterar(colunas, **filtros))
+
+    def arquivos_por_materia(self, ids: Sequence[int]) -> dict[int, list[str]]:
+        """Equivalente a MateriaRepository.arquivos_por_materia: cada ID é lido só da sua partição."""
+        por_periodo = defaultdict(list)
+        for materia_id, periodo in self._periodos_por_id(ids).items():
+            por_periodo[periodo].append(materia_id)
+        resultado = {i: [] for i in ids}
+        for periodo, ids_periodo in por_periodo.items():
+            resultado.update(self.particao(periodo).arquivos_por_materia(ids_periodo))
+        return resultado
+
+
+_catalogo = None
+
+def obter_catalogo() -> CatalogoParticionado:
+    """Retorna o catálogo particionado compartilhado do processo (criado na primeira chamada)."""
+    global _catalogo
+    if _catalogo is None:
+        _catalogo = CatalogoParticionado()
+    return _catalogo
+
+@ao_gravar
+def _invalidar_apos_gravacao():
+    if _catalogo is not None or (PASTA_PARTICOES / "indice.sqlite").exists():
+        obter_catalogo().invalidar()
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import itertools
+import threading
+import subprocess
+from collections import namedtuple
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from db import MateriaRepository
+from metadados_pdf import texto_primeira_pagina, WORKERS, MINIMO_PARA_POOL
+from utils import carregar_config, registrar_log, mostrar_aviso
+
+# -----------------------------
+# Configurações dos previews
+# -----------------------------
+config = carregar_config()
+_cfg_previews = config.get("previews", {})
+PASTA_PREVIEWS = Path(__file__).parent / _cfg_previews.get("pasta", "previews")
+LIMITE_BYTES = int(_cfg_previews.get("limite_mb", 256)) * 1024 * 1024
+LARGURA_MINIATURA = int(_cfg_previews.get("largura_miniatura", 160))
+CARACTERES_TRECHO = int(_cfg_previews.get("caracteres_trecho", 300))
+
+BLOCO_HASH = 1024 * 1024
+# Miniaturas dependem do pdftoppm (poppler-utils); sem ele, o preview fica só com o trecho de texto
+PDFTOPPM = shutil.which("pdftoppm")
+
+Preview = namedtuple("Preview", ["digest", "texto", "miniatura"])
+
+# -----------------------------
+# Cache em disco (chave = SHA-256 do conteúdo)
+# -----------------------------
+# previews/<ab>/<digest>.json guarda o trecho de texto e previews/<ab>/<digest>.png
+# a miniatura da primeira página. PDFs idênticos (mesmo conteúdo em matérias
+# diferentes) compartilham a mesma entrada. `indice.sqlite` guarda o tamanho e o
+# último uso de cada entrada: passando de `limite_mb`, as menos usadas saem primeiro.
+def caminhos_entrada(pasta: Path, digest: str) -> tuple[Path, Path]:
+    base = Path(pasta) / digest[:2] / digest
+    return base.with_suffix(".json"), base.with_suffix(".png")
+
+
+class CachePreviews:
+    def __init__(self, pasta: Path = PASTA_PREVIEWS, limite_bytes: int = LIMITE_BYTES):
+        self.pasta = Path(pasta)
+        self.limite_bytes = limite_bytes
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self._trava = threading.Lock()   # gravações vêm da thread de geração em segundo plano
+        self.conexao = sqlite3.connect(self.pasta / "indice.sqlite", check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode = WAL")
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS entradas (digest TEXT PRIMARY KEY, tamanho INTEGER NOT NULL, usado_em REAL NOT NULL)"
+        )
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS idx_entradas_usado_em ON entradas (usado_em)")
+
+    def _caminhos(self, digest: str) -> tuple[Path, Path]:
+        return caminhos_entrada(self.pasta, digest)
+
+    def contem(self, digest: str) -> bool:
+        return self._caminhos(digest)[0].exists()
+
+    def obter(self, digests: Sequence[str]) -> dict[str, Preview]:
+        """Previews em cache para os digests informados (os ausentes ficam de fora). Marca o uso para o LRU."""
+        resultado = {}
+        for digest in set(digests):
+            dados, miniatura = self._caminhos(digest)
+            try:
+                with open(dados, "r", encoding="utf-8") as f:
+                    texto = json.load(f).get("texto")
+            except (OSError, ValueError):
+                continue
+            resultado[digest] = Preview(digest, texto, str(miniatura) if miniatura.exists() else None)
+        if resultado:
+            with self._trava, self.conexao:
+                self.conexao.executemany(
+                    "UPDATE entradas SET usado_em = ? WHERE digest = ?", ((time.time(), d) for d in resultado)
+                )
+        return resultado
+
+    def gravar(self, digest: str, texto: str | None, png: bytes | None):
+        dados, miniatura = self._caminhos(digest)
+        dados.parent.mkdir(exist_ok=True)
+        tamanho = 0
+        if png:
+            _gravar_atomico(miniatura, png)
+            tamanho += len(png)
+        conteudo = json.dumps({"texto": texto}, ensure_ascii=False).encode("utf-8")
+        _gravar_atomico(dados, conteudo)   # por último: o .json marca a entrada como completa
+        tamanho += len(conteudo)
+        with self._trava, self.conexao:
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO entradas (digest, tamanho, usado_em) VALUES (?, ?, ?)",
+                (digest, tamanho, time.time()),
+            )
+        self._despejar()
+
+    def _despejar(self):
+        """Remove as entradas menos usadas até o cache voltar a 90% do limite."""
+        with self._trava:
+            total = self.conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()[0]
+            if total <= self.limite_bytes:
+                return
+            alvo, removidas = self.limite_bytes * 0.9, []
+            for digest, tamanho in self.conexao.execute("SELECT digest, tamanho FROM entradas ORDER BY usado_em"):
+                if total <= alvo:
+                    break
+                for caminho in self._caminhos(digest):
+                    caminho.unlink(missing_ok=True)
+                removidas.append((digest,))
+                total -= tamanho
+            with self.conexao:
+                self.conexao.executemany("DELETE FROM entradas WHERE digest = ?", removidas)
+        registrar_log(f"Cache de previews: {len(removidas)} entradas removidas (LRU).", funcao="_despejar")
+
+
+def _gravar_atomico(caminho: Path, conteudo: bytes):
+    temporario = caminho.with_name(f".{caminho.name}.tmp")
+    with open(temporario, "wb") as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+_cache = None
+
+def obter_cache_previews() -> CachePreviews:
+    """Retorna o cache de previews compartilhado do processo (criado na primeira chamada)."""
+    global _cache
+    if _cache is None:
+        _cache = CachePreviews()
+    return _cache
+
+# -----------------------------
+# Geração (uma vez por conteúdo)
+# -----------------------------
+def digest_arquivo(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        while bloco := f.read(BLOCO_HASH):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def miniatura_primeira_pagina(caminho: str, largura: int = LARGURA_MINIATURA) -> bytes | None:
+    """PNG da primeira página via pdftoppm (None se ele não estiver instalado ou falhar)."""
+    if PDFTOPPM is None:
+        return None
+    try:
+        saida = subprocess.run(
+            [PDFTOPPM, "-f", "1", "-l", "1", "-png", "-singlefile", "-scale-to", str(largura), caminho, "-"],
+            capture_output=True, timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return saida.stdout if saida.returncode == 0 and saida.stdout else None
+
+
+def _gerar(caminho: str, forcar: bool = False):
+    """Worker do pool: (digest, texto, png, ja_em_cache). Conteúdo já em cache não é relido. Nunca levanta."""
+    try:
+        digest = digest_arquivo(caminho)
+        if not forcar and caminhos_entrada(PASTA_PREVIEWS, digest)[0].exists():
+            return digest, None, None, True
+        return digest, texto_primeira_pagina(caminho, CARACTERES_TRECHO), miniatura_primeira_pagina(caminho), False
+    except OSError:
+        return None
+    except Exception as e:
+        registrar_log(f"Erro ao gerar preview de {caminho}: {e!r}", tipo="ERRO", funcao="_gerar")
+        return None
+
+
+def gerar_previews(materia_ids: Sequence[int] | None = None, reprocessar: bool = False, workers: int = WORKERS,
+                   silencioso: bool = False) -> int:
+    """Gera os previews dos PDFs ainda sem digest (todos, com `reprocessar`) e grava o digest no banco.
+
+    PDFs com digest cuja entrada já saiu do cache (LRU) também são regenerados.
+    Lotes grandes vão para um pool de processos. Com `silencioso` (segundo plano),
+    avisos vão só para o log. Retorna quantos arquivos foram processados.
+    """
+    cache = obter_cache_previews()
+    pendentes = MateriaRepository.arquivos_para_metadados(materia_ids, reprocessar=reprocessar, coluna="digest")
+    if not reprocessar:
+        pendentes += [a for a in MateriaRepository.arquivos_com_digest(materia_ids) if not cache.contem(a.digest)]
+    if not pendentes:
+        return 0
+
+    caminhos = [os.path.join(a.pasta_pdf, a.nome_arquivo) for a in pendentes]
+    if len(caminhos) < MINIMO_PARA_POOL or workers <= 1:
+        resultados = [_gerar(c, reprocessar) for c in caminhos]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultados = list(pool.map(_gerar, caminhos, itertools.repeat(reprocessar),
+                                       chunksize=max(1, len(caminhos) // (workers * 4))))
+
+    linhas, novos = [], 0
+    for arquivo, resultado in zip(pendentes, resultados):
+        if resultado is None:
+            continue
+        digest, texto, png, em_cache = resultado
+        if not em_cache and (reprocessar or not cache.contem(digest)):
+            cache.gravar(digest, texto, png)
+            novos += 1
+        linhas.append({"id": arquivo.id, "digest": digest})
+    ausentes = len(pendentes) - len(linhas)
+    if ausentes:
+        aviso = f"{ausentes} PDFs não encontrados ou ilegíveis; previews não gerados."
+        if silencioso:
+            registrar_log(aviso, tipo="WARNING", funcao="gerar_previews")
+        else:
+            mostrar_aviso(aviso)
+    atualizados = MateriaRepository.gravar_metadados(linhas)
+    registrar_log(f"Previews: {atualizados} PDFs processados, {novos} entradas novas no cache.", funcao="gerar_previews")
+    return atualizados
+
+
+def gerar_previews_em_segundo_plano(materia_ids: Sequence[int] | None = None, reprocessar: bool = False) -> threading.Thread:
+    """Dispara gerar_previews numa thread daemon (o menu e o monitor não esperam a geração)."""
+    def _executar():
+        try:
+            gerar_previews(materia_ids, reprocessar=reprocessar, silencioso=True)
+        except Exception as e:
+            registrar_log(f"Erro ao gerar previews: {e}", tipo="ERRO", funcao="gerar_previews_em_segundo_plano")
+
+    thread = threading.Thread(target=_executar, name="previews", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,215 @@
+import re
+import json
+import time
+from collections import Counter, deque
+from collections.abc import Callable, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# -----------------------------
+# Terminal (entrada e saída do fluxo interativo)
+# -----------------------------
+# Todo o fluxo do menu lê por `ler` e escreve por `escrever` (e escolhe pastas
+# por `escolher_pasta`), nunca direto por input()/print()/tkinter. Trocando o
+# terminal em uso, a mesma sessão pode ser gravada ou reproduzida sem tela.
+_RE_ANSI = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def sem_cores(texto: str) -> str:
+    return _RE_ANSI.sub("", texto)
+
+
+# Derivam de BaseException (como KeyboardInterrupt) para atravessar os
+# "except Exception" dos submenus e chegar até `reproduzir`.
+class FimDoRoteiro(BaseException):
+    """O roteiro reproduzido acabou (encerra o fluxo do menu)."""
+
+
+class RoteiroDivergente(BaseException):
+    """Em modo estrito, o programa pediu uma entrada diferente da gravada no roteiro."""
+
+
+class Terminal:
+    """Terminal real: input(), print() e a janela de seleção de pasta do Tkinter."""
+    interativo = True
+
+    def ler(self, prompt: str = "") -> str:
+        return input(prompt)
+
+    def escrever(self, texto: str = ""):
+        print(texto)
+
+    def escolher_pasta(self, titulo: str) -> str | None:
+        import tkinter as tk
+        from tkinter import filedialog
+        root = tk.Tk()
+        root.withdraw()
+        root.attributes("-topmost", True)
+        pasta = filedialog.askdirectory(title=titulo, parent=root)
+        root.destroy()
+        return pasta if pasta else None
+
+
+_terminal: Terminal = Terminal()
+
+def terminal_atual() -> Terminal:
+    return _terminal
+
+
+@contextmanager
+def usar_terminal(terminal: Terminal):
+    """Troca o terminal do processo durante o bloco (threads em segundo plano também escrevem nele)."""
+    global _terminal
+    anterior, _terminal = _terminal, terminal
+    try:
+        yield terminal
+    finally:
+        _terminal = anterior
+
+
+def ler(prompt: str = "") -> str:
+    return _terminal.ler(prompt)
+
+
+def escrever(texto: str = ""):
+    _terminal.escrever(texto)
+
+# -----------------------------
+# Gravação de sessão
+# -----------------------------
+class TerminalGravador(Terminal):
+    """Repassa tudo ao terminal real e grava cada entrada no roteiro (JSON-lines {prompt, resposta})."""
+
+    def __init__(self, caminho: Path, base: Terminal | None = None):
+        self.base = base or Terminal()
+        self.arquivo = open(caminho, "w", encoding="utf-8")
+
+    def _gravar(self, prompt: str, resposta: str):
+        self.arquivo.write(json.dumps({"prompt": sem_cores(prompt).strip(), "resposta": resposta}, ensure_ascii=False) + "\n")
+        self.arquivo.flush()
+
+    def ler(self, prompt: str = "") -> str:
+        resposta = self.base.ler(prompt)
+        self._gravar(prompt, resposta)
+        return resposta
+
+    def escrever(self, texto: str = ""):
+        self.base.escrever(texto)
+
+    def escolher_pasta(self, titulo: str) -> str | None:
+        pasta = self.base.escolher_pasta(titulo)
+        self._gravar(titulo, pasta or "")
+        return pasta
+
+    def fechar(self):
+        self.arquivo.close()
+
+# -----------------------------
+# Reprodução sem tela
+# -----------------------------
+@dataclass
+class Entrada:
+    resposta: str
+    prompt: str | None = None   # None em roteiros gerados (só respostas)
+
+
+def carregar_roteiro(caminho: Path) -> list[Entrada]:
+    """Lê um roteiro gravado (JSON-lines) ou gerado (uma resposta por linha, texto puro)."""
+    entradas = []
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.rstrip("\n")
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                registro = None
+            if isinstance(registro, dict) and "resposta" in registro:
+                entradas.append(Entrada(str(registro["resposta"]), registro.get("prompt")))
+            else:
+                entradas.append(Entrada(linha))
+    return entradas
+
+
+class TerminalRoteirizado(Terminal):
+    """Responde às leituras com as entradas do roteiro e descarta a saída (renderizador sem tela).
+
+    Guarda só as últimas linhas escritas, para diagnóstico quando o roteiro diverge.
+    O tempo entre uma resposta e a leitura seguinte é somado por prompt, o que dá
+    o custo de cada passo do fluxo.
+    """
+    interativo = False
+
+    def __init__(self, entradas: Sequence[Entrada], estrito: bool = False, ultimas_linhas: int = 50):
+        self.entradas = entradas
+        self.estrito = estrito
+        self.posicao = 0
+        self.divergencias = 0
+        self.linhas_escritas = 0
+        self.ultimas = deque(maxlen=ultimas_linhas)
+        self.tempo_por_prompt = Counter()
+        self._prompt_anterior, self._inicio_passo = None, None
+
+    def _fechar_passo(self):
+        if self._prompt_anterior is not None:
+            self.tempo_por_prompt[self._prompt_anterior] += time.perf_counter() - self._inicio_passo
+            self._prompt_anterior = None
+
+    def ler(self, prompt: str = "") -> str:
+        self._fechar_passo()
+        if self.posicao >= len(self.entradas):
+            raise FimDoRoteiro()
+        entrada = self.entradas[self.posicao]
+        self.posicao += 1
+        atual = sem_cores(prompt).strip()
+        if entrada.prompt is not None and entrada.prompt != atual:
+            self.divergencias += 1
+            if self.estrito:
+                raise RoteiroDivergente(
+                    f"Entrada {self.posicao}: esperado {entrada.prompt!r}, recebido {atual!r}\n" + "\n".join(self.ultimas)
+                )
+        self._prompt_anterior, self._inicio_passo = atual, time.perf_counter()
+        return entrada.resposta
+
+    def escrever(self, texto: str = ""):
+        self.linhas_escritas += 1
+        self.ultimas.append(sem_cores(str(texto)))
+
+    def escolher_pasta(self, titulo: str) -> str | None:
+        return self.ler(titulo) or None
+
+
+@dataclass
+class Relatorio:
+    execucoes: int = 0
+    respostas: int = 0
+    linhas_escritas: int = 0
+    divergencias: int = 0
+    segundos: float = 0.0
+    tempo_por_prompt: Counter = field(default_factory=Counter)
+
+    @property
+    def respostas_por_segundo(self) -> float:
+        return self.respostas / self.segundos if self.segundos else 0.0
+
+
+def reproduzir(entradas: Sequence[Entrada], fluxo: Callable[[], None], repeticoes: int = 1,
+               estrito: bool = False) -> Relatorio:
+    """Roda `fluxo` (o menu) `repeticoes` vezes contra o roteiro, sem tela, o mais rápido possível."""
+    relatorio = Relatorio()
+    for _ in range(repeticoes):
+        terminal = TerminalRoteirizado(entradas, estrito=estrito)
+        inicio = time.perf_counter()
+        with usar_terminal(terminal):
+            try:
+                fluxo()
+            except FimDoRoteiro:
+                pass
+        terminal._fechar_passo()   # o último passo termina quando o fluxo retorna
+        relatorio.segundos += time.perf_counter() - inicio
+        relatorio.execucoes += 1
+        relatorio.respostas += terminal.posicao
+        relatorio.linhas_escritas += terminal.linhas_escritas
+        relatorio.divergencias += terminal.divergencias
+        relatorio.tempo_por_prompt.update(terminal.tempo_por_prompt)
+    return relatorio
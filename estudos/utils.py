@@ -1,9 +1,10 @@
 import os
-import json
 from datetime import datetime
-from pathlib import Path
 from enum import Enum
 from colorama import Fore, Style, init
+from catalogo import mensagem
+from configuracao import CONFIG_PATH, ErroConfiguracao, obter_config, ao_recarregar
+from sessao import ler, escrever
 
 # Inicializa colorama (suporte multiplataforma)
 init(autoreset=True)
@@ -11,62 +12,28 @@ init(autoreset=True)
 # -----------------------------
 # Config centralizado
 # -----------------------------
-CONFIG_PATH = Path(__file__).parent / "config.json"
-_config_cache = None
-
 def carregar_config(caminho=CONFIG_PATH):
-    """Carrega o arquivo de configuração JSON (com cache)."""
-    global _config_cache
-    if _config_cache is None:
-        try:
-            if Path(caminho).exists():
-                with open(caminho, "r", encoding="utf-8") as f:
-                    _config_cache = json.load(f)
-            else:
-                print(f"{Fore.YELLOW}[AVISO] Arquivo de configuração não encontrado: {caminho}{Style.RESET_ALL}")
-                _config_cache = {}
-        except Exception as e:
-            mostrar_erro(f"Erro ao carregar configuração: {e}")
-            _config_cache = {}
-    return _config_cache
+    """Retorna a configuração (dict) já validada e com as variáveis de ambiente aplicadas."""
+    return obter_config(caminho).bruto
+
+try:
+    config = carregar_config()
+except (ErroConfiguracao, ValueError) as e:
+    print(f"{Fore.RED}[ERRO] {e}{Style.RESET_ALL}")
+    raise SystemExit(1)
+IDIOMA = obter_config().idioma
 
-config = carregar_config()
-IDIOMA = config.get("idioma", "pt")
-if IDIOMA not in ["pt", "en", "es"]:
-    IDIOMA = "pt"
+@ao_recarregar
+def _recarregar_idioma(anterior, nova):
+    global IDIOMA
+    IDIOMA = nova.idioma
 
 # -----------------------------
 # Internacionalização (i18n)
 # -----------------------------
-MSG_I18N = {
-    "pt": {
-        "erro": "[ERRO]",
-        "sucesso": "[SUCESSO]",
-        "aviso": "[AVISO]",
-        "confirmacao": "Deseja confirmar esta ação crítica?",
-        "nenhum_dado": "Nenhum dado para exibir.",
-        "entrada_invalida": "Entrada inválida. Digite apenas números.",
-        "fora_intervalo": "Digite um número entre {min} e {max}."
-    },
-    "en": {
-        "erro": "[ERROR]",
-        "sucesso": "[SUCCESS]",
-        "aviso": "[WARNING]",
-        "confirmacao": "Do you want to confirm this critical action?",
-        "nenhum_dado": "No data to display.",
-        "entrada_invalida": "Invalid input. Numbers only.",
-        "fora_intervalo": "Enter a number between {min} and {max}."
-    },
-    "es": {
-        "erro": "[ERROR]",
-        "sucesso": "[ÉXITO]",
-        "aviso": "[ADVERTENCIA]",
-        "confirmacao": "¿Desea confirmar esta acción crítica?",
-        "nenhum_dado": "No hay datos para mostrar.",
-        "entrada_invalida": "Entrada inválida. Solo números.",
-        "fora_intervalo": "Ingrese un número entre {min} y {max}."
-    }
-}
+def t(chave: str, **kwargs) -> str:
+    """Retorna a mensagem `chave` no idioma configurado (catálogos em i18n/)."""
+    return mensagem(IDIOMA, chave, **kwargs)
 
 # -----------------------------
 # Enum de níveis de log
@@ -94,32 +61,32 @@ def set_log_level(level: str):
 # -----------------------------
 def mostrar_erro(msg: str):
     """Exibe mensagem de erro em vermelho."""
-    print(f"{Fore.RED}{MSG_I18N[IDIOMA]['erro']} {msg}{Style.RESET_ALL}")
+    escrever(f"{Fore.RED}{t('erro')} {msg}{Style.RESET_ALL}")
 
 def mostrar_sucesso(msg: str):
     """Exibe mensagem de sucesso em verde."""
-    print(f"{Fore.GREEN}{MSG_I18N[IDIOMA]['sucesso']} {msg}{Style.RESET_ALL}")
+    escrever(f"{Fore.GREEN}{t('sucesso')} {msg}{Style.RESET_ALL}")
 
 def mostrar_aviso(msg: str):
     """Exibe mensagem de aviso em amarelo."""
-    print(f"{Fore.YELLOW}{MSG_I18N[IDIOMA]['aviso']} {msg}{Style.RESET_ALL}")
+    escrever(f"{Fore.YELLOW}{t('aviso')} {msg}{Style.RESET_ALL}")
 
 # -----------------------------
 # Funções de validação genéricas
 # -----------------------------
 def validar_input_str(msg: str) -> str | None:
     """Valida entrada de string não vazia."""
-    valor = input(msg).strip()
+    valor = ler(msg).strip()
     if not valor:
-        mostrar_erro("Entrada não pode ser vazia.")
+        mostrar_erro(t("entrada_vazia"))
         return None
     return valor
 
 def validar_opcao(msg: str, opcoes: list[str]) -> str | None:
     """Valida se a entrada está entre as opções permitidas."""
-    valor = input(msg).strip().lower()
+    valor = ler(msg).strip().lower()
     if valor not in [o.lower() for o in opcoes]:
-        mostrar_erro(f"Opção inválida. Escolha entre: {', '.join(opcoes)}")
+        mostrar_erro(t("opcao_invalida_entre", opcoes=", ".join(opcoes)))
         return None
     return valor
 
@@ -127,9 +94,9 @@ def validar_opcao(msg: str, opcoes: list[str]) -> str | None:
 # Função de confirmação
 # -----------------------------
 def confirmacao(msg: str = None) -> bool:
-    texto = msg or MSG_I18N[IDIOMA]["confirmacao"]
-    resposta = input(f"{Fore.YELLOW}{texto} (s/n): {Style.RESET_ALL}").strip().lower()
-    return resposta == "s"
+    texto = msg or t("confirmacao")
+    resposta = ler(f"{Fore.YELLOW}{texto} {t('sim_nao')}: {Style.RESET_ALL}").strip().lower()
+    return resposta == t("resposta_sim")
 
 # -----------------------------
 # Função de log simplificada
@@ -153,7 +120,7 @@ def registrar_log(msg: str, tipo: str = "INFO", funcao: str = ""):
     prefixo = cores.get(tipo.upper(), Fore.WHITE) + f"[{tipo.upper()}]" + Style.RESET_ALL
     mensagem = f"{prefixo} ({funcao}) {msg}" if funcao else f"{prefixo} {msg}"
 
-    print(f"{timestamp} - {mensagem}")
+    escrever(f"{timestamp} - {mensagem}")
 
 # -----------------------------
 # Input validado numérico
@@ -161,13 +128,49 @@ def registrar_log(msg: str, tipo: str = "INFO", funcao: str = ""):
 def input_numero(msg: str, minimo: int, maximo: int) -> int:
     while True:
         try:
-            valor = int(input(f"{Fore.CYAN}{msg}{Style.RESET_ALL} "))
+            valor = int(ler(f"{Fore.CYAN}{msg}{Style.RESET_ALL} "))
             if valor < minimo or valor > maximo:
-                mostrar_erro(MSG_I18N[IDIOMA]["fora_intervalo"].format(min=minimo, max=maximo))
+                mostrar_erro(t("fora_intervalo", min=minimo, max=maximo))
             else:
                 return valor
         except ValueError:
-            mostrar_erro(MSG_I18N[IDIOMA]["entrada_invalida"])
+            mostrar_erro(t("entrada_invalida"))
+
+# -----------------------------
+# Lista de IDs e intervalos ("1,4,10-20")
+# -----------------------------
+def interpretar_ids(texto: str) -> tuple[list[int], list[tuple[int, int]]] | None:
+    """Converte '1,4,10-20' em ([1, 4], [(10, 20)]). Retorna None se a entrada for inválida."""
+    ids, intervalos = [], []
+    for parte in texto.replace(" ", "").split(","):
+        if not parte:
+            continue
+        try:
+            if "-" in parte:
+                inicio, fim = (int(x) for x in parte.split("-", 1))
+                if inicio > fim:
+                    inicio, fim = fim, inicio
+                intervalos.append((inicio, fim))
+            else:
+                ids.append(int(parte))
+        except ValueError:
+            mostrar_erro(t("id_invalido", parte=parte))
+            return None
+    if not ids and not intervalos:
+        mostrar_erro(t("nenhum_id"))
+        return None
+    return ids, intervalos
+
+# -----------------------------
+# Listagem de PDFs de uma pasta
+# -----------------------------
+def listar_pdfs(pasta: str) -> list[str] | None:
+    """Retorna os nomes dos PDFs da pasta (ordenados), ou None se ela não puder ser lida."""
+    try:
+        with os.scandir(pasta) as entradas:
+            return sorted(e.name for e in entradas if e.name.lower().endswith(".pdf") and e.is_file())
+    except OSError:
+        return None
 
 # -----------------------------
 # Normalização de nomes de arquivos
@@ -188,13 +191,41 @@ def validar_data(data_str: str, formato: str = "%Y-%m-%d") -> bool:
     except ValueError:
         return False
 
+def interpretar_data(texto: str) -> datetime | None:
+    """Aceita AAAA-MM-DD ou DD/MM/AAAA; retorna None se a data for inválida."""
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(texto.strip(), formato)
+        except ValueError:
+            continue
+    return None
+
+# -----------------------------
+# Formatação de valores para exibição
+# -----------------------------
+def formatar_data(valor: datetime | None, vazio: str = "-") -> str:
+    """Formata datas no padrão do sistema (usado só na hora de exibir)."""
+    return valor.strftime("%Y-%m-%d %H:%M:%S") if valor else vazio
+
+def formatar_bytes(valor: int | None, vazio: str = "-") -> str:
+    """Tamanho legível (ex.: 12,3 MB)."""
+    if not valor:
+        return vazio
+    for unidade in ("B", "KB", "MB", "GB"):
+        if valor < 1024 or unidade == "GB":
+            return f"{valor:.0f} {unidade}" if unidade == "B" else f"{valor:.1f} {unidade}".replace(".", ",")
+        valor /= 1024
+
+def formatar_sim_nao(valor: bool) -> str:
+    return t("valor_sim") if valor else t("valor_nao")
+
 # -----------------------------
 # Formatar tabela aprimorado
 # -----------------------------
 def formatar_tabela(dados, colunas=None):
     """Imprime dados em formato tabulado com alinhamento automático e bordas."""
     if not dados:
-        mostrar_aviso(MSG_I18N[IDIOMA]["nenhum_dado"])
+        mostrar_aviso(t("nenhum_dado"))
         return
 
     # Se dados forem lista de dicionários
@@ -203,19 +234,34 @@ def formatar_tabela(dados, colunas=None):
             colunas = list(dados[0].keys())
         larguras = [max(len(str(linha.get(col, ""))) for linha in dados) for col in colunas]
         linha_header = " | ".join(f"{col:<{larguras[i]}}" for i, col in enumerate(colunas))
-        print(Fore.CYAN + linha_header + Style.RESET_ALL)
-        print("-" * len(linha_header))
+        escrever(Fore.CYAN + linha_header + Style.RESET_ALL)
+        escrever("-" * len(linha_header))
         for linha in dados:
-            print(" | ".join(f"{str(linha.get(col, '')):<{larguras[i]}}" for i, col in enumerate(colunas)))
+            escrever(" | ".join(f"{str(linha.get(col, '')):<{larguras[i]}}" for i, col in enumerate(colunas)))
     else:
         # Lista de listas
         if colunas:
             larguras = [max(len(str(c)) for c in [col] + [linha[i] for linha in dados]) for i, col in enumerate(colunas)]
             linha_header = " | ".join(f"{col:<{larguras[i]}}" for i, col in enumerate(colunas))
-            print(Fore.CYAN + linha_header + Style.RESET_ALL)
-            print("-" * len(linha_header))
+            escrever(Fore.CYAN + linha_header + Style.RESET_ALL)
+            escrever("-" * len(linha_header))
         else:
             larguras = [max(len(str(c)) for c in coluna) for coluna in zip(*dados)]
 
         for linha in dados:
-            print(" | ".join(f"{str(c):<{larguras[i]}}" for i, c in enumerate(linha)))
\ No newline at end of file
+            escrever(" | ".join(f"{str(c):<{larguras[i]}}" for i, c in enumerate(linha)))
+
+# -----------------------------
+# Histograma em texto
+# -----------------------------
+def formatar_histograma(linhas, largura: int = 40):
+    """Imprime [(rotulo, quantidade)] como barras horizontais proporcionais ao maior valor."""
+    if not linhas:
+        mostrar_aviso(t("nenhum_dado"))
+        return
+    maior = max(q for _, q in linhas) or 1
+    largura_rotulo = max(len(str(r)) for r, _ in linhas)
+    largura_qtd = len(str(maior))
+    for rotulo, quantidade in linhas:
+        barra = "█" * max(1 if quantidade else 0, round(quantidade / maior * largura))
+        escrever(f"{rotulo:<{largura_rotulo}} | {quantidade:>{largura_qtd}} | {Fore.CYAN}{barra}{Style.RESET_ALL}")